@@ -10,6 +10,9 @@
     python admin_cli.py complaints approve <id>         # 批准投诉
     python admin_cli.py complaints reject <id>          # 拒绝投诉
     python admin_cli.py stats                           # 查看统计信息
+    python admin_cli.py classify [--all]                # 回填分类（默认只处理未分类的种子）
+    python admin_cli.py refresh-counts [N]              # 计算前 N 个热门关键词的精确结果数（默认 100）
+    python admin_cli.py index-files                     # 回填文件名词表（scope=files 搜索）
 """
 import sys
 import os
@@ -20,6 +23,10 @@ import hashlib
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from database.mysql_client import MySQLClient
+from database import keys
+from services.torrent_service import TorrentService
+from services.hot_score import HotScoreEngine
+from services.search_cache import SearchCache
 
 class AdminCLI:
     """后台管理命令行工具"""
@@ -33,7 +40,7 @@ class AdminCLI:
             # 检查种子是否存在
             torrent = MySQLClient.fetch_one(
                 "SELECT id, name FROM torrents WHERE info_hash = %s",
-                (info_hash,)
+                (keys.db_hash(info_hash),)
             )
             
             if not torrent:
@@ -47,9 +54,15 @@ class AdminCLI:
                 SET is_blocked = TRUE, block_reason = %s
                 WHERE info_hash = %s
                 """,
-                (reason, info_hash)
+                (reason, keys.db_hash(info_hash))
             )
             
+            try:
+                HotScoreEngine.remove([torrent['id']])
+            except Exception as e:
+                print(f"⚠️  热门榜移除失败: {e}")
+            SearchCache.invalidate()
+            
             print(f"✅ 种子已屏蔽: {torrent['name']}")
             print(f"   Hash: {info_hash}")
             print(f"   原因: {reason}")
@@ -68,10 +81,11 @@ class AdminCLI:
                 SET is_blocked = FALSE, block_reason = NULL
                 WHERE info_hash = %s
                 """,
-                (info_hash,)
+                (keys.db_hash(info_hash),)
             )
             
             if result > 0:
+                SearchCache.invalidate()
                 print(f"✅ 已解除屏蔽: {info_hash}")
                 return True
             else:
@@ -267,6 +281,60 @@ class AdminCLI:
         except Exception as e:
             print(f"❌ 查询失败: {e}")
 
+    def classify_torrents(self, only_missing=True, batch_size=1000):
+        """批量回填分类"""
+        try:
+            total = 0
+            last_id = None
+            start = datetime.now()
+            while True:
+                count, last_id = TorrentService.classify_batch(last_id, batch_size, only_missing)
+                if not count:
+                    break
+                total += count
+                print(f"  已分类 {total:,} 个种子", end='\r')
+            elapsed = (datetime.now() - start).total_seconds()
+            print(f"\n✅ 分类完成: {total:,} 个种子，耗时 {elapsed:.0f}s")
+            return True
+        except Exception as e:
+            print(f"\n❌ 分类失败: {e}")
+            return False
+    
+    def index_files(self, batch_size=1000):
+        """回填文件名词表 torrent_file_terms"""
+        try:
+            total = 0
+            last_id = None
+            start = datetime.now()
+            while True:
+                count, last_id = TorrentService.file_terms_batch(last_id, batch_size)
+                if not count:
+                    break
+                total += count
+                print(f"  已处理 {total:,} 个种子", end='\r')
+            SearchCache.invalidate()
+            elapsed = (datetime.now() - start).total_seconds()
+            print(f"\n✅ 文件名词表回填完成: {total:,} 个种子，耗时 {elapsed:.0f}s")
+            return True
+        except Exception as e:
+            print(f"\n❌ 回填失败: {e}")
+            return False
+    
+    def refresh_counts(self, top_n=100):
+        """刷新热门关键词的精确结果数（写入搜索缓存）"""
+        try:
+            from services.search_service import SearchService
+            start = datetime.now()
+            count = SearchService.refresh_popular_totals(top_n)
+            elapsed = (datetime.now() - start).total_seconds()
+            print(f"✅ 已刷新 {count} 个关键词的结果数，耗时 {elapsed:.0f}s")
+            if not count:
+                print("   search_keywords 为空: 关键词由 API 记录搜索后定期写入（KeywordBuffer）")
+            return True
+        except Exception as e:
+            print(f"❌ 刷新失败: {e}")
+            return False
+
 def main():
     if len(sys.argv) < 2:
         print(__doc__)
@@ -330,6 +398,15 @@ def main():
     elif command == 'stats':
         cli.show_stats()
     
+    elif command == 'classify':
+        cli.classify_torrents(only_missing='--all' not in sys.argv[2:])
+    
+    elif command == 'refresh-counts':
+        cli.refresh_counts(int(sys.argv[2]) if len(sys.argv) > 2 else 100)
+    
+    elif command == 'index-files':
+        cli.index_files()
+    
     else:
         print(f"❌ 未知命令: {command}")
         print(__doc__)
@@ -8,12 +8,21 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 import sys
 import os
+import asyncio
 import logging
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.search_service import SearchService
+from services.counter_buffer import CounterBuffer
+from services.search_cache import SearchCache
+from services.pagination import Cursor
+from services.index_search import IndexSearch
+from services.keyword_buffer import KeywordBuffer
+from services.suggest import SuggestService
 from database.mysql_client import MySQLClient
+from database import keys
+from config.settings import COUNTER_FLUSH_SEC, SEARCH_MAX_PAGE, SEARCH_BACKEND, SUGGEST_LIMIT, SUGGEST_REFRESH_SEC
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -37,22 +46,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def flush_counters_loop():
+    """定期把缓冲的 search_count / view_count 和搜索关键词写回 MySQL"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(COUNTER_FLUSH_SEC)
+        try:
+            await loop.run_in_executor(None, CounterBuffer.flush)
+        except Exception as e:
+            logger.error(f"Counter flush error: {e}")
+        try:
+            await loop.run_in_executor(None, KeywordBuffer.flush)
+        except Exception as e:
+            logger.error(f"Keyword flush error: {e}")
+
+async def refresh_suggest_loop():
+    """启动时和之后每 SUGGEST_REFRESH_SEC 秒重建搜索建议索引"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, SuggestService.refresh)
+        except Exception as e:
+            logger.error(f"Suggest index refresh error: {e}")
+        await asyncio.sleep(SUGGEST_REFRESH_SEC)
+
 # 初始化数据库
 @app.on_event("startup")
 async def startup():
     MySQLClient.initialize()
+    app.state.counter_task = asyncio.create_task(flush_counters_loop())
+    app.state.suggest_task = asyncio.create_task(refresh_suggest_loop())
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.counter_task.cancel()
+    app.state.suggest_task.cancel()
+    # 退出前写回剩余计数和关键词（分开处理，一个失败不影响另一个）
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, CounterBuffer.flush)
+    except Exception as e:
+        logger.error(f"Final counter flush failed: {e}")
+    try:
+        await loop.run_in_executor(None, KeywordBuffer.flush)
+    except Exception as e:
+        logger.error(f"Final keyword flush failed: {e}")
 
 # Pydantic 模型
 class SearchResponse(BaseModel):
     results: List[dict]
     total: int
+    total_exact: bool = True
+    total_display: Optional[str] = None
     page: int
     total_pages: int
     keyword: str
+    scope: str = "name"
+    next_cursor: Optional[str] = None
 
 class TorrentDetail(BaseModel):
     torrent: dict
     files: List[dict]
+    files_total: int = 0
 
 class DMCAComplaint(BaseModel):
     info_hash: str
@@ -75,13 +130,20 @@ async def root():
 async def search(
     request: Request,
     q: str = Query(..., description="搜索关键词"),
-    page: int = Query(1, ge=1, description="页码"),
+    page: int = Query(1, ge=1, description=f"页码（最多 {SEARCH_MAX_PAGE} 页，之后用 cursor 翻页）"),
+    cursor: Optional[str] = Query(None, description="翻页游标（上一页返回的 next_cursor）"),
     sort: str = Query("time", description="排序方式: time/health/hot/size/relevance"),
+    scope: str = Query("name", description="搜索范围: name（种子名称）/ files（种子内的文件名）"),
     limit: int = Query(20, ge=1, le=100, description="每页数量"),
     min_size: Optional[int] = Query(None, description="最小大小（字节）"),
     max_size: Optional[int] = Query(None, description="最大大小（字节）"),
     has_video: Optional[bool] = Query(None, description="包含视频"),
     has_audio: Optional[bool] = Query(None, description="包含音频"),
+    category: Optional[str] = Query(None, description="分类: video/audio/image/document/software/archive/other"),
+    sub_category: Optional[str] = Query(None, description="子分类，如 movie/tv/lossless"),
+    quality: Optional[str] = Query(None, description="质量: 4K/1080p/720p/SD"),
+    codec: Optional[str] = Query(None, description="编码: HEVC/H.264/AV1/..."),
+    language: Optional[str] = Query(None, description="语言代码，如 zh/ja/en"),
     api_key: Optional[str] = Query(None, description="API 密钥"),
 ):
     """搜索种子"""
@@ -127,25 +189,47 @@ async def search(
                 )
         
         # 7. 检查禁搜词
-        is_banned, category = SecurityMiddleware.check_banned_keyword(q)
+        is_banned, ban_category = SecurityMiddleware.check_banned_keyword(q)
         if is_banned:
             raise HTTPException(
                 status_code=403,
                 detail={
                     'error': 'banned_keyword',
-                    'message': get_error_message(category, 'zh'),
-                    'category': category
+                    'message': get_error_message(ban_category, 'zh'),
+                    'category': ban_category
                 }
             )
         
-        # 8. 执行搜索
+        # 8. 解析分页: 前几页可以用页码，深翻页必须用游标（keyset，不随页数变慢）
+        after = None
+        if cursor:
+            try:
+                after = Cursor.decode(cursor, sort if sort in SearchService.SORT_MODES else 'time')
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        elif page > SEARCH_MAX_PAGE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"page > {SEARCH_MAX_PAGE} requires cursor pagination (use next_cursor)"
+            )
+        
+        # 9. 执行搜索
         filters = {}
         if min_size: filters['min_size'] = min_size
         if max_size: filters['max_size'] = max_size
         if has_video is not None: filters['has_video'] = has_video
         if has_audio is not None: filters['has_audio'] = has_audio
+        if category: filters['category'] = category
+        if sub_category: filters['sub_category'] = sub_category
+        if quality: filters['quality'] = quality
+        if codec: filters['codec'] = codec
+        if language: filters['language'] = language
+        
+        result = SearchService.search(q, page, sort, limit, filters, cursor=after, scope=scope)
         
-        result = SearchService.search(q, page, sort, limit, filters)
+        # 10. 记录关键词（只记有结果的首页搜索，翻页不重复计数），用于搜索建议
+        if page == 1 and not after and result.get('total'):
+            KeywordBuffer.record(q)
         return result
         
     except HTTPException:
@@ -154,6 +238,14 @@ async def search(
         logger.error(f"Search API error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/suggest")
+async def suggest(
+    q: str = Query(..., max_length=200, description="已输入的前缀"),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=SUGGEST_LIMIT, description="返回数量"),
+):
+    """搜索建议（进程内前缀索引，不访问数据库，可以在每次按键时调用）"""
+    return {'prefix': q, 'suggestions': SuggestService.suggest(q, limit)}
+
 @app.get("/api/torrent/{info_hash}", response_model=TorrentDetail)
 async def get_torrent(info_hash: str):
     """获取种子详情"""
@@ -173,22 +265,57 @@ async def get_torrent(info_hash: str):
         logger.error(f"Torrent detail API error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/torrent/{info_hash}/files")
+async def get_torrent_files(
+    info_hash: str,
+    page: int = Query(1, ge=1, description="页码"),
+    limit: int = Query(100, ge=1, le=1000, description="每页数量")
+):
+    """分页获取种子文件列表"""
+    try:
+        # 验证 info_hash 格式
+        import re
+        if not re.match(r'^[a-fA-F0-9]{40}$', info_hash):
+            raise HTTPException(status_code=400, detail="Invalid info_hash format")
+
+        result = SearchService.get_torrent_files(info_hash, page, limit)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Torrent not found")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Torrent files API error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/api/hot")
-async def get_hot_torrents(limit: int = Query(20, ge=1, le=100)):
+async def get_hot_torrents(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="翻页游标（上一页返回的 next_cursor）")
+):
     """获取热门种子"""
     try:
-        results = SearchService.get_hot_torrents(limit)
-        return {"results": results}
+        after = Cursor.decode(cursor, ('hot_rank', 'hot')) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return SearchService.get_hot_torrents(limit, after)
     except Exception as e:
         logger.error(f"Hot torrents API error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/recent")
-async def get_recent_torrents(limit: int = Query(20, ge=1, le=100)):
+async def get_recent_torrents(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="翻页游标（上一页返回的 next_cursor）")
+):
     """获取最新种子"""
     try:
-        results = SearchService.get_recent_torrents(limit)
-        return {"results": results}
+        after = Cursor.decode(cursor, 'recent') if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return SearchService.get_recent_torrents(limit, after)
     except Exception as e:
         logger.error(f"Recent torrents API error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -208,7 +335,7 @@ async def submit_dmca(complaint: DMCAComplaint):
         # 查询种子 ID
         torrent = MySQLClient.fetch_one(
             "SELECT id FROM torrents WHERE info_hash = %s",
-            (complaint.info_hash,)
+            (keys.db_hash(complaint.info_hash),)
         )
 
         torrent_id = torrent['id'] if torrent else None
@@ -222,7 +349,7 @@ async def submit_dmca(complaint: DMCAComplaint):
             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """,
             (
-                complaint_id, torrent_id, complaint.info_hash,
+                complaint_id, keys.db_id(torrent_id), complaint.info_hash,
                 complaint.complainant_name, complaint.complainant_email,
                 complaint.complainant_company, complaint.complaint_reason,
                 complaint.copyright_proof
@@ -253,6 +380,28 @@ async def get_stats():
             FROM torrents
             """
         )
+        try:
+            # 计数缓冲: 待写回数量和写回延迟
+            stats['counters'] = CounterBuffer.stats()
+        except Exception as e:
+            logger.error(f"Counter stats error: {e}")
+        try:
+            # 搜索结果缓存命中率
+            stats['search_cache'] = SearchCache.stats()
+        except Exception as e:
+            logger.error(f"Search cache stats error: {e}")
+        try:
+            # 搜索关键词缓冲和搜索建议索引
+            stats['keywords'] = KeywordBuffer.stats()
+            stats['suggest'] = SuggestService.stats()
+        except Exception as e:
+            logger.error(f"Keyword stats error: {e}")
+        if SEARCH_BACKEND == 'index':
+            try:
+                # 倒排索引段数、文档数、文件大小
+                stats['search_index'] = IndexSearch.index().stats()
+            except Exception as e:
+                logger.error(f"Search index stats error: {e}")
         return stats
     except Exception as e:
         logger.error(f"Stats API error: {e}")
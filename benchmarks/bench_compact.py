@@ -0,0 +1,69 @@
+"""
+Compact node/peer decoding microbenchmark
+
+Compares the old per-record loop (inet_ntoa + struct.unpack per node) with
+the batch decoders in utils, on find_node-sized payloads (8 nodes) and on a
+large bulk buffer. The NumPy path is only timed when NumPy is installed.
+
+使用方法:
+    python benchmarks/bench_compact.py
+"""
+import os
+import socket
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+def decode_nodes_loop(nodes):
+    """The previous utils.decode_nodes implementation"""
+    n = []
+    length = len(nodes)
+    if (length % 26) != 0:
+        return n
+    for i in range(0, length, 26):
+        nid = nodes[i:i+20]
+        ip = socket.inet_ntoa(nodes[i+20:i+24])
+        port = struct.unpack("!H", nodes[i+24:i+26])[0]
+        n.append((nid, ip, port))
+    return n
+
+def decode_peers_loop(values):
+    """The previous handle_response values loop"""
+    out = []
+    for v in values:
+        if len(v) == 6:
+            out.append((socket.inet_ntoa(v[:4]), struct.unpack("!H", v[4:])[0]))
+    return out
+
+def bench(label, fn, number):
+    best = min(timeit.repeat(fn, number=number, repeat=7))
+    print(f"{label:<36} {best / number * 1e6:>10.2f} us/call")
+
+def main():
+    response = os.urandom(26 * 8)
+    bulk = os.urandom(26 * 100000)
+    values = [os.urandom(6) for _ in range(50)]
+
+    print("find_node response (8 nodes)")
+    bench("  loop (inet_ntoa + unpack)", lambda: decode_nodes_loop(response), 20000)
+    bench("  decode_nodes (iter_unpack)", lambda: utils.decode_nodes(response), 20000)
+    bench("  decode_nodes_int (ints)", lambda: utils.decode_nodes_int(response), 20000)
+
+    print("get_peers values (50 peers)")
+    bench("  loop (inet_ntoa + unpack)", lambda: decode_peers_loop(values), 5000)
+    bench("  decode_peers (iter_unpack)", lambda: utils.decode_peers(values), 5000)
+
+    print("bulk buffer (100k nodes)")
+    bench("  loop (inet_ntoa + unpack)", lambda: decode_nodes_loop(bulk), 3)
+    bench("  decode_nodes_int (ints)", lambda: utils.decode_nodes_int(bulk), 3)
+    if utils.np is not None:
+        bench("  decode_nodes_array (numpy)", lambda: utils.decode_nodes_array(bulk), 3)
+    else:
+        print("  decode_nodes_array (numpy)           skipped, numpy not installed")
+
+if __name__ == "__main__":
+    main()
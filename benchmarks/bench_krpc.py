@@ -0,0 +1,79 @@
+"""
+KRPC parse benchmark
+
+Replays a synthetic mix of DHT traffic (get_peers / announce_peer / find_node
+queries and find_node / get_peers responses) through the old full bdecode
+path and the fast-path parse_krpc, and reports packets/s on one core.
+
+使用方法:
+    python benchmarks/bench_krpc.py [packets]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bencode import bencode, bdecode
+from krpc import parse_krpc
+
+def build_corpus(count):
+    """Roughly the query/response mix a crawler node sees"""
+    rnd = os.urandom
+    templates = [
+        {b"t": rnd(2), b"y": b"q", b"q": b"get_peers",
+         b"a": {b"id": rnd(20), b"info_hash": rnd(20)}, b"v": b"LT\x01\x02"},
+        {b"t": rnd(2), b"y": b"q", b"q": b"announce_peer",
+         b"a": {b"id": rnd(20), b"info_hash": rnd(20), b"port": 6881,
+                b"token": rnd(2), b"implied_port": 1}},
+        {b"t": rnd(2), b"y": b"q", b"q": b"find_node",
+         b"a": {b"id": rnd(20), b"target": rnd(20)}},
+        {b"t": rnd(2), b"y": b"r",
+         b"r": {b"id": rnd(20), b"nodes": rnd(26 * 8)}, b"ip": rnd(6)},
+        {b"t": rnd(2), b"y": b"r",
+         b"r": {b"id": rnd(20), b"nodes": rnd(26 * 8)}},
+        {b"t": rnd(2), b"y": b"r",
+         b"r": {b"id": rnd(20), b"token": rnd(8),
+                b"values": [rnd(6) for _ in range(20)]}},
+    ]
+    packets = [bencode(t) for t in templates]
+    return [packets[i % len(packets)] for i in range(count)]
+
+def old_path(packets):
+    for data in packets:
+        msg = bdecode(data)
+        if msg.get(b"y") == b"q":
+            args = msg.get(b"a")
+            args.get(b"id"), args.get(b"info_hash")
+        else:
+            args = msg.get(b"r")
+            args.get(b"id"), args.get(b"nodes")
+
+def new_path(packets):
+    for data in packets:
+        msg = parse_krpc(data)
+        if msg.y == b"q":
+            msg.id, msg.info_hash
+        else:
+            msg.id, msg.nodes
+
+def timed(fn, packets):
+    start = time.perf_counter()
+    fn(packets)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rounds = 7
+    packets = build_corpus(count)
+    old = new = float("inf")
+    # Interleave the rounds so background noise hits both paths equally
+    for _ in range(rounds):
+        old = min(old, timed(old_path, packets))
+        new = min(new, timed(new_path, packets))
+    print(f"{'bdecode':<12} {count / old:>12,.0f} packets/s")
+    print(f"{'parse_krpc':<12} {count / new:>12,.0f} packets/s")
+    print(f"speedup      {old / new:.2f}x")
+
+if __name__ == "__main__":
+    main()
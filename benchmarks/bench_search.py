@@ -0,0 +1,199 @@
+"""
+Name search benchmark: embedded inverted index vs MySQL ngram FULLTEXT
+
+Builds a synthetic corpus of torrent names (English release names, CJK titles,
+quality/codec tags), writes it to index segments in a temp directory, merges
+them, and times a mix of broad and narrow queries (match count, page 1 sorted
+by time, a deep cursor page). With --mysql the same corpus is loaded into a
+scratch table with an ngram FULLTEXT index on the configured server and the
+equivalent COUNT(*) / MATCH AGAINST queries are timed, once against the name
+column and once as a scope=files search (torrent_file_terms JOIN, with terms
+built by FileListCodec.terms from synthetic file paths for multi-file docs and
+from the name for single-file docs); the tables are dropped afterwards.
+
+使用方法:
+    python benchmarks/bench_search.py [docs] [--mysql]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.file_list import FileListCodec
+from services.text_index import IndexWriter, TextIndex, merge_pending
+
+WORDS = (
+    "the of and love night city dark star king war game house dragon black world "
+    "story last final return rise legend blood ghost fire ice season complete collection"
+).split()
+CJK_TITLES = [
+    "复仇者联盟", "权力的游戏", "进击的巨人", "流浪地球", "三体", "鬼灭之刃", "庆余年",
+    "甄嬛传", "琅琊榜", "名侦探柯南", "海贼王", "千与千寻", "你的名字", "周杰伦", "演唱会",
+]
+TAGS = ["1080p", "720p", "2160p", "4K", "BluRay", "WEB-DL", "x264", "x265", "HEVC", "AAC", "FLAC"]
+
+QUERIES = [
+    ("broad latin", "1080p"),
+    ("broad CJK", "演唱会"),
+    ("two words", "dragon 1080p"),
+    ("narrow", "legend ghost x265"),
+    ("CJK + tag", "复仇者联盟 4K"),
+    ("miss", "nonexistentterm"),
+]
+
+def make_corpus(count, seed=7):
+    rnd = random.Random(seed)
+    base = int(time.time()) - count
+    docs = []
+    for i in range(count):
+        if rnd.random() < 0.4:
+            name = f"{rnd.choice(CJK_TITLES)}{rnd.choice(['', '第' + str(rnd.randint(1, 40)) + '集 '])}"
+        else:
+            name = ".".join(rnd.choice(WORDS).title() for _ in range(rnd.randint(2, 5)))
+            name += f".{rnd.randint(1990, 2024)}"
+        name += " " + " ".join(rnd.sample(TAGS, rnd.randint(1, 3)))
+        docs.append((uuid.UUID(int=rnd.getrandbits(128)).bytes, name, base + i, rnd.randint(10 ** 6, 10 ** 11)))
+    return docs
+
+def timed(fn, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+def bench_index(docs, directory):
+    start = time.perf_counter()
+    writer = IndexWriter(directory, segment_docs=20000)
+    for doc_id, name, created_at, size in docs:
+        writer.add(doc_id, name, created_at, size)
+    writer.flush()
+    written = time.perf_counter() - start
+    start = time.perf_counter()
+    merges = merge_pending(directory, factor=4)
+    merged = time.perf_counter() - start
+    index = TextIndex(directory)
+    stats = index.stats()
+    print(f"index: {len(docs)} docs written in {written:.1f}s, {merges} merges in {merged:.1f}s, "
+          f"{stats['segments']} segments, {stats['bytes'] / 1024 / 1024:.1f} MB")
+
+    print(f"{'query':<14} {'matches':>9} {'page 1 ms':>10} {'deep ms':>9} {'size ms':>9}")
+    for label, query in QUERIES:
+        page_ms, hits = timed(lambda: index.search(query, 'time', 20))
+        deep_ms = 0.0
+        if hits.hits:
+            # 第 50 页：沿游标向后翻
+            after = hits.hits[-1]
+            for _ in range(48):
+                page = index.search(query, 'time', 20, after)
+                if page.complete or not page.hits:
+                    break
+                after = page.hits[-1]
+            deep_ms, _ = timed(lambda: index.search(query, 'time', 20, after))
+        size_ms, _ = timed(lambda: index.search(query, 'size', 20), repeat=3)
+        print(f"{label:<14} {hits.total:>9} {page_ms:>10.2f} {deep_ms:>9.2f} {size_ms:>9.2f}")
+
+def bench_mysql(docs):
+    import pymysql
+    from config.settings import MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+
+    conn = pymysql.connect(host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER, password=MYSQL_PASSWORD,
+                           database=MYSQL_DATABASE, charset='utf8mb4', autocommit=True)
+    table = "bench_search_names"
+    terms_table = "bench_search_terms"
+    rnd = random.Random(11)
+    terms_rows = []
+    for doc_id, name, _, _ in docs:
+        # ~30% multi-file (episodes); single-file docs get their terms from the name
+        if rnd.random() < 0.3:
+            paths = [f"{name}/{name} E{n:02d}.mkv" for n in range(1, rnd.randint(3, 12))]
+        else:
+            paths = [name]
+        terms_rows.append((doc_id, FileListCodec.terms(paths)))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"DROP TABLE IF EXISTS {terms_table}")
+            cursor.execute(f"""
+                CREATE TABLE {table} (
+                    id BINARY(16) PRIMARY KEY,
+                    name VARCHAR(500) NOT NULL,
+                    total_size BIGINT,
+                    created_at DATETIME,
+                    INDEX idx_created_at (created_at)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """)
+            start = time.perf_counter()
+            for i in range(0, len(docs), 2000):
+                cursor.executemany(
+                    f"INSERT INTO {table} (id, name, total_size, created_at) VALUES (%s, %s, %s, FROM_UNIXTIME(%s))",
+                    [(d[0], d[1], d[3], d[2]) for d in docs[i:i + 2000]]
+                )
+            cursor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX ft_name (name) WITH PARSER ngram")
+            cursor.execute(f"""
+                CREATE TABLE {terms_table} (
+                    torrent_id BINARY(16) PRIMARY KEY,
+                    terms TEXT NOT NULL
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """)
+            for i in range(0, len(terms_rows), 2000):
+                cursor.executemany(
+                    f"INSERT INTO {terms_table} (torrent_id, terms) VALUES (%s, %s)", terms_rows[i:i + 2000]
+                )
+            cursor.execute(f"ALTER TABLE {terms_table} ADD FULLTEXT INDEX ft_terms (terms) WITH PARSER ngram")
+            print(f"mysql: {len(docs)} rows loaded and indexed in {time.perf_counter() - start:.1f}s")
+
+            scopes = {
+                'name': (table, "MATCH(name) AGAINST(%s IN BOOLEAN MODE)"),
+                'files': (f"{table} JOIN {terms_table} ON {terms_table}.torrent_id = {table}.id",
+                          "MATCH(terms) AGAINST(%s IN BOOLEAN MODE)"),
+            }
+            print(f"{'query':<14} {'scope':<6} {'matches':>9} {'count ms':>10} {'page 1 ms':>10} {'page 50 ms':>11}")
+            for label, query in QUERIES:
+                boolean = " ".join(f"+{w}" for w in query.split())
+                for scope, (source, match) in scopes.items():
+
+                    def count():
+                        cursor.execute(f"SELECT COUNT(*) FROM {source} WHERE {match}", (boolean,))
+                        return cursor.fetchone()[0]
+
+                    def page(offset):
+                        cursor.execute(
+                            f"SELECT id, name FROM {source} WHERE {match} "
+                            f"ORDER BY created_at DESC, id DESC LIMIT 20 OFFSET %s",
+                            (boolean, offset)
+                        )
+                        return cursor.fetchall()
+
+                    count_ms, total = timed(count, repeat=3)
+                    page_ms, _ = timed(lambda: page(0), repeat=3)
+                    deep_ms, _ = timed(lambda: page(980), repeat=3)
+                    print(f"{label:<14} {scope:<6} {total:>9} {count_ms:>10.2f} {page_ms:>10.2f} {deep_ms:>11.2f}")
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {terms_table}")
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.close()
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    count = int(args[0]) if args else 200000
+    docs = make_corpus(count)
+    directory = tempfile.mkdtemp(prefix='dht_index_bench_')
+    try:
+        bench_index(docs, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if '--mysql' in sys.argv[1:]:
+        bench_mysql(docs)
+
+if __name__ == '__main__':
+    main()
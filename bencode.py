@@ -1,94 +1,296 @@
-import struct
-
 # Exceptions
 class BencodeError(Exception):
     pass
 
-def decode_int(x, f):
-    f += 1
-    newf = x.index(b'e', f)
-    n = int(x[f:newf])
-    if x[f] == b'-'[0]:
-        if x[f + 1] == b'0'[0]:
-            raise BencodeError
-    elif x[f] == b'0'[0] and newf != f + 1:
-        raise BencodeError
-    return n, newf + 1
-
-def decode_string(x, f):
-    colon = x.index(b':', f)
-    n = int(x[f:colon])
-    if x[f] == b'0'[0] and colon != f + 1:
-        raise BencodeError
-    colon += 1
-    return x[colon:colon + n], colon + n
-
-def decode_list(x, f):
-    r, f = [], f + 1
-    while x[f] != b'e'[0]:
-        v, f = decode_func[x[f]](x, f)
-        r.append(v)
-    return r, f + 1
-
-def decode_dict(x, f):
-    r, f = {}, f + 1
-    while x[f] != b'e'[0]:
-        k, f = decode_string(x, f)
-        r[k], f = decode_func[x[f]](x, f)
-    return r, f + 1
-
-decode_func = {}
-decode_func[b'l'[0]] = decode_list
-decode_func[b'd'[0]] = decode_dict
-decode_func[b'i'[0]] = decode_int
-for i in range(b'0'[0], b'9'[0] + 1):
-    decode_func[i] = decode_string
-
-def bdecode(x):
+# Limits for untrusted input (peer metadata, DHT packets)
+MAX_DEPTH = 64
+MAX_DECODE_SIZE = 64 * 1024 * 1024
+
+_D = b'd'[0]
+_L = b'l'[0]
+_E = b'e'[0]
+
+def _decode(x, f, zero_copy=False):
+    """
+    Iterative decoder with an explicit container stack
+
+    Returns (value, next_offset). With zero_copy=True strings are returned
+    as memoryview slices of x instead of bytes copies (dict keys are always
+    bytes).
+    """
+    if type(x) is not bytes:
+        x = bytes(x)
+    if len(x) > MAX_DECODE_SIZE:
+        raise BencodeError("bencoded input too large")
+    view = memoryview(x) if zero_copy else x
+    size = len(x)
+    index = x.index
+    stack = []   # enclosing (container, is_dict, pending_key)
+    top = None   # innermost open list/dict
+    is_dict = False
+    key = None   # pending dict key of top
+    while True:
+        c = x[f]
+        if is_dict:
+            if c == 101:  # end of dict
+                value = top
+                top, is_dict, key = stack.pop()
+                f += 1
+                if top is None:
+                    return value, f
+                if is_dict:
+                    top[key] = value
+                else:
+                    top.append(value)
+                continue
+            if not 48 <= c <= 57:
+                raise BencodeError("dict key is not a string")
+            colon = index(b':', f)
+            n = int(x[f:colon])
+            if c == 48 and colon != f + 1:
+                raise BencodeError("leading zero in string length")
+            f = colon + 1 + n
+            if f > size:
+                raise BencodeError("string exceeds input")
+            key = x[colon + 1:f]
+            c = x[f]
+
+        if 48 <= c <= 57:  # string: <len>:<bytes>
+            colon = index(b':', f)
+            n = int(x[f:colon])
+            if c == 48 and colon != f + 1:
+                raise BencodeError("leading zero in string length")
+            f = colon + 1 + n
+            if f > size:
+                raise BencodeError("string exceeds input")
+            value = view[colon + 1:f]
+        elif c == 105:  # i<int>e
+            end = index(b'e', f)
+            value = int(x[f + 1:end])
+            if x[f + 1] == 45:
+                if x[f + 2] == 48:
+                    raise BencodeError("negative zero")
+            elif x[f + 1] == 48 and end != f + 2:
+                raise BencodeError("leading zero in integer")
+            f = end + 1
+        elif c == 108 or c == 100:  # l / d
+            if len(stack) >= MAX_DEPTH:
+                raise BencodeError("bencoded value nested too deep")
+            stack.append((top, is_dict, key))
+            is_dict = c == 100
+            top = {} if is_dict else []
+            f += 1
+            continue
+        elif c == 101 and top is not None and not is_dict:  # end of list
+            value = top
+            top, is_dict, key = stack.pop()
+            f += 1
+        else:
+            raise BencodeError("unexpected byte in bencoded value")
+
+        if top is None:
+            return value, f
+        if is_dict:
+            top[key] = value
+        else:
+            top.append(value)
+
+def bdecode(x, zero_copy=False):
     try:
-        r, l = decode_func[x[0]](x, 0)
-    except (IndexError, KeyError, ValueError):
+        r, l = _decode(x, 0, zero_copy)
+    except (IndexError, KeyError, ValueError, TypeError):
         raise BencodeError("not a valid bencoded string")
     if l != len(x):
         raise BencodeError("invalid bencoded value (data after valid prefix)")
     return r
 
-def bdecode_safe(x):
+def bdecode_safe(x, zero_copy=False):
     """Returns (decoded_object, length_consumed)"""
     try:
-        r, l = decode_func[x[0]](x, 0)
-        return r, l
-    except (IndexError, KeyError, ValueError):
+        return _decode(x, 0, zero_copy)
+    except (IndexError, KeyError, ValueError, TypeError):
         raise BencodeError("not a valid bencoded string")
 
-def bencode(x):
-    if isinstance(x, int):
-        return b'i' + str(x).encode() + b'e'
+def bdecode_spans(x):
+    """
+    Decode a top-level dict and the byte span of each of its values
+
+    Returns (dict, {key: (start, stop)}). The original encoding of a value
+    can then be sliced out as-is, e.g. to hash a torrent's "info" dict:
+    bencode(bdecode(...)) differs from the file when it has unsorted keys
+    or other non-canonical encodings.
+    """
+    if type(x) is not bytes:
+        x = bytes(x)
+    if not x or x[0] != _D:
+        raise BencodeError("not a bencoded dict")
+    result = {}
+    spans = {}
+    f = 1
+    try:
+        while x[f] != _E:
+            key, f = _decode(x, f)
+            if not isinstance(key, bytes):
+                raise BencodeError("dict key is not a string")
+            start = f
+            result[key], f = _decode(x, f)
+            spans[key] = (start, f)
+    except (IndexError, KeyError, ValueError, TypeError):
+        raise BencodeError("not a valid bencoded string")
+    if f + 1 != len(x):
+        raise BencodeError("invalid bencoded value (data after valid prefix)")
+    return result, spans
+
+def _encode(x, r):
+    """Append the encoding of x to bytearray r"""
+    if isinstance(x, (bytes, bytearray, memoryview)):
+        r += b'%d:' % len(x)
+        r += x
     elif isinstance(x, str):
         x = x.encode('utf-8')
-        return str(len(x)).encode() + b':' + x
-    elif isinstance(x, bytes):
-        return str(len(x)).encode() + b':' + x
-    elif isinstance(x, list) or isinstance(x, tuple):
-        r = b'l'
+        r += b'%d:' % len(x)
+        r += x
+    elif isinstance(x, int):
+        r += b'i%de' % x
+    elif isinstance(x, (list, tuple)):
+        r.append(_L)
         for i in x:
-            r += bencode(i)
-        return r + b'e'
+            _encode(i, r)
+        r.append(_E)
     elif isinstance(x, dict):
-        r = b'd'
         # Convert all keys to bytes and sort by bytes (Bencode spec)
         items = []
         for k, v in x.items():
             if isinstance(k, str):
-                kb = k.encode('utf-8')
-            else:
-                kb = k
-            items.append((kb, v))
-        
+                k = k.encode('utf-8')
+            items.append((k, v))
         items.sort(key=lambda item: item[0])
-        
-        for kb, v in items:
-            r += str(len(kb)).encode() + b':' + kb + bencode(v)
-        return r + b'e'
+        r.append(_D)
+        for k, v in items:
+            r += b'%d:' % len(k)
+            r += k
+            _encode(v, r)
+        r.append(_E)
     else:
         raise BencodeError(f"Cannot bencode type: {type(x)}")
+
+def bencode(x):
+    r = bytearray()
+    _encode(x, r)
+    return bytes(r)
+
+class BDecoder:
+    """
+    Resumable bdecoder for data that arrives in chunks
+
+    feed() buffers a chunk and returns every top-level value completed by it.
+    Parsing resumes where the previous chunk stopped, so nothing is
+    re-scanned. With max_values set, decoding stops after that many values
+    and the remaining bytes are left for unconsumed() (e.g. raw ut_metadata
+    piece data following the bencoded header).
+    """
+
+    def __init__(self, max_values=None):
+        self.max_values = max_values
+        self.values_decoded = 0
+        self.consumed = 0     # bytes taken by completed top-level values
+        self._buf = bytearray()
+        self._pos = 0         # parse position inside _buf
+        self._stack = []      # enclosing (container, is_dict, pending_key)
+        self._top = None
+        self._is_dict = False
+        self._key = None
+
+    @property
+    def done(self):
+        return self.max_values is not None and self.values_decoded >= self.max_values
+
+    def unconsumed(self):
+        """Bytes buffered after the last completed value"""
+        return bytes(self._buf)
+
+    def feed(self, data):
+        if self.done:
+            self._buf += data
+            return []
+        self._buf += data
+        if len(self._buf) > MAX_DECODE_SIZE:
+            raise BencodeError("bencoded input too large")
+        return self._parse()
+
+    def _parse(self):
+        buf = self._buf
+        size = len(buf)
+        f = self._pos
+        stack = self._stack
+        top, is_dict, key = self._top, self._is_dict, self._key
+        out = []
+        while f < size and not self.done:
+            c = buf[f]
+            if 48 <= c <= 57:  # string: <len>:<bytes>
+                colon = buf.find(b':', f, f + 21)
+                if colon < 0:
+                    if size - f > 20:
+                        raise BencodeError("string length too long")
+                    break
+                digits = buf[f:colon]
+                if not digits.isdigit() or (c == 48 and colon != f + 1):
+                    raise BencodeError("malformed string length")
+                end = colon + 1 + int(digits)
+                if end > size:
+                    if end - f > MAX_DECODE_SIZE:
+                        raise BencodeError("string too large")
+                    break
+                value = bytes(buf[colon + 1:end])
+                f = end
+            elif c == 105:  # i<int>e
+                end = buf.find(b'e', f, f + 32)
+                if end < 0:
+                    if size - f >= 32:
+                        raise BencodeError("integer too long")
+                    break
+                digits = buf[f + 1:end]
+                if digits[:1] == b'-':
+                    if digits[1:2] == b'0' or not digits[1:].isdigit():
+                        raise BencodeError("malformed integer")
+                elif not digits.isdigit() or (digits[0] == 48 and len(digits) > 1):
+                    raise BencodeError("malformed integer")
+                value = int(digits)
+                f = end + 1
+            elif c == 108 or c == 100:  # l / d
+                if len(stack) >= MAX_DEPTH:
+                    raise BencodeError("bencoded value nested too deep")
+                stack.append((top, is_dict, key))
+                is_dict = c == 100
+                top = {} if is_dict else []
+                key = None
+                f += 1
+                continue
+            elif c == 101 and top is not None and key is None:  # e
+                value = top
+                top, is_dict, key = stack.pop()
+                f += 1
+            else:
+                raise BencodeError("unexpected byte in bencoded value")
+
+            if top is None:
+                out.append(value)
+                self.values_decoded += 1
+                # Completed values are never looked at again
+                self.consumed += f
+                del buf[:f]
+                size -= f
+                f = 0
+            elif not is_dict:
+                top.append(value)
+            elif key is None:
+                if type(value) is not bytes:
+                    raise BencodeError("dict key is not a string")
+                key = value
+            else:
+                top[key] = value
+                key = None
+
+        self._pos = f
+        self._top, self._is_dict, self._key = top, is_dict, key
+        return out
@@ -0,0 +1,110 @@
+"""
+过期数据清理
+删除入库超过保留期的种子（分块小事务 + 限速，不阻塞爬虫写入），
+文件表已分区（python db_manager.py partition）时直接 DROP PARTITION
+
+使用方法:
+    python cleanup_old_data.py                          # 删除超过 MAX_TORRENT_AGE_DAYS 天的种子
+    python cleanup_old_data.py --days 365               # 自定义保留天数
+    python cleanup_old_data.py --dry-run                # 只统计，不删除
+    python cleanup_old_data.py --cleanup-logs 30        # 同时删除 30 天前的后台操作日志
+    python cleanup_old_data.py --cleanup-keywords       # 同时删除 90 天未搜索的冷门关键词
+    其他选项: --chunk-size N  --sleep 秒  --max-rows N
+
+定时执行见 scheduled_cleanup.sh / scheduled_cleanup.bat
+"""
+import sys
+import os
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.mysql_client import MySQLClient
+from services.retention import RetentionService
+from config.settings import MAX_TORRENT_AGE_DAYS
+
+def parse_args(args):
+    options = {
+        'days': MAX_TORRENT_AGE_DAYS,
+        'chunk_size': None,
+        'sleep': None,
+        'max_rows': None,
+        'dry_run': False,
+        'cleanup_logs': None,
+        'cleanup_keywords': False,
+    }
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == '--days' and args:
+            options['days'] = int(args.pop(0))
+        elif arg == '--chunk-size' and args:
+            options['chunk_size'] = int(args.pop(0))
+        elif arg == '--sleep' and args:
+            options['sleep'] = float(args.pop(0))
+        elif arg == '--max-rows' and args:
+            options['max_rows'] = int(args.pop(0))
+        elif arg == '--dry-run':
+            options['dry_run'] = True
+        elif arg == '--cleanup-logs' and args:
+            options['cleanup_logs'] = int(args.pop(0))
+        elif arg == '--cleanup-keywords':
+            options['cleanup_keywords'] = True
+        else:
+            print(f"❌ 未知参数: {arg}")
+            print(__doc__)
+            sys.exit(1)
+    return options
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    options = parse_args(sys.argv[1:])
+    MySQLClient.initialize()
+    start = time.time()
+    ok = True
+
+    print("=" * 50)
+    print(f"清理入库超过 {options['days']} 天的种子{'（仅统计）' if options['dry_run'] else ''}")
+    print("=" * 50)
+    try:
+        stats = RetentionService.purge_torrents(
+            options['days'],
+            chunk_size=options['chunk_size'],
+            sleep=options['sleep'],
+            max_rows=options['max_rows'],
+            dry_run=options['dry_run'],
+            progress=lambda n: print(f"  已删除 {n:,} 个种子", end='\r'),
+        )
+        print(f"\n✅ 种子: {stats['torrents']:,} 个（早于 {stats['cutoff']:%Y-%m-%d %H:%M}）")
+        if stats['partitioned']:
+            dropped = ', '.join(f"{t}.{p}" for t, p in stats['partitions']) or '无'
+            print(f"✅ 过期分区: {dropped}")
+            if stats.get('partitions_added'):
+                print(f"✅ 新建分区: {stats['partitions_added']} 个")
+    except Exception as e:
+        print(f"\n❌ 种子清理失败: {e}")
+        ok = False
+
+    if options['cleanup_logs'] is not None and not options['dry_run']:
+        try:
+            count = RetentionService.purge_admin_logs(options['cleanup_logs'], options['chunk_size'], options['sleep'])
+            print(f"✅ 后台操作日志: 删除 {count:,} 条（{options['cleanup_logs']} 天前）")
+        except Exception as e:
+            print(f"❌ 日志清理失败: {e}")
+            ok = False
+
+    if options['cleanup_keywords'] and not options['dry_run']:
+        try:
+            count = RetentionService.purge_keywords(chunk_size=options['chunk_size'], sleep=options['sleep'])
+            print(f"✅ 冷门关键词: 删除 {count:,} 个")
+        except Exception as e:
+            print(f"❌ 关键词清理失败: {e}")
+            ok = False
+
+    print(f"耗时: {time.time() - start:.0f}s")
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -40,12 +40,49 @@ MAX_NODE_QSIZE = int(get_env('MAX_NODE_QSIZE', '500'))
 METADATA_WORKERS = int(get_env('METADATA_WORKERS', '400'))
 METADATA_TIMEOUT = int(get_env('METADATA_TIMEOUT', '6'))
 
+# find_node 发送速率控制（每个 DHT 服务进程）
+FIND_NODE_RATE = float(get_env('FIND_NODE_RATE', '500'))                  # 全局包/秒预算
+FIND_NODE_BURST = int(get_env('FIND_NODE_BURST', '100'))                  # 突发上限
+FIND_NODE_MIN_INTERVAL = float(get_env('FIND_NODE_MIN_INTERVAL', '1.0'))  # 同一 IP 最小发送间隔（秒）
+
+# DHT 查询热度（count-min sketch）
+DEMAND_FLUSH_SEC = int(get_env('DEMAND_FLUSH_SEC', '300'))           # 写入数据库间隔（秒）
+DEMAND_HALF_LIFE_SEC = int(get_env('DEMAND_HALF_LIFE_SEC', '21600'))  # 热度半衰期（秒）
+
+# Swarm 规模估计（每个 infohash 一个 HyperLogLog）
+SWARM_FLUSH_SEC = int(get_env('SWARM_FLUSH_SEC', '300'))   # 写入数据库间隔（秒）
+SWARM_MEMORY_MB = int(get_env('SWARM_MEMORY_MB', '64'))    # 内存上限（MB），超出后淘汰最久未更新的
+
 # ============================================
 # 数据库写入配置
 # ============================================
 DB_BATCH_SIZE = int(get_env('DB_BATCH_SIZE', '100'))
 DB_BATCH_TIMEOUT = int(get_env('DB_BATCH_TIMEOUT', '10'))
 DB_WRITER_WORKERS = int(get_env('DB_WRITER_WORKERS', '4'))
+DB_WRITER_LRU_SIZE = int(get_env('DB_WRITER_LRU_SIZE', '200000'))   # 每个写入进程本地记住的最近哈希数
+
+# 主键模式: uuid（CHAR(36)/CHAR(40)）或 compact（BINARY(16)/BINARY(20)，需先执行 db_manager.py migrate-keys）
+DB_KEY_MODE = get_env('DB_KEY_MODE', 'uuid')
+
+# 文件列表存储: rows（逐行 torrent_files）/ blob（压缩 blob）/ auto（文件数达到阈值时用 blob）
+FILE_STORAGE_MODE = get_env('FILE_STORAGE_MODE', 'auto')
+FILE_BLOB_MIN_FILES = int(get_env('FILE_BLOB_MIN_FILES', '500'))
+# 文件名词表（torrent_file_terms，scope=files 搜索）每个种子最多保存的字符数
+FILE_TERMS_MAX_CHARS = int(get_env('FILE_TERMS_MAX_CHARS', '8000'))
+
+# 重复 announce 聚合（主进程按窗口合并，写入进程按哈希批量 UPDATE）
+ANNOUNCE_FLUSH_SEC = int(get_env('ANNOUNCE_FLUSH_SEC', '60'))     # 刷新间隔（秒）
+SOURCE_IPS_MAX = int(get_env('SOURCE_IPS_MAX', '20'))             # source_ips 最多保留的 IP 数
+
+# 本地 spool（数据库慢或不可用时先追加到本地分段文件，恢复后回放）
+SPOOL_DIR = get_env('SPOOL_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'spool'))
+SPOOL_SEGMENT_MB = int(get_env('SPOOL_SEGMENT_MB', '64'))           # 单个段文件大小（MB）
+SPOOL_MAX_GB = int(get_env('SPOOL_MAX_GB', '10'))                   # spool 总大小上限（GB），超出后丢弃
+SPOOL_FSYNC = get_env('SPOOL_FSYNC', 'true').lower() == 'true'      # 每次追加后 fsync
+SPOOL_REPLAY_BATCH = int(get_env('SPOOL_REPLAY_BATCH', '500'))      # 每次回放条数
+DB_SLOW_SEC = float(get_env('DB_SLOW_SEC', '5'))                    # 单批写入超过该耗时视为数据库变慢
+DB_RETRY_SEC = float(get_env('DB_RETRY_SEC', '5'))                  # 转写 spool 的初始冷却时间（秒）
+DB_RETRY_MAX_SEC = float(get_env('DB_RETRY_MAX_SEC', '120'))        # 冷却时间上限（指数退避）
 
 # ============================================
 # 数据过滤配置
@@ -53,8 +90,51 @@ DB_WRITER_WORKERS = int(get_env('DB_WRITER_WORKERS', '4'))
 MAX_TORRENT_AGE_DAYS = int(get_env('MAX_TORRENT_AGE_DAYS', '730'))
 MIN_HEALTH_SCORE = int(get_env('MIN_HEALTH_SCORE', '5'))
 
+# 过期数据清理（cleanup_old_data.py，超过 MAX_TORRENT_AGE_DAYS 的种子）
+RETENTION_CHUNK = int(get_env('RETENTION_CHUNK', '500'))                      # 每个删除事务的种子数
+RETENTION_SLEEP_SEC = float(get_env('RETENTION_SLEEP_SEC', '0.5'))            # 块之间最少休眠（秒）
+RETENTION_PARTITIONS_AHEAD = int(get_env('RETENTION_PARTITIONS_AHEAD', '3'))  # 分区表提前创建的月份数
+
 # ============================================
 # Redis 缓存配置
 # ============================================
 CACHE_HASH_TTL = int(get_env('CACHE_HASH_TTL', '604800'))
 CACHE_HOT_TORRENTS_SIZE = int(get_env('CACHE_HOT_TORRENTS_SIZE', '100'))
+
+# 浏览/搜索计数缓冲（先累加在 Redis，由 API 定期批量写回 MySQL）
+COUNTER_FLUSH_SEC = int(get_env('COUNTER_FLUSH_SEC', '30'))         # 写回间隔（秒）
+COUNTER_FLUSH_BATCH = int(get_env('COUNTER_FLUSH_BATCH', '500'))    # 每批 UPDATE 行数
+
+# 搜索分页: 超过该页码必须使用游标（keyset）翻页
+SEARCH_MAX_PAGE = int(get_env('SEARCH_MAX_PAGE', '10'))
+
+# 搜索后端: mysql（ngram FULLTEXT）/ index（内置倒排索引，workers/search_index.py 维护）
+SEARCH_BACKEND = get_env('SEARCH_BACKEND', 'mysql')
+INDEX_DIR = get_env('INDEX_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'search_index'))
+INDEX_FLUSH_SEC = int(get_env('INDEX_FLUSH_SEC', '60'))             # 写入进程把新种子写成段的间隔（秒）
+INDEX_SEGMENT_DOCS = int(get_env('INDEX_SEGMENT_DOCS', '50000'))    # 单个新段最多文档数
+INDEX_MERGE_FACTOR = int(get_env('INDEX_MERGE_FACTOR', '10'))       # 同一层级的段达到该数量时合并
+INDEX_MERGE_SEC = int(get_env('INDEX_MERGE_SEC', '60'))             # 合并检查间隔（秒）
+INDEX_REFRESH_SEC = int(get_env('INDEX_REFRESH_SEC', '5'))          # API 重新扫描段目录的间隔（秒）
+INDEX_CANDIDATES = int(get_env('INDEX_CANDIDATES', '5000'))         # 每次从索引取的候选数
+
+# 搜索结果缓存（按排序方式设置 TTL，屏蔽种子/批量导入后整体失效）
+SEARCH_CACHE_ENABLED = get_env('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+SEARCH_CACHE_TTL_TIME = int(get_env('SEARCH_CACHE_TTL_TIME', '60'))      # 按时间排序（秒）
+SEARCH_CACHE_TTL_HOT = int(get_env('SEARCH_CACHE_TTL_HOT', '300'))       # 按热度/健康度排序（秒）
+SEARCH_CACHE_TTL = int(get_env('SEARCH_CACHE_TTL', '900'))               # 按相关度/大小排序（秒）
+SEARCH_CACHE_MAX_PAGE = int(get_env('SEARCH_CACHE_MAX_PAGE', '10'))      # 只缓存前 N 页
+SEARCH_COUNT_CAP = int(get_env('SEARCH_COUNT_CAP', '10000'))            # 总数最多数到 N，超过显示 "N+"
+SEARCH_COUNT_TTL = int(get_env('SEARCH_COUNT_TTL', '3600'))             # 总数缓存时间（秒）
+
+# 搜索建议（/api/suggest，API 进程内的前缀索引，由 search_keywords 定期重建）
+SUGGEST_TOP_N = int(get_env('SUGGEST_TOP_N', '50000'))                   # 索引的关键词数（按搜索次数）
+SUGGEST_MIN_COUNT = int(get_env('SUGGEST_MIN_COUNT', '2'))               # 至少被搜索过几次才作为建议
+SUGGEST_LIMIT = int(get_env('SUGGEST_LIMIT', '10'))                      # 每个前缀最多返回的建议数
+SUGGEST_REFRESH_SEC = int(get_env('SUGGEST_REFRESH_SEC', '300'))         # 重建间隔（秒）
+
+# 热度评分（workers/hot_score.py）
+HOT_SCORE_INTERVAL_SEC = int(get_env('HOT_SCORE_INTERVAL_SEC', '300'))   # 评分间隔（秒）
+HOT_SCORE_CHUNK = int(get_env('HOT_SCORE_CHUNK', '2000'))                # 每块行数（按主键 keyset）
+HOT_SCORE_MAX_CHUNKS = int(get_env('HOT_SCORE_MAX_CHUNKS', '500'))       # 每次最多处理的块数，剩余下次继续
+HOT_HALF_LIFE_SEC = int(get_env('HOT_HALF_LIFE_SEC', '172800'))          # 热度半衰期（秒）
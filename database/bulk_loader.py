@@ -0,0 +1,344 @@
+"""
+批量导入
+把种子记录规范化后写成 TSV 分块文件，用 LOAD DATA LOCAL INFILE 并行导入，
+导入期间去掉二级索引和全文索引，导入后一次性重建
+
+输入:
+    *.seg      - 写入进程的 spool 段文件
+    *.torrent  - 种子文件
+    目录       - 递归查找以上两种文件
+
+服务端需要开启 local_infile（SET GLOBAL local_infile = 1）。
+"""
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bencode import bdecode_spans, BencodeError
+from database import keys
+from services.torrent_service import (
+    TorrentService, TORRENT_COLUMNS, FILE_COLUMNS, FILE_LIST_COLUMNS, FILE_TERMS_COLUMNS
+)
+from workers.spool import iter_segment
+
+logger = logging.getLogger(__name__)
+
+# 导入的表: 表名 -> 列
+TABLES = {
+    'torrents': TORRENT_COLUMNS,
+    'torrent_files': FILE_COLUMNS,
+    'torrent_file_lists': FILE_LIST_COLUMNS,
+    'torrent_file_terms': FILE_TERMS_COLUMNS,
+}
+
+# 导入期间保留的索引（主键、唯一键，以及外键依赖的索引）
+KEEP_INDEXES = {'PRIMARY', 'info_hash', 'idx_torrent_id'}
+
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+def tsv_value(value):
+    """按 LOAD DATA 默认格式编码一个字段（bytes 以十六进制写出，导入时 UNHEX）"""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return '1'
+    if value is False:
+        return '0'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, str):
+        return value.translate(_ESCAPES)
+    return str(value)
+
+def iter_records(paths):
+    """按批产出 (metadata, info_hash, source_ip, event_type)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names))
+        else:
+            files.append(path)
+    for path in files:
+        if path.endswith('.seg'):
+            for items in iter_segment(path):
+                yield [item for item in items if item[3] not in (b"demand", b"swarm", b"announce")]
+        elif path.endswith('.torrent'):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                torrent, spans = bdecode_spans(data)
+                info = torrent[b'info']
+                # infohash 是文件中 info 原始字节的 SHA-1（不重新编码，非规范编码的种子也能对上）
+                start, stop = spans[b'info']
+                yield [(info, hashlib.sha1(data[start:stop]).hexdigest(), None, b"import")]
+            except (BencodeError, KeyError, TypeError, OSError) as e:
+                logger.warning(f"Skipping unreadable torrent file {path}: {e}")
+
+class _ChunkWriter:
+    """某张表的 TSV 分块文件，写满 chunk_rows 行后交给 submit"""
+
+    def __init__(self, table, tmpdir, chunk_rows, submit):
+        self.table = table
+        self.tmpdir = tmpdir
+        self.chunk_rows = chunk_rows
+        self.submit = submit
+        self.binary = None   # 含 bytes 值的列下标（第一行确定）
+        self._file = None
+        self._rows = 0
+        self._seq = 0
+
+    def write(self, row):
+        if self.binary is None:
+            self.binary = frozenset(i for i, v in enumerate(row) if isinstance(v, (bytes, bytearray, memoryview)))
+        if self._file is None:
+            self._seq += 1
+            path = os.path.join(self.tmpdir, f"{self.table}-{self._seq:06d}.tsv")
+            self._file = open(path, 'w', encoding='utf-8', newline='\n')
+        self._file.write('\t'.join(tsv_value(v) for v in row))
+        self._file.write('\n')
+        self._rows += 1
+        if self._rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self._file is not None:
+            path = self._file.name
+            self._file.close()
+            self._file = None
+            self._rows = 0
+            self.submit(self.table, path, self.binary or frozenset())
+
+class BulkLoader:
+    """
+    LOAD DATA 批量导入器
+
+    参数:
+        connect: callable - 返回新的 pymysql 连接（需 local_infile=True）
+        workers: int - 并行导入的连接数
+        chunk_rows: int - 每个 TSV 分块的行数
+        defer_indexes: bool - 导入前删除二级索引，导入后重建
+    """
+
+    def __init__(self, connect, workers=4, chunk_rows=200000, defer_indexes=True):
+        self.connect = connect
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.defer_indexes = defer_indexes
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pending = threading.Semaphore(workers * 2)   # 限制待导入分块数（磁盘占用）
+        self.loaded = {table: 0 for table in TABLES}
+        self.errors = 0
+
+    # ---------- 连接与导入 ----------
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            with conn.cursor() as cursor:
+                cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+                cursor.execute("SET UNIQUE_CHECKS = 0")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _load_chunk(self, table, path, binary):
+        try:
+            columns = TABLES[table]
+            targets = [f"@v{i}" if i in binary else col for i, col in enumerate(columns)]
+            sets = [f"{columns[i]} = UNHEX(@v{i})" for i in sorted(binary)]
+            sql = (
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                f"CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({', '.join(targets)})"
+                + (f" SET {', '.join(sets)}" if sets else "")
+            )
+            conn = self._connection()
+            with conn.cursor() as cursor:
+                rows = cursor.execute(sql, (path,))
+            conn.commit()
+            with self._lock:
+                self.loaded[table] += rows
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.error(f"LOAD DATA failed for {path}: {e}")
+            print(f"❌ 导入分块失败 {os.path.basename(path)}: {e}")
+            return
+        finally:
+            self._pending.release()
+        os.remove(path)
+
+    # ---------- 索引 ----------
+
+    def _secondary_indexes(self, cursor, table):
+        """返回 [(索引名, ADD 子句)]，用于导入后重建"""
+        cursor.execute(
+            """
+            SELECT INDEX_NAME, NON_UNIQUE, INDEX_TYPE, COLUMN_NAME, SUB_PART, COLLATION
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY INDEX_NAME, SEQ_IN_INDEX
+            """,
+            (table,)
+        )
+        indexes = {}
+        for name, non_unique, index_type, column, sub_part, collation in cursor.fetchall():
+            if name in KEEP_INDEXES or not non_unique:
+                continue
+            part = column + (f"({sub_part})" if sub_part else "") + (" DESC" if collation == 'D' else "")
+            entry = indexes.setdefault(name, {'type': index_type, 'parts': []})
+            entry['parts'].append(part)
+        result = []
+        for name, entry in indexes.items():
+            if entry['type'] == 'FULLTEXT':
+                clause = f"ADD FULLTEXT INDEX {name} ({', '.join(entry['parts'])}) WITH PARSER ngram"
+            else:
+                clause = f"ADD INDEX {name} ({', '.join(entry['parts'])})"
+            result.append((name, clause))
+        return result
+
+    def _drop_indexes(self):
+        dropped = {}
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                for table in TABLES:
+                    indexes = self._secondary_indexes(cursor, table)
+                    if indexes:
+                        cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"DROP INDEX {n}" for n, _ in indexes))
+                        dropped[table] = indexes
+                        print(f"🔧 {table}: 暂时删除索引 {', '.join(n for n, _ in indexes)}")
+            conn.commit()
+        finally:
+            conn.close()
+        return dropped
+
+    def _rebuild_indexes(self, dropped):
+        def rebuild(table, indexes):
+            conn = self.connect()
+            try:
+                start = time.time()
+                with conn.cursor() as cursor:
+                    cursor.execute(f"ALTER TABLE {table} " + ", ".join(c for _, c in indexes))
+                    cursor.execute(f"ANALYZE TABLE {table}")
+                conn.commit()
+                print(f"✅ {table}: 索引重建完成 ({time.time() - start:.0f}s)")
+            finally:
+                conn.close()
+        # 每张表一条 ALTER（只重建一次），多张表并行
+        with ThreadPoolExecutor(max_workers=max(len(dropped), 1)) as pool:
+            for future in [pool.submit(rebuild, t, idx) for t, idx in dropped.items()]:
+                future.result()
+
+    # ---------- 主流程 ----------
+
+    def _existing_hashes(self, cursor, hashes):
+        placeholders = ','.join(['%s'] * len(hashes))
+        cursor.execute(
+            f"SELECT info_hash FROM torrents WHERE info_hash IN ({placeholders})",
+            [keys.db_hash(h) for h in hashes]
+        )
+        return {keys.hash_str(r[0]) for r in cursor.fetchall()}
+
+    def run(self, paths):
+        """
+        导入 paths 中的所有记录
+
+        返回:
+            dict: 各表导入行数与统计
+        """
+        start = time.time()
+        tmpdir = tempfile.mkdtemp(prefix='dht_bulk_')
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        futures = []
+
+        def submit(table, path, binary):
+            self._pending.acquire()
+            futures.append(pool.submit(self._load_chunk, table, path, binary))
+
+        writers = {table: _ChunkWriter(table, tmpdir, self.chunk_rows, submit) for table in TABLES}
+        seen = set()           # 本次导入已出现的哈希（20 字节）
+        stats = {'records': 0, 'duplicates': 0, 'filtered': 0}
+        dropped = {}
+        check_conn = self.connect()
+        try:
+            with check_conn.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM torrents LIMIT 1")
+                check_existing = cursor.fetchone() is not None
+            if self.defer_indexes:
+                dropped = self._drop_indexes()
+
+            now = datetime.now()
+            for items in iter_records(paths):
+                fresh = []
+                for metadata, info_hash, source_ip, _ in items:
+                    stats['records'] += 1
+                    key = bytes.fromhex(info_hash)
+                    if key in seen:
+                        stats['duplicates'] += 1
+                        continue
+                    seen.add(key)
+                    fresh.append((metadata, info_hash, source_ip))
+                if fresh and check_existing:
+                    with check_conn.cursor() as cursor:
+                        existing = self._existing_hashes(cursor, [r[1] for r in fresh])
+                    stats['duplicates'] += len(existing)
+                    fresh = [r for r in fresh if r[1] not in existing]
+                for metadata, info_hash, source_ip in fresh:
+                    try:
+                        prepared = TorrentService.prepare_torrent(metadata, info_hash, source_ip, now)
+                    except Exception as e:
+                        logger.debug(f"Skipping {info_hash}: {e}")
+                        prepared = None
+                    if prepared is None:
+                        stats['filtered'] += 1
+                        continue
+                    torrent_row, file_rows, file_list_row, file_terms_row = prepared
+                    writers['torrents'].write(torrent_row)
+                    for row in file_rows:
+                        writers['torrent_files'].write(row)
+                    if file_list_row is not None:
+                        writers['torrent_file_lists'].write(file_list_row)
+                    if file_terms_row is not None:
+                        writers['torrent_file_terms'].write(file_terms_row)
+                if stats['records'] % 100000 < len(items):
+                    print(f"  已解析 {stats['records']} 条，已导入 {self.loaded['torrents']} 个种子", end='\r')
+
+            for writer in writers.values():
+                writer.flush()
+            for future in futures:
+                future.result()
+        finally:
+            pool.shutdown(wait=True)
+            check_conn.close()
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            if dropped:
+                print("\n🔧 重建索引...")
+                self._rebuild_indexes(dropped)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        stats.update({f"{t}_rows": n for t, n in self.loaded.items()})
+        stats['chunk_errors'] = self.errors
+        stats['seconds'] = round(time.time() - start, 1)
+        return stats
@@ -0,0 +1,63 @@
+"""
+主键与 info_hash 编码
+
+两种表结构模式（DB_KEY_MODE）:
+    uuid    - id 为 CHAR(36) 字符串，info_hash 为 CHAR(40) 十六进制（默认）
+    compact - id 为 BINARY(16)，info_hash 为 BINARY(20)（db_manager.py migrate-keys）
+
+两种模式下新 id 都是时间有序的 UUIDv7，InnoDB 聚簇索引按顺序追加写入。
+服务层和 API 始终使用字符串形式，读写数据库时在这里转换。
+"""
+import os
+import time
+import uuid
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import DB_KEY_MODE
+
+COMPACT = DB_KEY_MODE == 'compact'
+
+# 查询结果中需要转换的列名
+KEY_COLUMNS = ('id', 'torrent_id', 'info_hash')
+
+def new_id():
+    """生成时间有序的 UUIDv7 字符串（48 位毫秒时间戳 + 随机数）"""
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)   # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)   # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+def db_id(value):
+    """UUID 字符串 -> 数据库参数"""
+    if value is None or not COMPACT or isinstance(value, bytes):
+        return value
+    return uuid.UUID(value).bytes
+
+def db_hash(value):
+    """40 位十六进制 info_hash -> 数据库参数"""
+    if value is None or not COMPACT or isinstance(value, bytes):
+        return value
+    return bytes.fromhex(value)
+
+def id_str(value):
+    """数据库中的 id -> UUID 字符串"""
+    if isinstance(value, (bytes, bytearray)):
+        return str(uuid.UUID(bytes=bytes(value)))
+    return value
+
+def hash_str(value):
+    """数据库中的 info_hash -> 40 位十六进制"""
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return value
+
+def decode_row(row):
+    """把查询结果中的二进制 id / info_hash 转成字符串（原地修改）"""
+    if row:
+        for col in KEY_COLUMNS:
+            value = row.get(col)
+            if isinstance(value, (bytes, bytearray)):
+                row[col] = value.hex() if len(value) == 20 else id_str(value)
+    return row
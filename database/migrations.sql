@@ -18,3 +18,42 @@ USE dht_crawler;
 
 -- 在这里添加你的迁移语句
 -- ...
+
+-- DHT 查询热度（count-min sketch 估计值）
+ALTER TABLE torrents ADD COLUMN dht_demand INT DEFAULT 0 COMMENT 'DHT 查询热度（衰减计数）' AFTER hot_score;
+
+-- Swarm 规模估计（HyperLogLog 去重 Peer IP）
+ALTER TABLE torrents ADD COLUMN peer_count INT DEFAULT 0 COMMENT '估计 Peer 数（HyperLogLog）' AFTER health_score;
+
+-- 压缩文件列表表（大型多文件种子）
+CREATE TABLE IF NOT EXISTS torrent_file_lists (
+    torrent_id CHAR(36) PRIMARY KEY COMMENT '种子 ID',
+    file_count INT NOT NULL COMMENT '文件数量',
+    block_size INT NOT NULL COMMENT '每个压缩块的文件数',
+    block_count INT NOT NULL COMMENT '压缩块数量',
+    summary JSON COMMENT '摘要（最大文件、扩展名统计）',
+    data LONGBLOB NOT NULL COMMENT '分块压缩的文件树',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    FOREIGN KEY (torrent_id) REFERENCES torrents(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='压缩文件列表表';
+
+-- 分类筛选索引（category / quality / codec / language 由 TorrentClassifier 填充，
+-- 存量数据用 python admin_cli.py classify 回填）
+CREATE INDEX idx_quality ON torrents(quality, codec);
+CREATE INDEX idx_language ON torrents(language);
+
+-- 热度评分状态（services/hot_score.py，指数衰减）
+ALTER TABLE torrents ADD COLUMN hot_activity DOUBLE DEFAULT 0 COMMENT '衰减后的访问热度（hot_score 的计数部分）' AFTER dht_demand;
+ALTER TABLE torrents ADD COLUMN hot_total BIGINT DEFAULT 0 COMMENT '上次评分时的加权计数总和' AFTER hot_activity;
+ALTER TABLE torrents ADD COLUMN hot_scored_at DATETIME COMMENT '上次评分时间' AFTER hot_total;
+
+-- 过期数据清理按 created_at 分块删除
+CREATE INDEX idx_created_at ON torrents(created_at);
+
+-- 文件名词表（每个多文件种子一行，scope=files 搜索；存量数据用 python admin_cli.py index-files 回填）
+CREATE TABLE IF NOT EXISTS torrent_file_terms (
+    torrent_id CHAR(36) PRIMARY KEY COMMENT '种子 ID',
+    terms TEXT NOT NULL COMMENT '文件名中的词（小写去重，空格分隔）',
+    FOREIGN KEY (torrent_id) REFERENCES torrents(id) ON DELETE CASCADE,
+    FULLTEXT INDEX ft_terms (terms) WITH PARSER ngram
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='文件名词表';
@@ -15,6 +15,7 @@ from config.settings import (
     MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD,
     MYSQL_DATABASE, MYSQL_CHARSET, MYSQL_POOL_SIZE, MYSQL_MAX_OVERFLOW
 )
+from database import keys
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +68,43 @@ class MySQLClient:
         finally:
             conn.close()
     
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """单连接事务（上下文管理器），返回游标，正常退出时提交，异常时回滚"""
+        with cls.get_connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+
+    @staticmethod
+    def insert_rows(cursor, table, columns, rows, chunk_size=500, suffix=""):
+        """
+        多行 INSERT：每 chunk_size 行拼成一条 INSERT ... VALUES (...), (...)
+
+        参数:
+            cursor: 游标（通常来自 transaction()）
+            table: str - 表名
+            columns: tuple - 列名
+            rows: list[tuple] - 行数据，顺序与 columns 一致
+            chunk_size: int - 每条语句的行数
+            suffix: str - 追加在 VALUES 之后（如 ON DUPLICATE KEY UPDATE ...）
+        """
+        if not rows:
+            return 0
+        row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        count = 0
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            params = [v for row in chunk for v in row]
+            count += cursor.execute(prefix + ", ".join([row_sql] * len(chunk)) + suffix, params)
+        return count
+
+    @staticmethod
+    def is_unavailable(error):
+        """是否为连接 / 超时类错误（数据库不可用，而不是数据本身的问题）"""
+        return isinstance(error, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+
     @classmethod
     def execute(cls, sql, params=None):
         """执行 SQL 语句"""
@@ -85,16 +123,21 @@ class MySQLClient:
     
     @classmethod
     def fetch_one(cls, sql, params=None):
-        """查询单条记录"""
+        """查询单条记录（id / info_hash 以字符串返回）"""
         with cls.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(sql, params or ())
-                return cursor.fetchone()
+                row = cursor.fetchone()
+                return keys.decode_row(row) if keys.COMPACT else row
     
     @classmethod
     def fetch_all(cls, sql, params=None):
-        """查询多条记录"""
+        """查询多条记录（id / info_hash 以字符串返回）"""
         with cls.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(sql, params or ())
-                return cursor.fetchall()
+                rows = cursor.fetchall()
+                if keys.COMPACT:
+                    for row in rows:
+                        keys.decode_row(row)
+                return rows
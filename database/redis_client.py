@@ -6,6 +6,7 @@ from redis import ConnectionPool
 import logging
 import sys
 import os
+import uuid
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -21,6 +22,10 @@ REDIS_KEY_PREFIX = "dhtsearch:"
 class RedisClient:
     _pool = None
     _client = None
+
+    # Only touch the lock while it still holds our token (it may have expired and been taken by another process)
+    _RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    _EXTEND_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end return 0"
     
     @classmethod
     def initialize(cls):
@@ -64,6 +69,26 @@ class RedisClient:
         key = f"{REDIS_KEY_PREFIX}dht:hash:{info_hash}"
         client.setex(key, ttl, 1)
 
+    @classmethod
+    def exists_hashes(cls, info_hashes):
+        """Check many hashes in one pipeline, returns a list of bools"""
+        if not info_hashes:
+            return []
+        pipe = cls.get_client().pipeline(transaction=False)
+        for info_hash in info_hashes:
+            pipe.exists(f"{REDIS_KEY_PREFIX}dht:hash:{info_hash}")
+        return [bool(r) for r in pipe.execute()]
+
+    @classmethod
+    def set_hashes(cls, info_hashes, ttl=604800):
+        """Set many hashes (7-day TTL) in one pipeline"""
+        if not info_hashes:
+            return
+        pipe = cls.get_client().pipeline(transaction=False)
+        for info_hash in info_hashes:
+            pipe.setex(f"{REDIS_KEY_PREFIX}dht:hash:{info_hash}", ttl, 1)
+        pipe.execute()
+
     @classmethod
     def add_hot_torrent(cls, torrent_id, hot_score):
         """Add to hot torrent list"""
@@ -81,3 +106,32 @@ class RedisClient:
         client.lpush(key, torrent_id)
         # Keep only first 1000
         client.ltrim(key, 0, 999)
+
+    @classmethod
+    def add_recent_torrents(cls, torrent_ids):
+        """Add many torrents to the recent list in one round trip"""
+        if not torrent_ids:
+            return
+        key = f"{REDIS_KEY_PREFIX}dht:recent:torrents"
+        pipe = cls.get_client().pipeline(transaction=False)
+        pipe.lpush(key, *torrent_ids)
+        pipe.ltrim(key, 0, 999)
+        pipe.execute()
+
+    @classmethod
+    def acquire_lock(cls, key, ttl):
+        """Take a lock with a TTL, returns its random token or None when someone else holds it"""
+        token = uuid.uuid4().hex
+        if cls.get_client().set(key, token, nx=True, ex=ttl):
+            return token
+        return None
+
+    @classmethod
+    def extend_lock(cls, key, token, ttl):
+        """Reset the lock TTL, returns False when the lock is no longer ours"""
+        return bool(cls.get_client().eval(cls._EXTEND_LOCK, 1, key, token, ttl))
+
+    @classmethod
+    def release_lock(cls, key, token):
+        """Delete the lock only if it still holds our token"""
+        cls.get_client().eval(cls._RELEASE_LOCK, 1, key, token)
@@ -8,6 +8,10 @@ CREATE DATABASE IF NOT EXISTS dht_crawler DEFAULT CHARACTER SET utf8mb4 COLLATE
 
 USE dht_crawler;
 
+-- 主键模式: 本脚本为 uuid 模式（CHAR(36) id / CHAR(40) info_hash）。
+-- compact 模式（BINARY(16) / BINARY(20)）由 db_manager.py migrate-keys 转换，
+-- 设置 DHT_DB_KEY_MODE=compact 后 init 会自动执行。
+
 -- 种子主表
 CREATE TABLE IF NOT EXISTS torrents (
     -- 主键和唯一标识
@@ -36,12 +40,17 @@ CREATE TABLE IF NOT EXISTS torrents (
     
     -- 健康度评分
     health_score DECIMAL(5,2) DEFAULT 0 COMMENT '健康度评分 0-100',
+    peer_count INT DEFAULT 0 COMMENT '估计 Peer 数（HyperLogLog）',
     
     -- 热度统计
     search_count INT DEFAULT 0 COMMENT '搜索次数',
     download_count INT DEFAULT 0 COMMENT '下载次数',
     view_count INT DEFAULT 0 COMMENT '浏览次数',
     hot_score DECIMAL(10,2) DEFAULT 0 COMMENT '热度评分',
+    dht_demand INT DEFAULT 0 COMMENT 'DHT 查询热度（衰减计数）',
+    hot_activity DOUBLE DEFAULT 0 COMMENT '衰减后的访问热度（hot_score 的计数部分）',
+    hot_total BIGINT DEFAULT 0 COMMENT '上次评分时的加权计数总和',
+    hot_scored_at DATETIME COMMENT '上次评分时间',
     
     -- 分类和标签
     category VARCHAR(50) COMMENT '分类',
@@ -74,7 +83,10 @@ CREATE TABLE IF NOT EXISTS torrents (
     INDEX idx_health_score (health_score DESC),
     INDEX idx_hot_score (hot_score DESC),
     INDEX idx_last_seen (last_seen DESC),
+    INDEX idx_created_at (created_at),
     INDEX idx_category (category, sub_category),
+    INDEX idx_quality (quality, codec),
+    INDEX idx_language (language),
     INDEX idx_name (name(100)),
     FULLTEXT INDEX ft_name (name, name_utf8) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='种子主表';
@@ -101,6 +113,28 @@ CREATE TABLE IF NOT EXISTS torrent_files (
     INDEX idx_extension (file_extension)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='文件列表表';
 
+-- 压缩文件列表表（大型多文件种子，替代逐行 torrent_files）
+CREATE TABLE IF NOT EXISTS torrent_file_lists (
+    torrent_id CHAR(36) PRIMARY KEY COMMENT '种子 ID',
+    file_count INT NOT NULL COMMENT '文件数量',
+    block_size INT NOT NULL COMMENT '每个压缩块的文件数',
+    block_count INT NOT NULL COMMENT '压缩块数量',
+    summary JSON COMMENT '摘要（最大文件、扩展名统计）',
+    data LONGBLOB NOT NULL COMMENT '分块压缩的文件树',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    
+    FOREIGN KEY (torrent_id) REFERENCES torrents(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='压缩文件列表表';
+
+-- 文件名词表（每个多文件种子一行，scope=files 搜索；存量数据用 python admin_cli.py index-files 回填）
+CREATE TABLE IF NOT EXISTS torrent_file_terms (
+    torrent_id CHAR(36) PRIMARY KEY COMMENT '种子 ID',
+    terms TEXT NOT NULL COMMENT '文件名中的词（小写去重，空格分隔）',
+    
+    FOREIGN KEY (torrent_id) REFERENCES torrents(id) ON DELETE CASCADE,
+    FULLTEXT INDEX ft_terms (terms) WITH PARSER ngram
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='文件名词表';
+
 -- 搜索关键词表
 CREATE TABLE IF NOT EXISTS search_keywords (
     id CHAR(36) PRIMARY KEY COMMENT 'UUID',
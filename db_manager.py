@@ -7,6 +7,10 @@
     python db_manager.py reset         # 重置数据库（删除所有数据）
     python db_manager.py drop          # 删除数据库
     python db_manager.py migrate       # 迁移数据库（更新表结构）
+    python db_manager.py migrate-keys  # 主键改为紧凑二进制格式（BINARY(16) id / BINARY(20) info_hash）
+    python db_manager.py partition     # 文件表按月分区（过期数据 DROP PARTITION）
+    python db_manager.py bulk-load <路径...> [--workers N] [--chunk-rows N] [--keep-indexes]
+                                       # 批量导入 spool 段文件 / .torrent 文件（LOAD DATA）
     python db_manager.py backup        # 备份数据库
     python db_manager.py test          # 测试数据库连接
 """
@@ -22,9 +26,24 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from config.settings import (
     MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD,
     MYSQL_DATABASE, MYSQL_CHARSET,
-    REDIS_HOST, REDIS_PORT, REDIS_PASSWORD, REDIS_DB
+    REDIS_HOST, REDIS_PORT, REDIS_PASSWORD, REDIS_DB,
+    DB_KEY_MODE
 )
 
+# 紧凑主键迁移计划: 表 -> {列: BINARY 长度}
+# id / torrent_id 为 UUID（去掉 '-' 后 UNHEX），info_hash 为 40 位十六进制
+COMPACT_KEY_PLAN = [
+    ('torrents', {'id': 16, 'info_hash': 20}),
+    ('torrent_files', {'id': 16, 'torrent_id': 16}),
+    ('torrent_keywords', {'torrent_id': 16}),
+    ('torrent_file_lists', {'torrent_id': 16}),
+    ('torrent_file_terms', {'torrent_id': 16}),
+]
+# 引用 torrents.id 的小表，原地转换
+COMPACT_KEY_INPLACE = [
+    ('dmca_complaints', 'torrent_id'),
+]
+
 class DatabaseManager:
     """数据库管理器"""
     
@@ -37,11 +56,13 @@ class DatabaseManager:
             'charset': MYSQL_CHARSET
         }
     
-    def get_connection(self, use_db=True):
+    def get_connection(self, use_db=True, local_infile=False):
         """获取 MySQL 连接"""
         config = self.mysql_config.copy()
         if use_db:
             config['database'] = MYSQL_DATABASE
+        if local_infile:
+            config['local_infile'] = True
         return pymysql.connect(**config)
     
     def test_mysql(self):
@@ -161,6 +182,12 @@ class DatabaseManager:
         if not self.execute_sql_file(schema_file):
             return False
         
+        # 3. 紧凑主键模式（空表，转换很快）
+        if DB_KEY_MODE == 'compact':
+            print("🔑 主键模式: compact")
+            if not self.migrate_keys(confirm=False, keep_old=False):
+                return False
+        
         print("✅ 数据库初始化完成!")
         print("\n📊 数据库表结构:")
         self.show_tables()
@@ -251,6 +278,307 @@ class DatabaseManager:
         print("✅ 数据库迁移完成!")
         return True
 
+    def _column_info(self, cursor, table):
+        """返回 {列名: (COLUMN_TYPE, IS_NULLABLE, COLUMN_COMMENT)} 和按顺序的列名"""
+        cursor.execute(
+            """
+            SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_COMMENT
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+            """,
+            (MYSQL_DATABASE, table)
+        )
+        rows = cursor.fetchall()
+        return {r[0]: r[1:] for r in rows}, [r[0] for r in rows]
+    
+    def _foreign_keys(self, cursor, table):
+        """返回表上的外键 [(约束名, 列, 引用表, 引用列, ON DELETE)]"""
+        cursor.execute(
+            """
+            SELECT k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME,
+                   k.REFERENCED_COLUMN_NAME, r.DELETE_RULE
+            FROM information_schema.KEY_COLUMN_USAGE k
+            JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+              ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+            WHERE k.TABLE_SCHEMA = %s AND k.TABLE_NAME = %s AND k.REFERENCED_TABLE_NAME IS NOT NULL
+            """,
+            (MYSQL_DATABASE, table)
+        )
+        return list(cursor.fetchall())
+    
+    def _binary_column_def(self, info, size):
+        """按原列的 NULL 属性和注释生成 BINARY 列定义"""
+        column_type, nullable, comment = info
+        null_sql = "NULL" if nullable == 'YES' else "NOT NULL"
+        comment = comment.replace("'", "''")
+        return f"BINARY({size}) {null_sql} COMMENT '{comment}'"
+    
+    def migrate_keys(self, confirm=True, keep_old=True, chunk_size=50000):
+        """
+        主键迁移到紧凑格式
+        
+        CHAR(36) UUID -> BINARY(16)，CHAR(40) info_hash -> BINARY(20)。
+        大表先复制到新表（按主键分块 INSERT ... SELECT），再一次性
+        RENAME TABLE 切换，旧表保留为 <表名>__uuid 以便回滚。
+        迁移期间请停止爬虫和 API。
+        """
+        print("=" * 50)
+        print("开始主键迁移（compact 模式）...")
+        print("=" * 50)
+        
+        if confirm:
+            answer = input("⚠️  迁移期间需要停止爬虫和 API，确认继续? (yes/no): ")
+            if answer.lower() != 'yes':
+                print("❌ 操作已取消")
+                return False
+        
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cursor:
+                info, _ = self._column_info(cursor, 'torrents')
+                if not info:
+                    print("❌ 未找到 torrents 表，请先执行 init")
+                    return False
+                if info['id'][0].lower().startswith('binary'):
+                    print("✅ 已经是 compact 模式，无需迁移")
+                    return True
+                
+                cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+                
+                # 1. 复制大表到紧凑结构的新表
+                renames = []
+                foreign_keys = {}
+                for table, columns in COMPACT_KEY_PLAN:
+                    info, order = self._column_info(cursor, table)
+                    if not info:
+                        print(f"⚠️  跳过不存在的表: {table}")
+                        continue
+                    foreign_keys[table] = self._foreign_keys(cursor, table)
+                    new_table = f"{table}__compact"
+                    cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+                    cursor.execute(f"CREATE TABLE {new_table} LIKE {table}")
+                    cursor.execute(
+                        f"ALTER TABLE {new_table} " +
+                        ", ".join(f"MODIFY COLUMN {c} " + self._binary_column_def(info[c], n)
+                                  for c, n in columns.items())
+                    )
+                    
+                    select_sql = ", ".join(
+                        f"UNHEX(REPLACE({c}, '-', ''))" if c in columns else c for c in order
+                    )
+                    # 按主键第一列分块（包含边界值的整组，复合主键也不会被拆开）
+                    cursor.execute(
+                        """
+                        SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY'
+                        ORDER BY ORDINAL_POSITION LIMIT 1
+                        """,
+                        (MYSQL_DATABASE, table)
+                    )
+                    pk = cursor.fetchone()[0]
+                    copied = 0
+                    last = ''
+                    while True:
+                        cursor.execute(
+                            f"SELECT {pk} FROM {table} WHERE {pk} > %s ORDER BY {pk} LIMIT 1 OFFSET %s",
+                            (last, chunk_size - 1)
+                        )
+                        bound = cursor.fetchone()
+                        where = f"{pk} > %s" + (f" AND {pk} <= %s" if bound else "")
+                        params = (last, bound[0]) if bound else (last,)
+                        copied += cursor.execute(
+                            f"INSERT INTO {new_table} ({', '.join(order)}) "
+                            f"SELECT {select_sql} FROM {table} WHERE {where}",
+                            params
+                        )
+                        conn.commit()
+                        print(f"  {table}: 已复制 {copied} 行", end='\r')
+                        if not bound:
+                            break
+                        last = bound[0]
+                    print(f"✅ {table}: 复制完成 {copied} 行")
+                    renames.append(table)
+                
+                # 2. 原子切换
+                cursor.execute(
+                    "RENAME TABLE " + ", ".join(
+                        f"{t} TO {t}__uuid, {t}__compact TO {t}" for t in renames
+                    )
+                )
+                print("✅ 新表已切换")
+                
+                # 3. 重建外键（CREATE TABLE LIKE 不复制外键）
+                for table in renames:
+                    for _, column, ref_table, ref_column, delete_rule in foreign_keys[table]:
+                        cursor.execute(
+                            f"ALTER TABLE {table} ADD FOREIGN KEY ({column}) "
+                            f"REFERENCES {ref_table}({ref_column}) ON DELETE {delete_rule}"
+                        )
+                
+                # 4. 引用 torrents.id 的小表原地转换
+                for table, column in COMPACT_KEY_INPLACE:
+                    info, _ = self._column_info(cursor, table)
+                    if column not in info:
+                        continue
+                    fks = [fk for fk in self._foreign_keys(cursor, table) if fk[1] == column]
+                    for name, *_ in fks:
+                        cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY {name}")
+                    tmp = f"{column}__bin"
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {tmp} BINARY(16) NULL AFTER {column}")
+                    cursor.execute(f"UPDATE {table} SET {tmp} = UNHEX(REPLACE({column}, '-', '')) WHERE {column} IS NOT NULL")
+                    cursor.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+                    cursor.execute(
+                        f"ALTER TABLE {table} CHANGE COLUMN {tmp} {column} "
+                        + self._binary_column_def(info[column], 16)
+                    )
+                    for _, col, ref_table, ref_column, delete_rule in fks:
+                        # RENAME TABLE 后外键指向了旧表，改回新表
+                        if ref_table.endswith('__uuid'):
+                            ref_table = ref_table[:-len('__uuid')]
+                        cursor.execute(
+                            f"ALTER TABLE {table} ADD FOREIGN KEY ({col}) "
+                            f"REFERENCES {ref_table}({ref_column}) ON DELETE {delete_rule}"
+                        )
+                    print(f"✅ {table}.{column} 已转换")
+                
+                if not keep_old:
+                    for table in reversed(renames):
+                        cursor.execute(f"DROP TABLE IF EXISTS {table}__uuid")
+                
+                cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+            conn.commit()
+            conn.close()
+            
+            print("✅ 主键迁移完成!")
+            if keep_old and renames:
+                print(f"💡 旧表已保留为: {', '.join(t + '__uuid' for t in renames)}，确认无误后可手动删除")
+            if DB_KEY_MODE != 'compact':
+                print("💡 请设置环境变量 DHT_DB_KEY_MODE=compact 后重启爬虫和 API")
+            return True
+        except Exception as e:
+            print(f"❌ 主键迁移失败: {e}")
+            return False
+
+    def partition_tables(self, confirm=True):
+        """
+        文件表按月分区（RANGE COLUMNS(created_at)）
+        
+        torrent_files / torrent_file_lists 改为按月分区后，cleanup_old_data.py 直接
+        DROP PARTITION 删除过期文件行。分区表不支持外键，这两张表到 torrents 的
+        外键会被删除（删除种子时由清理任务处理子表）；主键加上 created_at。
+        torrents 有 FULLTEXT 索引，InnoDB 分区表不支持，因此不分区。
+        需要重建表，期间请停止爬虫。
+        """
+        from services.retention import PARTITIONED_TABLES, month_start, next_month, partition_clause
+        from config.settings import RETENTION_PARTITIONS_AHEAD
+        
+        print("=" * 50)
+        print("开始文件表分区...")
+        print("=" * 50)
+        
+        if confirm:
+            answer = input("⚠️  分区需要重建 torrent_files 等表，期间请停止爬虫，确认继续? (yes/no): ")
+            if answer.lower() != 'yes':
+                print("❌ 操作已取消")
+                return False
+        
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cursor:
+                horizon = month_start(datetime.now())
+                for _ in range(RETENTION_PARTITIONS_AHEAD):
+                    horizon = next_month(horizon)
+                
+                for table, key_column in PARTITIONED_TABLES.items():
+                    cursor.execute(
+                        """
+                        SELECT COUNT(*) FROM information_schema.PARTITIONS
+                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+                        """,
+                        (MYSQL_DATABASE, table)
+                    )
+                    if cursor.fetchone()[0]:
+                        print(f"⏭️  {table} 已分区，跳过")
+                        continue
+                    
+                    for name, *_ in self._foreign_keys(cursor, table):
+                        cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY {name}")
+                    
+                    cursor.execute(f"SELECT MIN(created_at) FROM {table}")
+                    oldest = cursor.fetchone()[0] or datetime.now()
+                    clauses = []
+                    month = month_start(oldest)
+                    while month <= horizon:
+                        clauses.append(partition_clause(month))
+                        month = next_month(month)
+                    clauses.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+                    
+                    print(f"🔧 {table}: {len(clauses)} 个分区，重建中...")
+                    cursor.execute(f"UPDATE {table} SET created_at = NOW() WHERE created_at IS NULL")
+                    cursor.execute(
+                        f"ALTER TABLE {table} "
+                        f"DROP PRIMARY KEY, ADD PRIMARY KEY ({key_column}, created_at), "
+                        f"MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间' "
+                        f"PARTITION BY RANGE COLUMNS(created_at) ({', '.join(clauses)})"
+                    )
+                    print(f"✅ {table} 已分区")
+            conn.commit()
+            conn.close()
+            
+            print("✅ 分区完成!")
+            print("💡 过期文件数据由 cleanup_old_data.py 通过 DROP PARTITION 删除")
+            return True
+        except Exception as e:
+            print(f"❌ 分区失败: {e}")
+            return False
+    
+    def bulk_load(self, paths, workers=4, chunk_rows=200000, defer_indexes=True):
+        """
+        批量导入（重建索引 / 导入历史数据）
+        
+        记录写成 TSV 分块后用 LOAD DATA LOCAL INFILE 并行导入；
+        导入期间删除二级索引和全文索引，结束后每张表一条 ALTER 重建。
+        需要服务端 local_infile = ON，导入期间建议停止爬虫。
+        """
+        from database.bulk_loader import BulkLoader
+        from services.search_cache import SearchCache
+        
+        print("=" * 50)
+        print("开始批量导入...")
+        print("=" * 50)
+        
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            print(f"❌ 路径不存在: {', '.join(missing)}")
+            return False
+        if defer_indexes:
+            answer = input("⚠️  导入期间会删除并重建 torrents 等表的索引，搜索将变慢，确认继续? (yes/no): ")
+            if answer.lower() != 'yes':
+                print("❌ 操作已取消")
+                return False
+        
+        try:
+            loader = BulkLoader(
+                lambda: self.get_connection(local_infile=True),
+                workers=workers, chunk_rows=chunk_rows, defer_indexes=defer_indexes
+            )
+            stats = loader.run(paths)
+            SearchCache.invalidate()
+            print("\n✅ 批量导入完成!")
+            print(f"   记录: {stats['records']}，重复: {stats['duplicates']}，过滤: {stats['filtered']}")
+            print(f"   torrents: {stats['torrents_rows']}，torrent_files: {stats['torrent_files_rows']}，"
+                  f"torrent_file_lists: {stats['torrent_file_lists_rows']}，"
+                  f"torrent_file_terms: {stats['torrent_file_terms_rows']}")
+            print(f"   耗时: {stats['seconds']}s")
+            if stats['chunk_errors']:
+                print(f"⚠️  {stats['chunk_errors']} 个分块导入失败，详见日志")
+                return False
+            return True
+        except Exception as e:
+            print(f"❌ 批量导入失败: {e}")
+            return False
+
 def main():
     if len(sys.argv) < 2:
         print(__doc__)
@@ -281,6 +609,32 @@ def main():
     elif command == 'migrate':
         manager.migrate_database()
     
+    elif command == 'migrate-keys':
+        manager.migrate_keys()
+    
+    elif command == 'partition':
+        manager.partition_tables()
+    
+    elif command == 'bulk-load':
+        args = sys.argv[2:]
+        options = {'workers': 4, 'chunk_rows': 200000, 'defer_indexes': True}
+        paths = []
+        while args:
+            arg = args.pop(0)
+            if arg == '--workers' and args:
+                options['workers'] = int(args.pop(0))
+            elif arg == '--chunk-rows' and args:
+                options['chunk_rows'] = int(args.pop(0))
+            elif arg == '--keep-indexes':
+                options['defer_indexes'] = False
+            else:
+                paths.append(arg)
+        if not paths:
+            print("❌ 请指定要导入的文件或目录")
+            sys.exit(1)
+        if not manager.bulk_load(paths, **options):
+            sys.exit(1)
+    
     elif command == 'backup':
         manager.backup_database()
     
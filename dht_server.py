@@ -4,9 +4,11 @@ import time
 import logging
 import os
 import hashlib
-import struct
-from bencode import bdecode, bencode, BencodeError
-from utils import get_rand_id, get_neighbor, decode_nodes, encode_nodes
+from bencode import bencode, BencodeError
+from krpc import parse_krpc
+from pacer import FindNodePacer
+from popularity import DemandTracker
+from utils import get_rand_id, get_neighbor, decode_nodes_int, decode_peers, dottedQuadToNum, numToDottedQuad
 from collections import deque
 
 # Bootstrap nodes
@@ -16,14 +18,28 @@ BOOTSTRAP_NODES = [
     ("router.utorrent.com", 6881)
 ]
 
+TOKEN_CACHE_SIZE = 50000
+SECRET_ROTATE_SEC = 300
+DEMAND_WINDOW_SEC = 60
+
 class KNode:
+    __slots__ = ("nid", "ip", "port")
+
     def __init__(self, nid, ip, port):
         self.nid = nid
-        self.ip = ip
+        self.ip = ip  # dotted-quad str, or int for nodes learned from compact info
         self.port = port
 
+    @property
+    def address(self):
+        ip = self.ip
+        if type(ip) is int:
+            ip = numToDottedQuad(ip)
+        return (ip, self.port)
+
 class DHTServer(threading.Thread):
-    def __init__(self, bind_ip, bind_port, info_queue, max_node_qsize=500):
+    def __init__(self, bind_ip, bind_port, info_queue, max_node_qsize=500,
+                 find_node_rate=None, find_node_burst=100, find_node_min_interval=1.0):
         super().__init__()
         self.bind_ip = bind_ip
         self.bind_port = bind_port
@@ -34,12 +50,21 @@ class DHTServer(threading.Thread):
         self.running = True
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.bind((self.bind_ip, self.bind_port))
+        self.bind_ip_int = dottedQuadToNum(self.bind_ip)
         self.bind_port = self.sock.getsockname()[1]
         self.sock.settimeout(0.2)
         self.recent_hashes = deque(maxlen=2000)
+        # Query counts per infohash, shipped to the main process every window
+        self.demand = DemandTracker()
+        self.last_demand_ship = time.time()
         self.secret = os.urandom(20)
         self.last_secret = self.secret
         self.last_rotate = time.time()
+        # Per-IP token caches for the current and previous secret
+        self.token_cache = {}
+        self.last_token_cache = {}
+        self.token_hits = 0
+        self.token_misses = 0
         self.logger = logging.getLogger("DHTServer")
         self.logger.setLevel(logging.ERROR)
 
@@ -54,6 +79,13 @@ class DHTServer(threading.Thread):
         self.last_tx_error_at = 0.0
         self.tid_to_hash = {}
         self.tid_lock = threading.Lock()
+        # Default budget matches the old one-node-per-1/max_node_qsize-sleep rate
+        self.pacer = FindNodePacer(
+            self,
+            rate=find_node_rate or max_node_qsize,
+            burst=find_node_burst,
+            min_interval=find_node_min_interval
+        )
 
     def cleanup_expired_tids(self):
         try:
@@ -131,20 +163,49 @@ class DHTServer(threading.Thread):
         }
         self.send_message(msg, address)
 
+    def _cached_token(self, cache, secret, ip):
+        tok = cache.get(ip)
+        if tok is not None:
+            self.token_hits += 1
+            return tok
+        self.token_misses += 1
+        tok = hashlib.sha1(secret + ip.encode()).digest()[:2]
+        if len(cache) >= TOKEN_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del cache[next(iter(cache))]
+        cache[ip] = tok
+        return tok
+
     def token_for(self, address):
-        ip = address[0].encode()
-        return hashlib.sha1(self.secret + ip).digest()[:2]
+        return self._cached_token(self.token_cache, self.secret, address[0])
 
     def check_token(self, address, token):
-        ip = address[0].encode()
         if not token or len(token) != 2:
             return False
-        if token == hashlib.sha1(self.secret + ip).digest()[:2]:
+        ip = address[0]
+        if token == self._cached_token(self.token_cache, self.secret, ip):
             return True
-        if token == hashlib.sha1(self.last_secret + ip).digest()[:2]:
+        if token == self._cached_token(self.last_token_cache, self.last_secret, ip):
             return True
         return False
 
+    def rotate_secret(self):
+        """Rotate the token secret, the current cache becomes the previous one"""
+        self.last_secret = self.secret
+        self.secret = os.urandom(20)
+        self.last_token_cache = self.token_cache
+        self.token_cache = {}
+        self.last_rotate = time.time()
+
+    def token_stats(self):
+        total = self.token_hits + self.token_misses
+        return {
+            "hits": self.token_hits,
+            "misses": self.token_misses,
+            "hit_rate": self.token_hits / total if total else 0.0,
+            "size": len(self.token_cache),
+        }
+
     def run(self):
         #self.logger.info(f"DHT Server started on {self.bind_ip}:{self.bind_port}")
         self.bootstrap()
@@ -155,18 +216,18 @@ class DHTServer(threading.Thread):
             if time.time() - self.last_rotate > 60:
                 self.cleanup_expired_tids()
             
-            if time.time() - self.last_rotate > 300:
-                self.last_secret = self.secret
-                self.secret = os.urandom(20)
-                self.last_rotate = time.time()
+            if time.time() - self.last_rotate > SECRET_ROTATE_SEC:
+                self.rotate_secret()
             if time.time() - last_bootstrap > 2:
                 self.bootstrap()
                 last_bootstrap = time.time()
+            if time.time() - self.last_demand_ship > DEMAND_WINDOW_SEC:
+                self.ship_demand()
 
             try:
                 data, address = self.sock.recvfrom(65536)
                 self.recv_packets += 1
-                msg = bdecode(data)
+                msg = parse_krpc(data)
                 self.handle_message(msg, address)
             except socket.timeout:
                 continue
@@ -176,26 +237,35 @@ class DHTServer(threading.Thread):
             except Exception:
                 pass
 
-    def handle_message(self, msg, address):
+    def ship_demand(self):
+        """Send the current demand window to the main process"""
+        self.last_demand_ship = time.time()
+        if not self.demand.events:
+            return
+        sketch_bytes, candidates, events = self.demand.snapshot()
         try:
-            msg_type = msg.get(b"y")
-            if msg_type == b"q":
-                self.rx_queries += 1
-                self.handle_query(msg, address)
-            elif msg_type == b"r":
-                self.rx_responses += 1
-                self.handle_response(msg, address)
-        except KeyError:
+            self.info_queue.put_nowait((b"demand", sketch_bytes, candidates, events))
+        except Exception:
             pass
 
+    def handle_message(self, msg, address):
+        msg_type = msg.y
+        if msg_type == b"q":
+            self.rx_queries += 1
+            self.handle_query(msg, address)
+        elif msg_type == b"r":
+            self.rx_responses += 1
+            self.handle_response(msg, address)
+
     def handle_query(self, msg, address):
         try:
-            query_type = msg.get(b"q")
-            tid = msg.get(b"t")
-            args = msg.get(b"a")
+            query_type = msg.q
+            tid = msg.t
             
             if query_type == b"get_peers":
-                info_hash = args.get(b"info_hash")
+                info_hash = msg.info_hash
+                if info_hash and len(info_hash) == 20:
+                    self.demand.add(info_hash)
                 if info_hash and info_hash not in self.recent_hashes:
                     self.recent_hashes.append(info_hash)
                     try:
@@ -208,10 +278,10 @@ class DHTServer(threading.Thread):
                 self.send_response(tid, address, {b"id": nid, b"token": tok, b"nodes": b""})
 
             elif query_type == b"announce_peer":
-                info_hash = args.get(b"info_hash")
-                port = args.get(b"port")
-                token = args.get(b"token")
-                if args.get(b"implied_port", 0) != 0:
+                info_hash = msg.info_hash
+                port = msg.port
+                token = msg.token
+                if msg.implied_port != 0:
                     port = address[1]
                 
                 try:
@@ -220,17 +290,24 @@ class DHTServer(threading.Thread):
                     port = None
 
                 if info_hash and token and self.check_token(address, token):
+                    if len(info_hash) == 20:
+                        self.demand.add(info_hash)
+                    # Every valid announce is forwarded so re-announces are counted;
+                    # recent_hashes only decides whether metadata is worth fetching
                     if info_hash not in self.recent_hashes:
                         self.recent_hashes.append(info_hash)
-                        try:
-                            self.info_queue.put_nowait((b"announce_peer", info_hash, address, port))
-                        except Exception:
-                            pass
-                sender_id = args.get(b"id", self.nid)
+                        event = b"announce_peer"
+                    else:
+                        event = b"reannounce"
+                    try:
+                        self.info_queue.put_nowait((event, info_hash, address, port))
+                    except Exception:
+                        pass
+                sender_id = msg.id or self.nid
                 self.send_response(tid, address, {b"id": get_neighbor(sender_id, self.nid)})
 
             elif query_type == b"find_node":
-                target = args.get(b"target")
+                target = msg.target
                 nid = get_neighbor(target, self.nid) if target else self.nid
                 self.send_response(tid, address, {b"id": nid, b"nodes": b""})
 
@@ -238,7 +315,7 @@ class DHTServer(threading.Thread):
                 self.send_response(tid, address, {b"id": self.nid})
 
             # Add responding node to queue
-            sender_nid = args.get(b"id")
+            sender_nid = msg.id
             if sender_nid and len(sender_nid) == 20:
                 self.add_node(sender_nid, address)
             
@@ -254,19 +331,23 @@ class DHTServer(threading.Thread):
         # Add to deque (auto-removes oldest if full)
         self.nodes.append(KNode(nid, ip, port))
 
+    def add_compact_nodes(self, nodes):
+        """Queue nodes from compact node info, IPs are only stringified when sent"""
+        append = self.nodes.append
+        bind_ip = self.bind_ip_int
+        for nid, ip, port in decode_nodes_int(nodes):
+            if ip and port and ip != bind_ip:
+                append(KNode(nid, ip, port))
+
     def handle_response(self, msg, address):
         try:
-            args = msg.get(b"r")
-            if not args:
-                return
-            
             # Add responding node
-            if b"id" in args and len(args[b"id"]) == 20:
-                self.add_node(args[b"id"], address)
+            if msg.id and len(msg.id) == 20:
+                self.add_node(msg.id, address)
             
             # Handle peer values
-            if b"values" in args:
-                tid = msg.get(b"t")
+            if msg.values:
+                tid = msg.t
                 info_hash = None
                 if tid:
                     with self.tid_lock:
@@ -274,21 +355,15 @@ class DHTServer(threading.Thread):
                         if entry:
                             info_hash = entry[0]
                 
-                for v in args[b"values"]:
+                for peer in decode_peers(msg.values):
                     try:
-                        if len(v) == 6:
-                            ip = socket.inet_ntoa(v[:4])
-                            port = struct.unpack("!H", v[4:])[0]
-                            self.info_queue.put_nowait((b"peer_value", info_hash, (ip, port), port))
+                        self.info_queue.put_nowait((b"peer_value", info_hash, peer, peer[1]))
                     except:
                         continue
 
             # Handle nodes list
-            if b"nodes" in args:
-                new_nodes = decode_nodes(args[b"nodes"])
-                for nid, ip, port in new_nodes:
-                    if len(nid) == 20:
-                        self.add_node(nid, (ip, port))
+            if msg.nodes:
+                self.add_compact_nodes(msg.nodes)
         except:
             pass
 
@@ -301,19 +376,11 @@ class DHTServer(threading.Thread):
         self.send_message(msg, address)
     
     def auto_send_find_node(self):
-        """ killer feature: dedicated find_node spam thread"""
-        wait = 1.0 / self.max_node_qsize  # e.g., 1/500 = 0.002s = 500 Hz!
-        while self.running:
-            try:
-                if len(self.nodes) > 0:
-                    node = self.nodes.popleft()
-                    self.send_find_node((node.ip, node.port), node.nid)
-            except:
-                pass
-            try:
-                time.sleep(wait)
-            except KeyboardInterrupt:
-                break
+        """ killer feature: dedicated find_node spam thread, paced by FindNodePacer"""
+        try:
+            self.pacer.run()
+        except KeyboardInterrupt:
+            pass
     
     def stop(self):
         self.running = False
@@ -41,6 +41,39 @@ module.exports = {
                 DHT_ENABLE_REFERER_CHECK: "False"
             }
         },
+        {
+            name: "dht-hot-score",
+            script: "python",
+            args: "-m workers.hot_score",
+            cwd: "./",
+            instances: 1,
+            autorestart: true,
+            max_memory_restart: "300M",
+            error_file: "logs/hot-score-error.log",
+            out_file: "logs/hot-score-out.log",
+            log_date_format: "YYYY-MM-DD HH:mm:ss",
+            merge_logs: true,
+            env: {
+                PYTHONPATH: "."
+            }
+        },
+        {
+            // SEARCH_BACKEND=index 时合并倒排索引段
+            name: "dht-search-index",
+            script: "python",
+            args: "-m workers.search_index",
+            cwd: "./",
+            instances: 1,
+            autorestart: true,
+            max_memory_restart: "2G",
+            error_file: "logs/search-index-error.log",
+            out_file: "logs/search-index-out.log",
+            log_date_format: "YYYY-MM-DD HH:mm:ss",
+            merge_logs: true,
+            env: {
+                PYTHONPATH: "."
+            }
+        },
         {
             name: "dht-frontend",
             script: "npm",
@@ -18,13 +18,18 @@ export default function SearchPage() {
     const keyword = searchParams.get('q') || ''
     const page = parseInt(searchParams.get('page') || '1')
     const sortParam = searchParams.get('sort') || 'time'
+    const scopeParam = searchParams.get('scope') || 'name'
+    const cursorParam = searchParams.get('cursor') || ''
 
     const [results, setResults] = useState<any[]>([])
     const [total, setTotal] = useState(0)
+    const [totalDisplay, setTotalDisplay] = useState('')
     const [totalPages, setTotalPages] = useState(0)
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState<string | null>(null)
     const [sort, setSort] = useState(sortParam)
+    const [scope, setScope] = useState(scopeParam)
     const [filters, setFilters] = useState({
         has_video: false,
         has_audio: false,
@@ -50,7 +55,7 @@ export default function SearchPage() {
         } else {
             setLoading(false)
         }
-    }, [keyword, page, sort, filters])
+    }, [keyword, page, cursorParam, sort, scope, filters])
 
     const fetchResults = async () => {
         setLoading(true)
@@ -60,9 +65,11 @@ export default function SearchPage() {
                 q: keyword,
                 page: page.toString(),
                 sort,
+                scope,
                 limit: siteConfig.pagination.defaultPageSize.toString(),
             })
 
+            if (cursorParam) params.append('cursor', cursorParam)
             if (filters.has_video) params.append('has_video', 'true')
             if (filters.has_audio) params.append('has_audio', 'true')
 
@@ -80,12 +87,16 @@ export default function SearchPage() {
             const data = await res.json()
             setResults(data.results || [])
             setTotal(data.total || 0)
+            setTotalDisplay(data.total_display || '')
             setTotalPages(data.total_pages || 0)
+            setNextCursor(data.next_cursor || null)
         } catch (err: any) {
             console.error('Search error:', err)
             setError(err.message || t('common.error'))
             setResults([])
             setTotal(0)
+            setTotalDisplay('')
+            setNextCursor(null)
         } finally {
             setLoading(false)
         }
@@ -99,12 +110,40 @@ export default function SearchPage() {
         setSort(newSort)
         const params = new URLSearchParams(window.location.search)
         params.set('sort', newSort)
+        params.delete('cursor')
+        params.delete('page')
+        window.history.pushState({}, '', `?${params}`)
+    }
+
+    const handleScopeChange = (searchFiles: boolean) => {
+        const newScope = searchFiles ? 'files' : 'name'
+        setScope(newScope)
+        const params = new URLSearchParams(window.location.search)
+        params.set('scope', newScope)
+        params.delete('cursor')
+        params.delete('page')
         window.history.pushState({}, '', `?${params}`)
     }
 
     const handlePageChange = (newPage: number) => {
+        if (newPage === page) return
+        // Pages past the last page link were reached through cursors, which only go forward
+        if (newPage > totalPages && newPage < page) {
+            window.history.back()
+            return
+        }
         const params = new URLSearchParams(window.location.search)
         params.set('page', newPage.toString())
+        params.delete('cursor')
+        window.location.href = `?${params}`
+    }
+
+    // Follow next_cursor once the page links run out
+    const handleNextCursor = () => {
+        if (!nextCursor) return
+        const params = new URLSearchParams(window.location.search)
+        params.set('page', (page + 1).toString())
+        params.set('cursor', nextCursor)
         window.location.href = `?${params}`
     }
 
@@ -136,7 +175,7 @@ export default function SearchPage() {
             <div className="flex-1 max-w-6xl mx-auto px-4 py-8 w-full">
                 {/* Search results count */}
                 <div className="mb-6 text-text-secondary animate-fade-in">
-                    {t('search.results_count', { count: total.toLocaleString() })}
+                    {t('search.results_count', { count: totalDisplay || total.toLocaleString() })}
                 </div>
 
                 {/* Sort and filter - Glassmorphism */}
@@ -164,6 +203,15 @@ export default function SearchPage() {
 
                     {/* Filter */}
                     <div className="flex items-center gap-4 ml-auto">
+                        <label className="flex items-center gap-2 text-sm cursor-pointer whitespace-nowrap">
+                            <input
+                                type="checkbox"
+                                checked={scope === 'files'}
+                                onChange={(e) => handleScopeChange(e.target.checked)}
+                                className="w-4 h-4 rounded border-border-light text-primary-500 focus:ring-primary-500/20"
+                            />
+                            <span className="text-text-secondary">{t('search.search_files')}</span>
+                        </label>
                         <label className="flex items-center gap-2 text-sm cursor-pointer whitespace-nowrap">
                             <input
                                 type="checkbox"
@@ -207,12 +255,13 @@ export default function SearchPage() {
                         </div>
 
                         {/* Pagination */}
-                        {totalPages > 1 && (
+                        {(totalPages > 1 || page > 1) && (
                             <div className="py-6 animate-fade-in">
                                 <Pagination
                                     currentPage={page}
                                     totalPages={totalPages}
                                     onPageChange={handlePageChange}
+                                    onNext={page >= totalPages && nextCursor ? handleNextCursor : undefined}
                                 />
                             </div>
                         )}
@@ -23,6 +23,7 @@ interface Torrent {
 }
 
 interface TorrentFile {
+    file_index: number
     file_name: string
     file_path: string
     file_size: number
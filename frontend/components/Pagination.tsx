@@ -6,9 +6,11 @@ interface PaginationProps {
     currentPage: number
     totalPages: number
     onPageChange: (page: number) => void
+    // Called by the next button once the page links run out (cursor pagination)
+    onNext?: () => void
 }
 
-export default function Pagination({ currentPage, totalPages, onPageChange }: PaginationProps) {
+export default function Pagination({ currentPage, totalPages, onPageChange, onNext }: PaginationProps) {
     const { t } = useI18n()
 
     // Generate page number array
@@ -36,10 +38,24 @@ export default function Pagination({ currentPage, totalPages, onPageChange }: Pa
             }
         }
 
+        // Deep page reached through the cursor, past the last page link
+        if (currentPage > totalPages) {
+            pages.push('ellipsis', currentPage)
+        }
+
         return pages
     }
 
     const pages = getPageNumbers()
+    const hasNext = currentPage < totalPages || !!onNext
+
+    const handleNext = () => {
+        if (currentPage < totalPages) {
+            onPageChange(currentPage + 1)
+        } else if (onNext) {
+            onNext()
+        }
+    }
 
     return (
         <nav className="flex items-center justify-center gap-1" aria-label="Pagination">
@@ -93,11 +109,11 @@ export default function Pagination({ currentPage, totalPages, onPageChange }: Pa
 
             {/* Next page button */}
             <button
-                onClick={() => onPageChange(currentPage + 1)}
-                disabled={currentPage === totalPages}
+                onClick={handleNext}
+                disabled={!hasNext}
                 className={`
                     p-2 rounded-lg transition-all duration-200
-                    ${currentPage === totalPages
+                    ${!hasNext
                         ? 'text-text-muted cursor-not-allowed'
                         : 'text-text-secondary hover:bg-white/60 hover:text-primary-500'
                     }
@@ -1,8 +1,9 @@
 'use client'
 
-import { useState, KeyboardEvent } from 'react'
+import { useEffect, useRef, useState, KeyboardEvent } from 'react'
 import { useI18n } from '@/lib/i18n'
 import { showToast } from '@/components/Toast'
+import siteConfig from '@/config/site'
 
 interface SearchBoxProps {
     onSearch: (keyword: string) => void
@@ -18,19 +19,56 @@ export default function SearchBox({
 }: SearchBoxProps) {
     const { t } = useI18n()
     const [keyword, setKeyword] = useState(initialValue)
+    const [suggestions, setSuggestions] = useState<string[]>([])
+    const [active, setActive] = useState(-1)
+    const [typing, setTyping] = useState(false)
+    const pending = useRef<AbortController | null>(null)
 
-    const handleSearch = () => {
-        const trimmedKeyword = keyword.trim()
+    // Fetch suggestions on every keystroke (the API answers from an in-memory index)
+    useEffect(() => {
+        pending.current?.abort()
+        if (!typing || !keyword.trim()) {
+            setSuggestions([])
+            return
+        }
+        const controller = new AbortController()
+        pending.current = controller
+        fetch(`${siteConfig.apiUrl}/api/suggest?${new URLSearchParams({ q: keyword })}`, { signal: controller.signal })
+            .then((res) => (res.ok ? res.json() : { suggestions: [] }))
+            .then((data) => {
+                setSuggestions(data.suggestions || [])
+                setActive(-1)
+            })
+            .catch(() => {})
+        return () => controller.abort()
+    }, [keyword, typing])
+
+    const submit = (value: string) => {
+        const trimmedKeyword = value.trim()
         if (!trimmedKeyword) {
             showToast(t('search.empty_keyword'), 'warning')
             return
         }
+        setTyping(false)
+        setSuggestions([])
         onSearch(trimmedKeyword)
     }
 
-    const handleKeyPress = (e: KeyboardEvent<HTMLInputElement>) => {
+    const handleSearch = () => {
+        submit(active >= 0 ? suggestions[active] : keyword)
+    }
+
+    const handleKeyDown = (e: KeyboardEvent<HTMLInputElement>) => {
         if (e.key === 'Enter') {
             handleSearch()
+        } else if (e.key === 'ArrowDown' && suggestions.length) {
+            e.preventDefault()
+            setActive((active + 1) % suggestions.length)
+        } else if (e.key === 'ArrowUp' && suggestions.length) {
+            e.preventDefault()
+            setActive(active <= 0 ? suggestions.length - 1 : active - 1)
+        } else if (e.key === 'Escape') {
+            setSuggestions([])
         }
     }
 
@@ -40,8 +78,12 @@ export default function SearchBox({
                 <input
                     type="text"
                     value={keyword}
-                    onChange={(e) => setKeyword(e.target.value)}
-                    onKeyPress={handleKeyPress}
+                    onChange={(e) => {
+                        setKeyword(e.target.value)
+                        setTyping(true)
+                    }}
+                    onKeyDown={handleKeyDown}
+                    onBlur={() => setTimeout(() => setSuggestions([]), 150)}
                     placeholder={t('common.search_placeholder')}
                     autoFocus={autoFocus}
                     className="input-glass pl-4 pr-11 py-3 w-full"
@@ -60,6 +102,25 @@ export default function SearchBox({
                         d="M21 21l-6-6m2-5a7 7 0 11-14 0 7 7 0 0114 0z"
                     />
                 </svg>
+                {/* Suggestions */}
+                {suggestions.length > 0 && (
+                    <ul className="absolute left-0 right-0 top-full mt-1 z-20 glass rounded-xl py-1 overflow-hidden">
+                        {suggestions.map((s, i) => (
+                            <li
+                                key={s}
+                                onMouseDown={(e) => {
+                                    e.preventDefault()
+                                    setKeyword(s)
+                                    submit(s)
+                                }}
+                                onMouseEnter={() => setActive(i)}
+                                className={`px-4 py-2 text-sm cursor-pointer text-text-primary ${i === active ? 'bg-primary-500/10' : ''}`}
+                            >
+                                {s}
+                            </li>
+                        ))}
+                    </ul>
+                )}
             </div>
             <button
                 onClick={handleSearch}
@@ -0,0 +1,285 @@
+"""
+Fast-path KRPC message parser
+
+DHTServer only looks at a handful of keys in every datagram, so instead of
+building the full nested dict with bdecode we pull out just the fields the
+handlers use. The common packet layouts are matched in one shot by compiled
+regexes; anything else goes through a strict single-pass scanner that
+bounds-checks and skips uninteresting values without allocating.
+"""
+import re
+from bencode import BencodeError
+
+MAX_SKIP_DEPTH = 32
+
+_INT_RE = re.compile(rb'-?(?:0|[1-9][0-9]*)')
+
+# Canonical (sorted-key) layouts of the queries and responses we handle.
+# Variable-length strings are matched lazily and their length prefix is
+# verified afterwards; if a check fails the generic scanner takes over, so a
+# fast-path hit is always an exact bencode parse.
+_QUERY_RE = re.compile(
+    rb'd1:ad2:id20:(.{20})'
+    rb'(?:12:implied_porti([01])e)?'
+    rb'(?:9:info_hash20:(.{20}))?'
+    rb'(?:4:porti(0|[1-9][0-9]{0,4})e)?'
+    rb'(?:6:target20:(.{20}))?'
+    rb'(?:5:token([1-9][0-9]?):(.{1,99}?))?'
+    rb'e1:q(4:ping|9:find_node|9:get_peers|13:announce_peer)'
+    rb'1:t([1-9]):(.{1,9}?)'
+    rb'(?:1:v4:.{4})?'
+    rb'1:y1:qe',
+    re.DOTALL)
+
+# Responses carry large nodes/values payloads, so only their fixed head and
+# tail are regex-matched and the payloads are sliced by length prefix (the
+# head regex also captures the nodes length, saving a separate scan)
+_RESPONSE_HEAD_RE = re.compile(
+    rb'd(?:2:ip6:.{6})?1:rd2:id20:(.{20})'
+    rb'(?:5:nodes(0|[1-9][0-9]{0,4}):)?',
+    re.DOTALL)
+_TOKEN_RE = re.compile(rb'5:token([1-9][0-9]?):')
+_VALUES_RE = re.compile(rb'(?:6:.{6})*e', re.DOTALL)
+_VALUE_ITEM_RE = re.compile(rb'6:(.{6})', re.DOTALL)
+_RESPONSE_TAIL_RE = re.compile(
+    rb'e1:t([1-9]):(.{1,9}?)'
+    rb'(?:1:v4:.{4})?'
+    rb'1:y1:re',
+    re.DOTALL)
+
+_D = b'd'[0]
+_L = b'l'[0]
+_I = b'i'[0]
+_E = b'e'[0]
+_0 = b'0'[0]
+_9 = b'9'[0]
+
+_LIST, _KEY, _VALUE = 0, 1, 2
+
+# Keys we extract from the "a" (query args) and "r" (response) dicts
+_STR_FIELDS = {b"id": "id", b"info_hash": "info_hash", b"token": "token",
+               b"target": "target", b"nodes": "nodes", b"samples": "samples"}
+_INT_FIELDS = {b"port": "port", b"implied_port": "implied_port"}
+
+_QUERY_NAMES = {b"4:ping": b"ping", b"9:find_node": b"find_node",
+                b"9:get_peers": b"get_peers", b"13:announce_peer": b"announce_peer"}
+
+class KRPCMessage:
+    """Flattened view of the KRPC fields DHTServer cares about"""
+    __slots__ = ("t", "y", "q", "id", "info_hash", "token", "target",
+                 "port", "implied_port", "nodes", "values", "samples")
+
+    def __init__(self, y=None, t=None, q=None, nid=None, info_hash=None,
+                 token=None, target=None, port=None, implied_port=0):
+        self.y = y
+        self.t = t
+        self.q = q
+        self.id = nid
+        self.info_hash = info_hash
+        self.token = token
+        self.target = target
+        self.port = port
+        self.implied_port = implied_port
+        self.nodes = None
+        self.values = None
+        self.samples = None
+
+def _str_bounds(data, pos, end):
+    """Return (start, stop) of the bencoded string at pos"""
+    colon = data.find(b':', pos, end)
+    if colon <= pos:
+        raise BencodeError("malformed string length")
+    digits = data[pos:colon]
+    if not digits.isdigit() or (digits[0] == _0 and colon != pos + 1):
+        raise BencodeError("malformed string length")
+    start = colon + 1
+    stop = start + int(digits)
+    if stop > end:
+        raise BencodeError("string exceeds packet bounds")
+    return start, stop
+
+def _read_int(data, pos, end):
+    """Return (value, next_pos) of the bencoded integer at pos"""
+    stop = data.find(b'e', pos + 1, end)
+    if stop < 0 or not _INT_RE.fullmatch(data, pos + 1, stop):
+        raise BencodeError("malformed integer")
+    return int(data[pos + 1:stop]), stop + 1
+
+def _skip(data, pos, end):
+    """Validate and skip one value without building it, returns next_pos"""
+    # Explicit container stack: _LIST, or _KEY/_VALUE for what a dict expects next
+    stack = []
+    while True:
+        if pos >= end:
+            raise BencodeError("truncated value")
+        c = data[pos]
+        top = stack[-1] if stack else None
+        if c == _E and (top == _LIST or top == _KEY):
+            stack.pop()
+            pos += 1
+        elif top == _KEY:
+            if not _0 <= c <= _9:
+                raise BencodeError("dict key is not a string")
+            pos = _str_bounds(data, pos, end)[1]
+            stack[-1] = _VALUE
+            continue
+        else:
+            if top == _VALUE:
+                stack[-1] = _KEY
+            if _0 <= c <= _9:
+                pos = _str_bounds(data, pos, end)[1]
+            elif c == _I:
+                pos = _read_int(data, pos, end)[1]
+            elif c == _L or c == _D:
+                if len(stack) >= MAX_SKIP_DEPTH:
+                    raise BencodeError("nesting too deep")
+                stack.append(_LIST if c == _L else _KEY)
+                pos += 1
+                continue
+            else:
+                raise BencodeError("unexpected byte 0x%02x" % c)
+        if not stack:
+            return pos
+
+def _parse_str_list(data, pos, end):
+    """Decode a list of strings (r.values), silently dropping non-strings"""
+    items = []
+    pos += 1
+    while True:
+        if pos >= end:
+            raise BencodeError("truncated list")
+        c = data[pos]
+        if c == _E:
+            return items, pos + 1
+        if _0 <= c <= _9:
+            start, pos = _str_bounds(data, pos, end)
+            items.append(data[start:pos])
+        else:
+            pos = _skip(data, pos, end)
+
+def _parse_args(data, pos, end, view, msg):
+    """Extract wanted keys from the "a" or "r" dict into msg"""
+    pos += 1
+    while True:
+        if pos >= end:
+            raise BencodeError("truncated dict")
+        if data[pos] == _E:
+            return pos + 1
+        kstart, pos = _str_bounds(data, pos, end)
+        if pos >= end:
+            raise BencodeError("dict key without value")
+        key = data[kstart:pos]
+        c = data[pos]
+        field = _STR_FIELDS.get(key)
+        if field is not None and _0 <= c <= _9:
+            start, pos = _str_bounds(data, pos, end)
+            if field == "nodes" or field == "samples":
+                setattr(msg, field, view[start:pos])
+            else:
+                setattr(msg, field, data[start:pos])
+            continue
+        field = _INT_FIELDS.get(key)
+        if field is not None and c == _I:
+            value, pos = _read_int(data, pos, end)
+            setattr(msg, field, value)
+            continue
+        if key == b"values" and c == _L:
+            msg.values, pos = _parse_str_list(data, pos, end)
+            continue
+        pos = _skip(data, pos, end)
+
+def _match_query(data):
+    m = _QUERY_RE.fullmatch(data)
+    if m is None:
+        return None
+    (nid, implied_port, info_hash, port, target,
+     token_len, token, query, t_len, t) = m.groups()
+    if token is not None and len(token) != int(token_len):
+        return None
+    if len(t) != t_len[0] - _0:
+        return None
+    return KRPCMessage(b"q", t, _QUERY_NAMES[query], nid, info_hash, token, target,
+                       int(port) if port is not None else None,
+                       1 if implied_port == b"1" else 0)
+
+def _match_response(data):
+    m = _RESPONSE_HEAD_RE.match(data)
+    if m is None:
+        return None
+    pos = m.end()
+    msg = KRPCMessage(b"r", None, None, m.group(1))
+    nodes_len = m.group(2)
+    if nodes_len is not None:
+        stop = pos + int(nodes_len)
+        if stop > len(data):
+            return None
+        msg.nodes = memoryview(data)[pos:stop]
+        pos = stop
+    if data.startswith(b"5:token", pos):
+        t = _TOKEN_RE.match(data, pos)
+        if t is None:
+            return None
+        pos = t.end()
+        stop = pos + int(t.group(1))
+        msg.token = data[pos:stop]
+        pos = stop
+    if data.startswith(b"6:valuesl", pos):
+        v = _VALUES_RE.match(data, pos + 9)
+        if v is None:
+            return None
+        # _VALUES_RE validated the run of 6-byte strings, findall splits it in C
+        msg.values = _VALUE_ITEM_RE.findall(data, pos + 9, v.end() - 1)
+        pos = v.end()
+    m = _RESPONSE_TAIL_RE.fullmatch(data, pos)
+    if m is None:
+        return None
+    t_len, t = m.groups()
+    if len(t) != t_len[0] - _0:   # t_len is a single digit
+        return None
+    msg.t = t
+    return msg
+
+def parse_krpc(data):
+    """
+    Parse a KRPC datagram into a KRPCMessage
+
+    Only t/y/q and the handler-relevant keys of a/r are decoded. The large
+    payloads (r.nodes, r.samples) are returned as memoryview slices of the
+    datagram instead of copies; r.values is a list of short bytes entries.
+    Raises BencodeError on any malformed or truncated input.
+    """
+    end = len(data)
+    if not end or data[0] != _D:
+        raise BencodeError("KRPC message is not a dict")
+    if data.endswith(b"1:y1:qe"):
+        msg = _match_query(data)
+    elif data.endswith(b"1:y1:re"):
+        msg = _match_response(data)
+    else:
+        msg = None
+    if msg is not None:
+        return msg
+    view = memoryview(data)
+    msg = KRPCMessage()
+    pos = 1
+    while True:
+        if pos >= end:
+            raise BencodeError("truncated dict")
+        if data[pos] == _E:
+            pos += 1
+            break
+        kstart, pos = _str_bounds(data, pos, end)
+        if pos >= end:
+            raise BencodeError("dict key without value")
+        key = data[kstart:pos]
+        c = data[pos]
+        if (key == b"t" or key == b"y" or key == b"q") and _0 <= c <= _9:
+            start, pos = _str_bounds(data, pos, end)
+            setattr(msg, key.decode(), data[start:pos])
+        elif (key == b"a" or key == b"r") and c == _D:
+            pos = _parse_args(data, pos, end, view, msg)
+        else:
+            pos = _skip(data, pos, end)
+    if pos != end:
+        raise BencodeError("invalid bencoded value (data after valid prefix)")
+    return msg
@@ -40,7 +40,7 @@ def decode_name(bs):
         except: continue
     return bs.decode('utf-8', 'replace')
 
-def metadata_worker(meta_queue, db_queue, logger):
+def metadata_worker(meta_queue, db_queue, logger, swarm=None, swarm_lock=None):
     global fetch_stats, ip_blacklist
     while not stop_event.is_set():
         try:
@@ -89,6 +89,9 @@ def metadata_worker(meta_queue, db_queue, logger):
                                 
                                 # 提交到数据库写入队列
                                 db_queue.put((metadata, info_hex, ip, b"metadata"))
+                                # 入库后下一次 flush 再写一次 swarm 估计值
+                                if swarm is not None:
+                                    with swarm_lock: swarm.touch(info_hash)
                             except Exception as e:
                                 logger.error(f"Queue submission error: {e}")
                         else:
@@ -134,28 +137,43 @@ def main():
     logging.basicConfig(level=logging.ERROR, format='%(message)s')
     logger = logging.getLogger("Main")
     info_queue = multiprocessing.Queue(maxsize=MAX_QUEUE_SIZE)
-    db_queue = multiprocessing.Queue(maxsize=5000)  # 数据库写入队列
     meta_queue = queue.PriorityQueue(maxsize=MAX_QUEUE_SIZE)
     
     # 启动数据库写入进程
     from workers.db_writer import DBWriter
+    from workers.write_router import WriteRouter
     from config.settings import DB_WRITER_WORKERS, DB_BATCH_SIZE, DB_BATCH_TIMEOUT
+    from config.settings import DEMAND_FLUSH_SEC, DEMAND_HALF_LIFE_SEC
+    from config.settings import SWARM_FLUSH_SEC, SWARM_MEMORY_MB
+    from config.settings import ANNOUNCE_FLUSH_SEC, SOURCE_IPS_MAX
+    from popularity import DemandAggregator, SwarmTracker
+    from services.announce_aggregator import AnnounceAggregator
     
+    # 写入进程的背压指标（见 DBWriter.METRIC_SLOTS）
+    # 数据库写入队列按 info_hash 分区，每个写入进程一个
+    db_queue = WriteRouter(DB_WRITER_WORKERS, maxsize=5000)
+    writer_metrics = multiprocessing.Array('d', db_queue.partitions * DBWriter.METRIC_SLOTS, lock=False)
     db_writers = []
-    for _ in range(DB_WRITER_WORKERS):
-        p = multiprocessing.Process(target=DBWriter.worker, args=(db_queue, DB_BATCH_SIZE, DB_BATCH_TIMEOUT))
+    for i in range(db_queue.partitions):
+        p = multiprocessing.Process(target=DBWriter.worker, args=(db_queue.queues[i], DB_BATCH_SIZE, DB_BATCH_TIMEOUT, i, writer_metrics))
         p.daemon = True
         p.start()
         db_writers.append(p)
     
     # 启动元数据工作线程
+    swarm = SwarmTracker(memory_budget=SWARM_MEMORY_MB * 1024 * 1024)
+    swarm_lock = threading.Lock()
     for _ in range(METADATA_WORKERS):
-        threading.Thread(target=metadata_worker, args=(meta_queue, db_queue, logger), daemon=True).start()
+        threading.Thread(target=metadata_worker, args=(meta_queue, db_queue, logger, swarm, swarm_lock), daemon=True).start()
     
     # Start DHT servers with dedicated find_node threads
+    # pacer_rates[2*i], pacer_rates[2*i+1] = achieved / target find_node rate of server i
+    pacer_rates = multiprocessing.Array('d', DHT_SERVERS * 2, lock=False)
+    # token_counts[2*i], token_counts[2*i+1] = token cache hits / misses of server i
+    token_counts = multiprocessing.Array('d', DHT_SERVERS * 2, lock=False)
     dht_processes = []
     for i in range(DHT_SERVERS):
-        p = multiprocessing.Process(target=run_dht_server, args=(info_queue, MAX_NODE_QSIZE))
+        p = multiprocessing.Process(target=run_dht_server, args=(info_queue, MAX_NODE_QSIZE, pacer_rates, i, token_counts))
         p.start()
         dht_processes.append(p)
     
@@ -170,19 +188,40 @@ def main():
     
     processed_tasks = set()
     last_print = 0.0
+    demand = DemandAggregator(half_life=DEMAND_HALF_LIFE_SEC)
+    last_demand_flush = time.time()
+    last_swarm_flush = last_demand_flush
+    announces = AnnounceAggregator(max_ips=SOURCE_IPS_MAX)
+    last_announce_flush = last_demand_flush
 
     while not stop_event.is_set():
         now = time.time()
         try: event = info_queue.get(timeout=0.5)
         except queue.Empty: event = None
         
+        # DHT demand window from a server process: (b"demand", sketch_bytes, candidates, events)
+        if event and event[0] == b"demand":
+            try: demand.merge_window(event[1], event[2], event[3])
+            except Exception as e: logger.debug(f"Demand merge error: {e}")
+            event = None
+        
         if event:
             try:
                 ev_t, info_h, src, port = event
                 if not info_h: continue
                 
-                # Smart port selection
-                if ev_t == b"announce_peer":
+                # Peers that announced or were handed out count towards swarm size
+                if ev_t == b"announce_peer" or ev_t == b"reannounce" or ev_t == b"peer_value":
+                    with swarm_lock: swarm.add(info_h, src[0])
+                
+                # 每次 announce（含重复）在主进程按窗口聚合（last_seen / announce_count / source_ips）
+                if ev_t == b"announce_peer" or ev_t == b"reannounce":
+                    announces.add(info_h.hex(), src[0])
+                
+                # Smart port selection（最近已处理过的哈希 reannounce 只计数，不再抓取元数据）
+                if ev_t == b"reannounce":
+                    prio = None
+                elif ev_t == b"announce_peer":
                     prio = 1
                     target_port = port if port and port > 0 else 6881
                 elif ev_t == b"peer_value":
@@ -193,7 +232,7 @@ def main():
                     target_port = src[1] if src[1] > 0 else 6881
                 
                 task_key = (info_h, src[0])
-                if task_key not in processed_tasks:
+                if prio is not None and task_key not in processed_tasks:
                     processed_tasks.add(task_key)
                     meta_queue.put((prio, (info_h, src[0], target_port)), block=False)
                     if len(processed_tasks) > 50000: processed_tasks.clear()
@@ -210,14 +249,53 @@ def main():
                         to_del.append(ip)
                 for ip in to_del: del ip_blacklist[ip]
                 bl_size = len(ip_blacklist)
-            print(f"STAT: Q={meta_queue.qsize()} | BL={bl_size} | Att={s['att']} | Conn={s['conn']} | HS={s['hs']} | OK={s['ok']}", end='\r')
+            fn_achieved = sum(pacer_rates[0::2])
+            fn_target = sum(pacer_rates[1::2])
+            tok_hits = sum(token_counts[0::2])
+            tok_total = tok_hits + sum(token_counts[1::2])
+            tok_rate = 100.0 * tok_hits / tok_total if tok_total else 0.0
+            slots = DBWriter.METRIC_SLOTS
+            spool_items = int(sum(writer_metrics[0::slots]))
+            spool_mb = sum(writer_metrics[1::slots]) / (1024 * 1024)
+            db_latency = max(writer_metrics[2::slots])
+            spooling = int(sum(writer_metrics[3::slots]))
+            try: dbq = db_queue.qsize()
+            except NotImplementedError: dbq = -1
+            print(f"STAT: Q={meta_queue.qsize()} | DBQ={dbq} | SP={spool_items}/{spool_mb:.1f}MB({spooling}) | DBW={db_latency:.2f}s | BL={bl_size} | FN={fn_achieved:.0f}/{fn_target:.0f}pps | TOK={tok_rate:.0f}% | Att={s['att']} | Conn={s['conn']} | HS={s['hs']} | OK={s['ok']}", end='\r')
             last_print = now
 
-def run_dht_server(info_queue, max_node_qsize):
+        if now - last_demand_flush >= DEMAND_FLUSH_SEC:
+            demand.decay(now - last_demand_flush)
+            scores = demand.flush()
+            if scores:
+                # 交给数据库写入进程更新 dht_demand
+                try: db_queue.put_nowait((scores, None, None, b"demand"))
+                except queue.Full: pass
+            last_demand_flush = now
+
+        if announces and (announces.full or now - last_announce_flush >= ANNOUNCE_FLUSH_SEC):
+            # 一个窗口只发一个批量事件，由写入进程按哈希批量 UPDATE
+            try: db_queue.put_nowait((announces.drain(), None, None, b"announce"))
+            except queue.Full: announces.drain()
+            last_announce_flush = now
+
+        if now - last_swarm_flush >= SWARM_FLUSH_SEC:
+            with swarm_lock: estimates = swarm.flush()
+            if estimates:
+                # 交给数据库写入进程更新 peer_count / health_score
+                try: db_queue.put_nowait((estimates, None, None, b"swarm"))
+                except queue.Full: pass
+            last_swarm_flush = now
+
+def run_dht_server(info_queue, max_node_qsize, pacer_rates=None, index=0, token_counts=None):
     signal.signal(signal.SIGINT, signal.SIG_IGN)
     logging.getLogger("DHTServer").setLevel(logging.ERROR)
+    from config.settings import FIND_NODE_RATE, FIND_NODE_BURST, FIND_NODE_MIN_INTERVAL
     
-    server = DHTServer("0.0.0.0", 0, info_queue, max_node_qsize)
+    server = DHTServer("0.0.0.0", 0, info_queue, max_node_qsize,
+                       find_node_rate=FIND_NODE_RATE,
+                       find_node_burst=FIND_NODE_BURST,
+                       find_node_min_interval=FIND_NODE_MIN_INTERVAL)
     server.daemon = True
     server.start()
     
@@ -226,8 +304,15 @@ def run_dht_server(info_queue, max_node_qsize):
     find_node_thread.daemon = True
     find_node_thread.start()
     
-    # Keep process alive
+    # Keep process alive, publish pacer rates and token cache counters for the STAT line
     while server.is_alive():
+        if pacer_rates is not None:
+            pacer_rates[2 * index] = server.pacer.achieved_rate
+            pacer_rates[2 * index + 1] = server.pacer.target_rate
+        if token_counts is not None:
+            tokens = server.token_stats()
+            token_counts[2 * index] = tokens["hits"]
+            token_counts[2 * index + 1] = tokens["misses"]
         time.sleep(1)
 
 if __name__ == "__main__": main()
@@ -3,12 +3,18 @@ import struct
 import time
 import hashlib
 import math
-from bencode import bencode, bdecode
+from bencode import bencode, bdecode, BDecoder
 from utils import get_rand_id
 
 BT_PROTOCOL = b"BitTorrent protocol"
 BT_MSG_ID = 20
 EXT_HANDSHAKE_ID = 0
+UT_METADATA_ID = 1  # Our local id for ut_metadata, peers send pieces with it
+METADATA_PIECE_SIZE = 16 * 1024
+MAX_METADATA_SIZE = 10 * 1024 * 1024
+MAX_MESSAGE_SIZE = METADATA_PIECE_SIZE + 1024 * 1024
+REQUEST_WINDOW = 4   # Outstanding ut_metadata piece requests per peer
+MAX_REJECTS = 8      # Give up on a peer after this many rejected requests
 
 class MetadataFetcher:
     def __init__(self, info_hash, address, timeout=10):
@@ -37,9 +43,7 @@ class MetadataFetcher:
             
             # Read response with timeout
             self.sock.settimeout(3)  # Quick handshake timeout
-            response = self.sock.recv(68)
-            if len(response) < 68:
-                return False
+            response = self.recv_exact(68)
             
             # Check protocol
             plen = response[0]
@@ -57,61 +61,56 @@ class MetadataFetcher:
     def get_metadata(self):
         try:
             # Send extension handshake
-            msg = bytes([BT_MSG_ID, EXT_HANDSHAKE_ID]) + bencode({b"m": {b"ut_metadata": 1}})
+            msg = bytes([BT_MSG_ID, EXT_HANDSHAKE_ID]) + bencode({b"m": {b"ut_metadata": UT_METADATA_ID}})
             self.send_message(msg)
+            deadline = time.time() + self.timeout * 2
             
-            # Read extension handshake response with longer timeout
-            packet = self.recv_all(timeout=self.timeout)
-            if not packet:
+            # Read extension handshake response
+            ext = self.recv_extended(EXT_HANDSHAKE_ID, deadline)
+            if not ext:
                 return None
+            header, _ = ext
             
             # Parse to find ut_metadata and metadata_size
-            ut_metadata = self.get_ut_metadata(packet)
-            metadata_size = self.get_metadata_size(packet)
+            m = header.get(b"m")
+            ut_metadata = m.get(b"ut_metadata") if isinstance(m, dict) else None
+            metadata_size = header.get(b"metadata_size")
             
-            if not ut_metadata or not metadata_size:
+            if not isinstance(ut_metadata, int) or not isinstance(metadata_size, int):
                 return None
-            
-            # Request each piece
-            num_pieces = int(math.ceil(metadata_size / (16.0 * 1024)))
-            metadata = []
-            
-            for piece in range(num_pieces):
-                self.request_metadata(ut_metadata, piece)
-                packet = self.recv_all(timeout=self.timeout)
-                if packet:
-                    # Extract piece data - try multiple methods
-                    piece_data = None
-                    
-                    # Method 1: Look for "ee" marker (most common)
-                    try:
-                        idx = packet.index(b"ee")
-                        piece_data = packet[idx+2:]
-                    except:
-                        pass
-                    
-                    # Method 2: Look for msg_type and extract after bencode
-                    if not piece_data:
-                        try:
-                            # Find the bencode dict end and take everything after
-                            msg_type_idx = packet.find(b"msg_type")
-                            if msg_type_idx > 0:
-                                # Scan for the end of bencode dict
-                                for i in range(msg_type_idx, len(packet)):
-                                    if packet[i:i+2] == b"ee":
-                                        piece_data = packet[i+2:]
-                                        break
-                        except:
-                            pass
-                    
-                    if piece_data:
-                        metadata.append(piece_data)
-            
-            # Combine and verify
-            if not metadata:
+            if not 0 < ut_metadata < 256 or not 0 < metadata_size <= MAX_METADATA_SIZE:
                 return None
+            
+            # Keep a bounded window of requests in flight; rejected pieces are re-requested
+            num_pieces = int(math.ceil(metadata_size / float(METADATA_PIECE_SIZE)))
+            pieces = {}
+            pending = set()
+            rejects = 0
+            next_piece = 0
+            while len(pieces) < num_pieces:
+                while next_piece < num_pieces and len(pending) < REQUEST_WINDOW:
+                    self.request_metadata(ut_metadata, next_piece)
+                    pending.add(next_piece)
+                    next_piece += 1
                 
-            full_metadata = b"".join(metadata)
+                ext = self.recv_extended(UT_METADATA_ID, deadline)
+                if not ext:
+                    return None
+                header, piece_data = ext
+                msg_type = header.get(b"msg_type")
+                piece = header.get(b"piece")
+                if piece not in pending:
+                    continue
+                if msg_type == 1:
+                    pieces[piece] = piece_data
+                    pending.discard(piece)
+                elif msg_type == 2:  # reject - peer may be rate limiting, ask again
+                    rejects += 1
+                    if rejects > MAX_REJECTS:
+                        return None
+                    self.request_metadata(ut_metadata, piece)
+            
+            full_metadata = b"".join(pieces[i] for i in range(num_pieces))
             
             # Trim to exact size if we got extra data
             if len(full_metadata) > metadata_size:
@@ -136,49 +135,58 @@ class MetadataFetcher:
         msg = bytes([BT_MSG_ID, ut_metadata]) + bencode({b"msg_type": 0, b"piece": piece})
         self.send_message(msg)
 
-    def recv_all(self, timeout=6):
-        self.sock.setblocking(False)
-        total_data = []
-        begin = time.time()
-        
-        while True:
-            time.sleep(0.01)  # Even faster polling
-            elapsed = time.time() - begin
-            
-            # If we have data and haven't received more for timeout seconds, done
-            if total_data and elapsed > timeout:
-                break
-            # If we have no data and it's been timeout*1.5, give up faster
-            elif not total_data and elapsed > timeout * 1.5:
-                break
-            
-            try:
-                data = self.sock.recv(8192)  # Even larger buffer
-                if data:
-                    total_data.append(data)
-                    begin = time.time()  # Reset timer on new data
-            except:
-                pass
-        
-        return b"".join(total_data)
+    def recv_exact(self, n):
+        """Read exactly n bytes, raises socket.error on EOF/timeout"""
+        buf = bytearray()
+        while len(buf) < n:
+            data = self.sock.recv(n - len(buf))
+            if not data:
+                raise ConnectionError("peer closed connection")
+            buf += data
+        return bytes(buf)
 
-    def get_ut_metadata(self, data):
-        try:
-            ut_metadata = b"_metadata"
-            index = data.index(ut_metadata) + len(ut_metadata) + 1
-            return int(data[index:index+1])
-        except:
-            return None
+    def recv_extended(self, ext_id, deadline):
+        """
+        Read wire messages until an extended message with ext_id arrives
 
-    def get_metadata_size(self, data):
-        try:
-            metadata_size = b"metadata_size"
-            start = data.index(metadata_size) + len(metadata_size) + 1
-            data = data[start:]
-            end = data.index(b"e")
-            return int(data[:end])
-        except:
-            return None
+        The bencoded header is decoded while the message body is still
+        streaming in; whatever follows it (ut_metadata piece data) is
+        returned raw. Returns (header, trailing_bytes) or None.
+        """
+        while time.time() < deadline:
+            self.sock.settimeout(max(0.1, min(self.timeout, deadline - time.time())))
+            length, = struct.unpack(">I", self.recv_exact(4))
+            if length == 0:  # keep-alive
+                continue
+            if length > MAX_MESSAGE_SIZE:
+                return None
+            msg_id = self.recv_exact(1)[0]
+            remaining = length - 1
+            if msg_id != BT_MSG_ID or remaining < 1:
+                # bitfield/have/... - not interesting, skip the body
+                while remaining:
+                    remaining -= len(self.recv_exact(min(remaining, 16384)))
+                continue
+            msg_ext_id = self.recv_exact(1)[0]
+            remaining -= 1
+            decoder = BDecoder(max_values=1)
+            header = None
+            while remaining:
+                chunk = self.recv_exact(min(remaining, 16384))
+                remaining -= len(chunk)
+                values = decoder.feed(chunk)
+                if values:
+                    header = values[0]
+                    break
+            if msg_ext_id != ext_id:
+                while remaining:
+                    remaining -= len(self.recv_exact(min(remaining, 16384)))
+                continue
+            if not isinstance(header, dict):
+                return None
+            trailing = decoder.unconsumed() + (self.recv_exact(remaining) if remaining else b"")
+            return header, trailing
+        return None
 
     def close(self):
         if self.sock:
@@ -0,0 +1,123 @@
+"""
+find_node pacer
+
+Token-bucket rate control for the outgoing find_node stream. A global bucket
+enforces the packets/s budget (with a burst allowance), sends go out in
+batches once per tick instead of one sleep per packet, and a per-destination
+minimum interval keeps us from hammering any single large DHT node.
+"""
+import time
+import logging
+
+from utils import dottedQuadToNum
+
+logger = logging.getLogger("FindNodePacer")
+
+class TokenBucket:
+    """Classic token bucket: refills at rate tokens/s, holds at most burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1))
+        self.tokens = self.burst
+        self.last = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        return int(self.tokens)
+
+    def consume(self, n):
+        self.tokens -= n
+
+class FindNodePacer:
+    """
+    Drains DHTServer.nodes through send_find_node at a controlled rate
+
+    参数:
+        server: DHTServer - provides nodes deque, send_find_node and running
+        rate: float - global find_node budget in packets/s
+        burst: int - max packets allowed in one burst (bucket size)
+        min_interval: float - min seconds between two sends to the same IP
+        tick: float - batch interval in seconds
+    """
+
+    STATS_WINDOW_SEC = 1.0
+
+    def __init__(self, server, rate=500, burst=100, min_interval=1.0, tick=0.01):
+        self.server = server
+        self.bucket = TokenBucket(rate, burst)
+        self.min_interval = min_interval
+        self.tick = tick
+        self.last_sent = {}   # ip(int) -> monotonic time of last find_node
+        self.sent = 0
+        self.throttled = 0    # nodes dropped by the per-destination interval
+        self.achieved_rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_sent = 0
+        self._last_prune = self._window_start
+
+    @property
+    def target_rate(self):
+        return self.bucket.rate
+
+    def run_tick(self, now):
+        """Send one batch, returns the number of packets sent"""
+        budget = self.bucket.refill(now)
+        nodes = self.server.nodes
+        last_sent = self.last_sent
+        min_interval = self.min_interval
+        sent = 0
+        while sent < budget and nodes:
+            node = nodes.popleft()
+            ip = node.ip
+            if type(ip) is not int:
+                ip = dottedQuadToNum(ip)
+            prev = last_sent.get(ip)
+            if prev is not None and now - prev < min_interval:
+                self.throttled += 1
+                continue
+            last_sent[ip] = now
+            self.server.send_find_node(node.address, node.nid)
+            sent += 1
+        self.bucket.consume(sent)
+        self.sent += sent
+        self._window_sent += sent
+        return sent
+
+    def update_stats(self, now):
+        elapsed = now - self._window_start
+        if elapsed >= self.STATS_WINDOW_SEC:
+            self.achieved_rate = self._window_sent / elapsed
+            self._window_start = now
+            self._window_sent = 0
+        if now - self._last_prune >= max(self.min_interval, 1.0):
+            cutoff = now - self.min_interval
+            self.last_sent = {ip: ts for ip, ts in self.last_sent.items() if ts > cutoff}
+            self._last_prune = now
+
+    def stats(self):
+        return {
+            "target_rate": self.target_rate,
+            "achieved_rate": self.achieved_rate,
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "tracked_ips": len(self.last_sent),
+        }
+
+    def run(self):
+        next_tick = time.monotonic()
+        while self.server.running:
+            now = time.monotonic()
+            try:
+                self.run_tick(now)
+                self.update_stats(now)
+            except Exception as e:
+                logger.debug(f"Pacer tick error: {e}")
+            next_tick += self.tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (GIL, slow send) - don't try to catch up in a burst
+                next_tick = time.monotonic()
@@ -0,0 +1,260 @@
+"""
+DHT demand tracking
+
+Every get_peers / announce_peer we see is a vote for that infohash. Each DHT
+process counts them in a small count-min sketch (fixed memory, no per-hash
+dicts) and keeps a bounded set of heavy-hitter candidates. Periodically the
+window is shipped to the main process, which merges all windows into a
+time-decayed global sketch and flushes estimates for the candidates.
+
+SwarmTracker does the same kind of job for swarm size: a HyperLogLog of
+distinct peer IPs per infohash.
+"""
+from array import array
+from collections import OrderedDict
+import hashlib
+import math
+
+class CountMinSketch:
+    """
+    Count-min sketch keyed by 20-byte infohashes
+
+    Infohashes are SHA-1 digests and already uniformly distributed, so the
+    row indexes are taken straight from 4-byte slices of the key instead of
+    hashing again (depth <= 5).
+    """
+
+    def __init__(self, width=32768, depth=4):
+        if not 1 <= depth <= 5:
+            raise ValueError("depth must be between 1 and 5")
+        self.width = width
+        self.depth = depth
+        self.rows = [array('I', bytes(4 * width)) for _ in range(depth)]
+
+    def _indexes(self, key):
+        width = self.width
+        return [int.from_bytes(key[4 * i:4 * i + 4], 'big') % width for i in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Add count to key, returns the new estimate"""
+        est = None
+        for row, idx in zip(self.rows, self._indexes(key)):
+            v = min(row[idx] + count, 0xFFFFFFFF)
+            row[idx] = v
+            if est is None or v < est:
+                est = v
+        return est
+
+    def estimate(self, key):
+        return min(row[idx] for row, idx in zip(self.rows, self._indexes(key)))
+
+    def merge(self, other):
+        if other.width != self.width or other.depth != self.depth:
+            raise ValueError("sketch dimensions differ")
+        for row, orow in zip(self.rows, other.rows):
+            for i, v in enumerate(orow):
+                if v:
+                    row[i] = min(row[i] + v, 0xFFFFFFFF)
+
+    def decay(self, factor):
+        """Scale all counters by factor (0-1), used for exponential time decay"""
+        for idx, row in enumerate(self.rows):
+            self.rows[idx] = array('I', (int(v * factor) for v in row))
+
+    def to_bytes(self):
+        return b"".join(row.tobytes() for row in self.rows)
+
+    @classmethod
+    def from_bytes(cls, data, width, depth):
+        sketch = cls(width, depth)
+        size = 4 * width
+        for i in range(depth):
+            sketch.rows[i] = array('I')
+            sketch.rows[i].frombytes(data[i * size:(i + 1) * size])
+        return sketch
+
+class DemandTracker:
+    """Per-DHT-process demand window: sketch + heavy-hitter candidates"""
+
+    def __init__(self, width=32768, depth=4, candidate_threshold=3, max_candidates=5000):
+        self.width = width
+        self.depth = depth
+        self.candidate_threshold = candidate_threshold
+        self.max_candidates = max_candidates
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = set()
+        self.events = 0
+
+    def add(self, info_hash):
+        self.events += 1
+        if self.sketch.add(info_hash) >= self.candidate_threshold:
+            if len(self.candidates) < self.max_candidates:
+                self.candidates.add(info_hash)
+
+    def snapshot(self):
+        """Return (sketch_bytes, candidates, events) and start a new window"""
+        snap = (self.sketch.to_bytes(), list(self.candidates), self.events)
+        self.sketch = CountMinSketch(self.width, self.depth)
+        self.candidates = set()
+        self.events = 0
+        return snap
+
+class DemandAggregator:
+    """
+    Main-process view of DHT demand
+
+    Windows from all DHT processes are merged into one sketch that decays by
+    half every half_life seconds, so the estimate is a time-weighted query
+    count rather than an all-time total.
+    """
+
+    def __init__(self, width=32768, depth=4, half_life=3600, max_candidates=50000):
+        self.width = width
+        self.depth = depth
+        self.half_life = half_life
+        self.max_candidates = max_candidates
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = set()
+        self.events = 0
+
+    def merge_window(self, sketch_bytes, candidates, events):
+        self.sketch.merge(CountMinSketch.from_bytes(sketch_bytes, self.width, self.depth))
+        self.events += events
+        for h in candidates:
+            if len(self.candidates) >= self.max_candidates:
+                break
+            self.candidates.add(h)
+
+    def decay(self, elapsed):
+        self.sketch.decay(0.5 ** (elapsed / self.half_life))
+
+    def flush(self, min_score=1):
+        """
+        Return {info_hash_hex: estimate} for all candidates. Candidates that
+        decayed below min_score are reported once with 0 and then dropped.
+        """
+        scores = {}
+        expired = []
+        for h in self.candidates:
+            est = self.sketch.estimate(h)
+            if est < min_score:
+                est = 0
+                expired.append(h)
+            scores[h.hex()] = est
+        self.candidates.difference_update(expired)
+        return scores
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over 64-bit hashes
+
+    Small sets (up to sparse_limit items) are stored exactly as a set of
+    hashes and only promoted to a register array once they grow, because
+    most swarms we see have a handful of peers.
+    """
+    __slots__ = ("p", "sparse", "registers")
+
+    def __init__(self, p=8):
+        self.p = p
+        self.sparse = set()
+        self.registers = None
+
+    def add_hash(self, x, sparse_limit=16):
+        """Add a 64-bit hash, returns True if the sketch changed"""
+        if self.registers is None:
+            if x in self.sparse:
+                return False
+            self.sparse.add(x)
+            if len(self.sparse) > sparse_limit:
+                self.registers = bytearray(1 << self.p)
+                for h in self.sparse:
+                    self._add_register(h)
+                self.sparse = None
+            return True
+        return self._add_register(x)
+
+    def _add_register(self, x):
+        p = self.p
+        idx = x >> (64 - p)
+        w = (x << p) & 0xFFFFFFFFFFFFFFFF
+        rank = min(64 - w.bit_length() + 1, 64 - p + 1)
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+            return True
+        return False
+
+    def estimate(self):
+        if self.registers is None:
+            return len(self.sparse)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        z = sum(2.0 ** -r for r in self.registers)
+        est = alpha * m * m / z
+        zeros = self.registers.count(0)
+        if est <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            est = m * math.log(m / zeros)
+        return int(round(est))
+
+    def size(self):
+        """Approximate memory used, for the budget"""
+        if self.registers is None:
+            return 64 + 32 * len(self.sparse)
+        return 64 + len(self.registers)
+
+class SwarmTracker:
+    """
+    Distinct peer IPs per infohash, estimated with HyperLogLog
+
+    Lives in the crawler main process and is fed by announce_peer and
+    peer_value events. Memory is capped by memory_budget bytes; least
+    recently updated hashes are evicted first (their latest estimate is kept
+    for the next flush).
+    """
+
+    def __init__(self, memory_budget=32 * 1024 * 1024, p=8):
+        self.memory_budget = memory_budget
+        self.p = p
+        self.sketches = OrderedDict()   # info_hash -> HyperLogLog
+        self.dirty = set()
+        self.pending = {}               # estimates of evicted dirty hashes
+        self.memory = 0
+
+    def add(self, info_hash, ip):
+        x = int.from_bytes(hashlib.blake2b(ip.encode(), digest_size=8).digest(), 'big')
+        hll = self.sketches.get(info_hash)
+        if hll is None:
+            hll = HyperLogLog(self.p)
+            self.sketches[info_hash] = hll
+            self.memory += hll.size()
+        else:
+            self.sketches.move_to_end(info_hash)
+        before = hll.size()
+        if hll.add_hash(x):
+            self.dirty.add(info_hash)
+            self.memory += hll.size() - before
+        while self.memory > self.memory_budget and len(self.sketches) > 1:
+            self._evict()
+
+    def touch(self, info_hash):
+        """Force info_hash into the next flush (e.g. after its metadata arrived)"""
+        if info_hash in self.sketches:
+            self.dirty.add(info_hash)
+
+    def _evict(self):
+        h, hll = self.sketches.popitem(last=False)
+        self.memory -= hll.size()
+        if h in self.dirty:
+            self.dirty.discard(h)
+            self.pending[h.hex()] = hll.estimate()
+
+    def flush(self):
+        """Return {info_hash_hex: estimated_peers} for hashes changed since last flush"""
+        estimates = self.pending
+        self.pending = {}
+        for h in self.dirty:
+            hll = self.sketches.get(h)
+            if hll is not None:
+                estimates[h.hex()] = hll.estimate()
+        self.dirty = set()
+        return estimates
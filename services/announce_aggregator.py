@@ -0,0 +1,77 @@
+"""
+重复 announce 聚合器
+按哈希合并一个窗口内的重复发现: 爬虫主进程合并 announce_peer 后每个窗口发一次批量事件，
+写入进程再并入批次去重时发现的重复种子，定期批量刷新到数据库
+"""
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AnnounceAggregator:
+    """
+    按 info_hash 聚合重复发现（announce_count / last_seen / source_ips）
+
+    参数:
+        max_ips: int - 每个哈希保留的来源 IP 上限（保留最新的）
+        max_hashes: int - 窗口内最多聚合的哈希数，达到后应立即刷新
+    """
+
+    def __init__(self, max_ips=20, max_hashes=50000):
+        self.max_ips = max_ips
+        self.max_hashes = max_hashes
+        self.pending = {}   # info_hash -> [count, last_seen, ips]
+        self.events = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    @property
+    def full(self):
+        return len(self.pending) >= self.max_hashes
+
+    def add(self, info_hash, source_ip, seen_at=None):
+        """记录一次发现"""
+        seen_at = seen_at or datetime.now()
+        self.events += 1
+        entry = self.pending.get(info_hash)
+        if entry is None:
+            self.pending[info_hash] = [1, seen_at, [source_ip] if source_ip else []]
+            return
+        entry[0] += 1
+        if seen_at > entry[1]:
+            entry[1] = seen_at
+        ips = entry[2]
+        if source_ip:
+            if source_ip in ips:
+                ips.remove(source_ip)
+            ips.append(source_ip)
+            if len(ips) > self.max_ips:
+                del ips[0]
+
+    def merge(self, window):
+        """并入另一个聚合器 drain() 的结果"""
+        for info_hash, (count, seen_at, ips) in window.items():
+            entry = self.pending.get(info_hash)
+            self.events += count
+            if entry is None:
+                self.pending[info_hash] = [count, seen_at, list(ips)[-self.max_ips:]]
+                continue
+            entry[0] += count
+            if seen_at > entry[1]:
+                entry[1] = seen_at
+            entry[2] = self.merge_ips(entry[2], ips, self.max_ips)
+
+    def drain(self):
+        """取出当前窗口 {info_hash: (count, last_seen, ips)} 并清空"""
+        pending = self.pending
+        self.pending = {}
+        self.events = 0
+        return {h: tuple(v) for h, v in pending.items()}
+
+    @staticmethod
+    def merge_ips(old_ips, new_ips, max_ips):
+        """合并来源 IP：去重，新出现的排在后面，只保留最后 max_ips 个"""
+        new_set = set(new_ips)
+        merged = [ip for ip in old_ips if ip not in new_set] + list(new_ips)
+        return merged[-max_ips:]
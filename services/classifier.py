@@ -0,0 +1,183 @@
+"""
+种子分类
+根据文件扩展名（按大小加权）和名称中的标记，填充 category / sub_category /
+quality / codec / language / tags
+
+扩展名表和正则在模块加载时编译一次，入库和批量回填共用。
+"""
+import json
+import os
+import re
+
+# 分类写入的列
+CLASSIFY_COLUMNS = ('category', 'sub_category', 'quality', 'codec', 'language', 'tags')
+
+# 扩展名 -> (内容类型, 子类型)
+EXTENSION_TAXONOMY = {}
+
+def _register(kind, sub, exts):
+    for ext in exts.split():
+        EXTENSION_TAXONOMY['.' + ext] = (kind, sub)
+
+_register('video', 'video', 'mp4 mkv avi mov wmv flv webm m4v ts m2ts mpg mpeg rmvb rm vob 3gp')
+_register('audio', 'lossless', 'flac ape wav alac dsf dff wv tak')
+_register('audio', 'lossy', 'mp3 aac ogg m4a wma opus')
+_register('image', 'image', 'jpg jpeg png gif bmp webp svg tif tiff heic')
+_register('document', 'ebook', 'epub mobi azw azw3 djvu fb2 cbz cbr')
+_register('document', 'document', 'pdf doc docx txt xls xlsx ppt pptx chm')
+_register('software', 'windows', 'exe msi')
+_register('software', 'mac', 'dmg pkg')
+_register('software', 'android', 'apk xapk')
+_register('software', 'linux', 'deb rpm appimage')
+_register('software', 'disc-image', 'iso img bin cue nrg')
+_register('archive', 'archive', 'zip rar 7z tar gz bz2 xz tgz')
+
+# 内容类型对应的 has_* 列
+MEDIA_FLAGS = ('video', 'audio', 'image', 'document', 'software')
+
+# 不参与分类的小文件（字幕、说明、封面等）
+IGNORED_EXTENSIONS = frozenset({'.nfo', '.srt', '.ass', '.ssa', '.sub', '.idx', '.url', '.sfv', '.md5', '.torrent', '.lnk'})
+
+# 名称标记: (正则, 值)，按顺序取第一个命中
+_RESOLUTION_PACK = [
+    (re.compile(r'(?<![a-z0-9])(2160p|4k|uhd)(?![a-z0-9])', re.I), '4K'),
+    (re.compile(r'(?<![a-z0-9])1080[pi](?![a-z0-9])', re.I), '1080p'),
+    (re.compile(r'(?<![a-z0-9])720p(?![a-z0-9])', re.I), '720p'),
+    (re.compile(r'(?<![a-z0-9])(480p|576p|dvdrip)(?![a-z0-9])', re.I), 'SD'),
+]
+_CODEC_PACK = [
+    (re.compile(r'(?<![a-z0-9])(x\.?265|h\.?265|hevc)(?![a-z0-9])', re.I), 'HEVC'),
+    (re.compile(r'(?<![a-z0-9])(x\.?264|h\.?264|avc)(?![a-z0-9])', re.I), 'H.264'),
+    (re.compile(r'(?<![a-z0-9])av1(?![a-z0-9])', re.I), 'AV1'),
+    (re.compile(r'(?<![a-z0-9])vp9(?![a-z0-9])', re.I), 'VP9'),
+    (re.compile(r'(?<![a-z0-9])(xvid|divx)(?![a-z0-9])', re.I), 'XviD'),
+    (re.compile(r'(?<![a-z0-9])flac(?![a-z0-9])', re.I), 'FLAC'),
+]
+_TAG_PACK = [
+    (re.compile(r'(?<![a-z0-9])(blu-?ray|bdrip|bdremux)(?![a-z0-9])', re.I), 'bluray'),
+    (re.compile(r'(?<![a-z0-9])remux(?![a-z0-9])', re.I), 'remux'),
+    (re.compile(r'(?<![a-z0-9])(web-?dl|webrip)(?![a-z0-9])', re.I), 'web'),
+    (re.compile(r'(?<![a-z0-9])hdtv(?![a-z0-9])', re.I), 'hdtv'),
+    (re.compile(r'(?<![a-z0-9])(hdr10\+?|hdr|dolby[ .]?vision|dovi)(?![a-z0-9])', re.I), 'hdr'),
+    (re.compile(r'(?<![a-z0-9])(atmos|truehd|dts(-hd)?)(?![a-z0-9])', re.I), 'surround'),
+    (re.compile(r'(?<![a-z0-9])(complete|全集)', re.I), 'complete'),
+]
+_EPISODE = re.compile(r'(?<![a-z0-9])(s\d{1,2}e\d{1,3}|s\d{1,2}(?![a-z0-9])|season[ .]?\d+|ep?\d{2,3}(?![a-z0-9]))|第.{1,3}[集季話话]', re.I)
+_LANGUAGE_PACK = [
+    (re.compile(r'[぀-ヿ]'), 'ja'),
+    (re.compile(r'[가-힯]'), 'ko'),
+    (re.compile(r'[一-鿿]|(?<![a-z0-9])(chs|cht|chinese|mandarin|国语|中字)(?![a-z0-9])', re.I), 'zh'),
+    (re.compile(r'(?<![a-z0-9])(rus|russian)(?![a-z0-9])|[Ѐ-ӿ]', re.I), 'ru'),
+    (re.compile(r'(?<![a-z0-9])(french|vostfr|truefrench)(?![a-z0-9])', re.I), 'fr'),
+    (re.compile(r'(?<![a-z0-9])(german)(?![a-z0-9])', re.I), 'de'),
+    (re.compile(r'(?<![a-z0-9])(spanish|castellano|latino)(?![a-z0-9])', re.I), 'es'),
+]
+
+def _first(pack, text):
+    for pattern, value in pack:
+        if pattern.search(text):
+            return value
+    return None
+
+def extension_of(path):
+    """文件扩展名（小写，带点）"""
+    return os.path.splitext(path.rsplit('/', 1)[-1].lower())[1]
+
+class TorrentClassifier:
+    """种子分类"""
+
+    @staticmethod
+    def extension_sizes(files):
+        """
+        按扩展名汇总大小
+
+        参数:
+            files: list of (file_path, file_size)
+
+        返回:
+            dict: {扩展名: 总大小}
+        """
+        sizes = {}
+        for path, size in files:
+            ext = extension_of(path)
+            sizes[ext] = sizes.get(ext, 0) + size
+        return sizes
+
+    @staticmethod
+    def media_flags(ext_sizes):
+        """返回 (has_video, has_audio, has_image, has_document, has_software)"""
+        kinds = {EXTENSION_TAXONOMY[ext][0] for ext in ext_sizes if ext in EXTENSION_TAXONOMY}
+        return tuple(kind in kinds for kind in MEDIA_FLAGS)
+
+    @staticmethod
+    def classify(name, ext_sizes):
+        """
+        分类
+
+        参数:
+            name: str - 种子名称
+            ext_sizes: dict - {扩展名: 总大小}（见 extension_sizes）
+
+        返回:
+            dict: category, sub_category, quality, codec, language, tags(list)
+        """
+        # 1. 内容类型: 占总大小最多的类型
+        weights = {}
+        for ext, size in ext_sizes.items():
+            if ext in IGNORED_EXTENSIONS:
+                continue
+            entry = EXTENSION_TAXONOMY.get(ext)
+            if entry is not None:
+                weights[entry] = weights.get(entry, 0) + size + 1
+        category = sub_category = None
+        if weights:
+            kinds = {}
+            for (kind, sub), weight in weights.items():
+                kinds[kind] = kinds.get(kind, 0) + weight
+            category = max(kinds, key=kinds.get)
+            sub_category = max((k for k in weights if k[0] == category), key=weights.get)[1]
+        elif ext_sizes:
+            category = 'other'
+
+        # 2. 名称标记
+        text = name or ''
+        quality = _first(_RESOLUTION_PACK, text)
+        codec = _first(_CODEC_PACK, text)
+        language = _first(_LANGUAGE_PACK, text)
+        tags = [value for pattern, value in _TAG_PACK if pattern.search(text)]
+
+        if category == 'video':
+            sub_category = 'tv' if _EPISODE.search(text) else 'movie'
+        elif category is not None:
+            # 分辨率标记只对视频有意义（软件名里的 "4K" 之类）
+            quality = None
+            if category == 'audio' and codec is None:
+                # 音频编码取占比最大的格式
+                codec = max((e for e in ext_sizes if EXTENSION_TAXONOMY.get(e, ('',))[0] == 'audio'),
+                            key=ext_sizes.get)[1:].upper()
+
+        return {
+            'category': category,
+            'sub_category': sub_category,
+            'quality': quality,
+            'codec': codec,
+            'language': language,
+            'tags': tags,
+        }
+
+    @staticmethod
+    def classify_summary(name, summary):
+        """根据 torrent_file_lists.summary 的扩展名汇总分类（回填大型种子用）"""
+        if isinstance(summary, (str, bytes)):
+            summary = json.loads(summary)
+        ext_sizes = {ext: stat['size'] for ext, stat in (summary or {}).get('extensions', {}).items()}
+        return TorrentClassifier.classify(name, ext_sizes)
+
+    @staticmethod
+    def row_values(result):
+        """转成写库的值（顺序与 CLASSIFY_COLUMNS 一致）"""
+        return (
+            result['category'], result['sub_category'], result['quality'],
+            result['codec'], result['language'],
+            json.dumps(result['tags']) if result['tags'] else None,
+        )
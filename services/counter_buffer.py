@@ -0,0 +1,182 @@
+"""
+计数缓冲
+search_count / view_count 的增量先累加在 Redis 哈希中（HINCRBY），
+由 API 后台任务定期批量写回 MySQL，请求路径上不再执行 UPDATE
+"""
+import time
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mysql_client import MySQLClient
+from database.redis_client import RedisClient, REDIS_KEY_PREFIX
+from database import keys
+from config.settings import COUNTER_FLUSH_BATCH
+
+logger = logging.getLogger(__name__)
+
+class CounterBuffer:
+    """
+    torrents 计数列的写回缓冲
+
+    Redis 键:
+        counters:<列>           - 待写回的增量 {torrent_id: n}
+        counters:<列>:flushing  - 正在写回的快照（RENAME 得到，写回后删除）
+        counters:<列>:since     - 快照中最早一次增量的时间，用于计算写回延迟
+        counters:stats          - 最近一次写回的统计
+    """
+
+    COLUMNS = ('search_count', 'view_count')
+    PREFIX = f"{REDIS_KEY_PREFIX}counters:"
+    LOCK_KEY = f"{REDIS_KEY_PREFIX}counters:lock"
+
+    @classmethod
+    def incr(cls, column, torrent_ids, amount=1):
+        """累加计数（失败只记日志，计数允许少量丢失）"""
+        if column not in cls.COLUMNS or not torrent_ids:
+            return
+        try:
+            key = cls.PREFIX + column
+            pipe = RedisClient.get_client().pipeline(transaction=False)
+            for torrent_id in torrent_ids:
+                pipe.hincrby(key, keys.id_str(torrent_id), amount)
+            pipe.set(f"{key}:since", int(time.time()), nx=True)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to buffer {column}: {e}")
+
+    @classmethod
+    def _apply(cls, column, increments):
+        """把一批增量写入 MySQL，按 id 排序以固定加锁顺序"""
+        params = [(n, keys.db_id(torrent_id)) for torrent_id, n in sorted(increments.items())]
+        return MySQLClient.execute_many(
+            f"UPDATE torrents SET {column} = {column} + %s WHERE id = %s",
+            params
+        )
+
+    @classmethod
+    def flush_column(cls, column, batch_size=None, keepalive=None):
+        """
+        写回一列的缓冲增量
+
+        先把累加哈希 RENAME 成快照（之后的增量进入新的哈希），再用 HSCAN
+        分批读取快照并写入 MySQL，全部写完后删除快照。上次写回中途失败时
+        先重试遗留的快照（可能重复计入一部分增量）。
+
+        keepalive: 每批写入后调用（续期写回锁），返回 False 表示锁已丢失，停止写回
+
+        返回:
+            (写回的种子数, 写回延迟秒数)
+        """
+        batch_size = batch_size or COUNTER_FLUSH_BATCH
+        client = RedisClient.get_client()
+        key = cls.PREFIX + column
+        flushing = f"{key}:flushing"
+        if not client.exists(flushing):
+            if not client.exists(key):
+                return 0, 0.0
+            pipe = client.pipeline()   # MULTI: 快照和起始时间一起切换
+            pipe.rename(key, flushing)
+            pipe.rename(f"{key}:since", f"{flushing}:since")
+            try:
+                pipe.execute()
+            except Exception as e:
+                # :since 不存在（或哈希刚被别处清空）
+                logger.debug(f"Counter snapshot for {column}: {e}")
+                if not client.exists(flushing):
+                    return 0, 0.0
+        since = client.get(f"{flushing}:since")
+        lag = time.time() - int(since) if since else 0.0
+
+        flushed = 0
+        batch = {}
+        for torrent_id, n in client.hscan_iter(flushing, count=batch_size):
+            batch[torrent_id.decode()] = int(n)
+            if len(batch) >= batch_size:
+                cls._apply(column, batch)
+                flushed += len(batch)
+                batch = {}
+                if keepalive and not keepalive():
+                    raise RuntimeError(f"Lost counter flush lock after {flushed} rows")
+        if batch:
+            cls._apply(column, batch)
+            flushed += len(batch)
+        client.delete(flushing, f"{flushing}:since")
+        return flushed, lag
+
+    @classmethod
+    def flush(cls, lock_ttl=300):
+        """
+        写回所有计数列（多个 API 进程用 Redis 锁保证同一时间只有一个在写回）
+
+        锁带随机 token，每批写入后续期，释放时只删除自己的锁；
+        写回超过 lock_ttl 锁被别的进程拿走时停止写回，避免同一快照被重复计入。
+
+        返回:
+            dict: {列: 写回的种子数}，未拿到锁时返回 None
+        """
+        client = RedisClient.get_client()
+        token = RedisClient.acquire_lock(cls.LOCK_KEY, lock_ttl)
+        if token is None:
+            return None
+
+        def keepalive():
+            return RedisClient.extend_lock(cls.LOCK_KEY, token, lock_ttl)
+
+        result = {}
+        try:
+            for column in cls.COLUMNS:
+                if not keepalive():
+                    logger.warning("Counter flush lock lost, stopping")
+                    break
+                start = time.time()
+                try:
+                    rows, lag = cls.flush_column(column, keepalive=keepalive)
+                except Exception as e:
+                    logger.error(f"Counter flush for {column} failed: {e}")
+                    continue
+                result[column] = rows
+                if rows:
+                    client.hset(f"{cls.PREFIX}stats", mapping={
+                        f"{column}:flushed_at": int(time.time()),
+                        f"{column}:rows": rows,
+                        f"{column}:lag_sec": round(lag, 1),
+                        f"{column}:duration_ms": int((time.time() - start) * 1000),
+                    })
+                    logger.info(f"Flushed {column} for {rows} torrents (lag {lag:.0f}s)")
+        finally:
+            RedisClient.release_lock(cls.LOCK_KEY, token)
+        return result
+
+    @classmethod
+    def stats(cls):
+        """
+        缓冲状态: 每列待写回的种子数、当前最早未写回增量的时长（秒），
+        以及最近一次写回的统计
+        """
+        client = RedisClient.get_client()
+        now = time.time()
+        pipe = client.pipeline(transaction=False)
+        for column in cls.COLUMNS:
+            key = cls.PREFIX + column
+            pipe.hlen(key)
+            pipe.hlen(f"{key}:flushing")
+            pipe.get(f"{key}:since")
+            pipe.get(f"{key}:flushing:since")
+        pipe.hgetall(f"{cls.PREFIX}stats")
+        values = pipe.execute()
+        last = {k.decode(): v.decode() for k, v in values[-1].items()}
+        result = {}
+        for i, column in enumerate(cls.COLUMNS):
+            pending, flushing, since, flushing_since = values[4 * i:4 * i + 4]
+            oldest = min(int(t) for t in (since, flushing_since) if t) if (since or flushing_since) else None
+            result[column] = {
+                'pending': pending + flushing,
+                'lag_sec': round(now - oldest, 1) if oldest else 0.0,
+                'last_flushed_at': int(last.get(f"{column}:flushed_at", 0)),
+                'last_rows': int(last.get(f"{column}:rows", 0)),
+                'last_lag_sec': float(last.get(f"{column}:lag_sec", 0)),
+            }
+        return result
@@ -0,0 +1,193 @@
+"""
+文件列表压缩存储
+大型多文件种子的文件树存成一个分块压缩的二进制 blob + 摘要，替代逐行写 torrent_files
+
+blob 格式（大端）:
+    头部: b'FLB1' | file_count(u32) | block_size(u32) | block_count(u32) | block_count × 压缩后长度(u32)
+    数据: block_count 个 zlib 压缩块，每块 block_size 个文件
+    块内记录: file_size(u64) | path_len(u32) | path(UTF-8)
+
+分页时只需读头部和目标块（MySQL SUBSTRING），解压量与文件总数无关。
+
+terms() 生成 torrent_file_terms 的文件名词表（scope=files 搜索用），逐行、blob 存储和单文件种子（用种子名）都有。
+"""
+import json
+import os
+import re
+import struct
+import zlib
+
+MAGIC = b'FLB1'
+HEADER = struct.Struct('>4sIII')
+RECORD = struct.Struct('>QI')
+
+# 文件名中的词: 字母数字串（下划线也作分隔符）
+_WORD = re.compile(r'[^\W_]+')
+
+class FileListCodec:
+    """文件列表 blob 编解码"""
+
+    BLOCK_SIZE = 1000     # 每块文件数
+    TOP_FILES = 10        # 摘要中保留的最大文件数
+    TOP_EXTENSIONS = 20   # 摘要中保留的扩展名数
+
+    @staticmethod
+    def header_length(block_count):
+        return HEADER.size + 4 * block_count
+
+    @staticmethod
+    def encode(files, block_size=None):
+        """
+        编码文件列表
+
+        参数:
+            files: list of (file_path, file_size)，按 file_index 顺序
+
+        返回:
+            (blob, block_count)
+        """
+        block_size = block_size or FileListCodec.BLOCK_SIZE
+        blocks = []
+        for start in range(0, len(files), block_size):
+            buf = bytearray()
+            for path, size in files[start:start + block_size]:
+                raw = path.encode('utf-8', 'replace')
+                buf += RECORD.pack(size, len(raw))
+                buf += raw
+            blocks.append(zlib.compress(bytes(buf), 6))
+        header = HEADER.pack(MAGIC, len(files), block_size, len(blocks))
+        lengths = struct.pack(f'>{len(blocks)}I', *(len(b) for b in blocks))
+        return header + lengths + b''.join(blocks), len(blocks)
+
+    @staticmethod
+    def parse_header(data):
+        """返回 (file_count, block_size, [每块压缩长度])"""
+        magic, file_count, block_size, block_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a file list blob")
+        lengths = list(struct.unpack_from(f'>{block_count}I', data, HEADER.size))
+        return file_count, block_size, lengths
+
+    @staticmethod
+    def decode_block(data):
+        """解压一个块，返回 [(file_path, file_size)]"""
+        raw = zlib.decompress(data)
+        files = []
+        pos = 0
+        end = len(raw)
+        while pos < end:
+            size, length = RECORD.unpack_from(raw, pos)
+            pos += RECORD.size
+            files.append((raw[pos:pos + length].decode('utf-8', 'replace'), size))
+            pos += length
+        return files
+
+    @staticmethod
+    def decode(data):
+        """解码整个 blob，返回 [(file_path, file_size)]"""
+        _, _, lengths = FileListCodec.parse_header(data)
+        files = []
+        pos = FileListCodec.header_length(len(lengths))
+        for length in lengths:
+            files.extend(FileListCodec.decode_block(data[pos:pos + length]))
+            pos += length
+        return files
+
+    @staticmethod
+    def block_range(lengths, block_size, offset, limit):
+        """
+        计算分页需要读取的块
+
+        返回:
+            (first_block, last_block, byte_start, byte_length)，byte_start 为
+            相对 blob 起点的偏移（0 起）；没有数据时返回 None
+        """
+        if limit <= 0 or offset >= len(lengths) * block_size:
+            return None
+        first = offset // block_size
+        last = min((offset + limit - 1) // block_size, len(lengths) - 1)
+        byte_start = FileListCodec.header_length(len(lengths)) + sum(lengths[:first])
+        return first, last, byte_start, sum(lengths[first:last + 1])
+
+    @staticmethod
+    def read_page(blocks_data, lengths, first, last, block_size, offset, limit):
+        """从连续的块数据中解出 offset 开始的 limit 个文件，返回 [(index, path, size)]"""
+        files = []
+        pos = 0
+        for block in range(first, last + 1):
+            files.extend(FileListCodec.decode_block(blocks_data[pos:pos + lengths[block]]))
+            pos += lengths[block]
+        skip = offset - first * block_size
+        return [(offset + i, path, size) for i, (path, size) in enumerate(files[skip:skip + limit])]
+
+    @staticmethod
+    def summarize(files):
+        """
+        文件列表摘要: 最大的 TOP_FILES 个文件和按扩展名汇总
+
+        参数:
+            files: list of (file_path, file_size)
+
+        返回:
+            dict
+        """
+        top = sorted(range(len(files)), key=lambda i: files[i][1], reverse=True)[:FileListCodec.TOP_FILES]
+        extensions = {}
+        for path, size in files:
+            ext = os.path.splitext(path.rsplit('/', 1)[-1].lower())[1] or ''
+            stat = extensions.get(ext)
+            if stat is None:
+                extensions[ext] = stat = {'count': 0, 'size': 0}
+            stat['count'] += 1
+            stat['size'] += size
+        ext_items = sorted(extensions.items(), key=lambda kv: kv[1]['size'], reverse=True)
+        return {
+            'file_count': len(files),
+            'total_size': sum(size for _, size in files),
+            'top_files': [{'file_index': i, 'file_path': files[i][0], 'file_size': files[i][1]} for i in top],
+            'extensions': dict(ext_items[:FileListCodec.TOP_EXTENSIONS]),
+        }
+
+    @staticmethod
+    def terms(paths, max_chars=8000):
+        """
+        文件名词表: 路径各级名称中的词，小写去重后空格分隔
+
+        同一种子里的文件名大量重复（分集、分卷、扩展名），去重后通常只有几百字节；
+        超过 max_chars 时截断（保留先出现的词）。单字母词不收录（与搜索关键词预处理一致）。
+
+        参数:
+            paths: 文件路径（按 file_index 顺序）
+
+        返回:
+            str
+        """
+        seen = set()
+        words = []
+        length = 0
+        for path in paths:
+            for word in _WORD.findall(path.lower()):
+                if word in seen or (len(word) == 1 and not word.isdigit()):
+                    continue
+                if length + len(word) + 1 > max_chars:
+                    return ' '.join(words)
+                seen.add(word)
+                words.append(word)
+                length += len(word) + 1
+        return ' '.join(words)
+
+    @staticmethod
+    def summary_json(files):
+        return json.dumps(FileListCodec.summarize(files), ensure_ascii=False)
+
+    @staticmethod
+    def file_dict(index, path, size):
+        """转成与 torrent_files 查询结果相同的字段"""
+        name = path.rsplit('/', 1)[-1]
+        return {
+            'file_index': index,
+            'file_name': name,
+            'file_path': path,
+            'file_size': size,
+            'file_extension': os.path.splitext(name.lower())[1],
+        }
@@ -1,24 +1,44 @@
 """
 健康度计算算法
-基于种子创建时间，一次计算，入库后不再更新
+基于估计的 Swarm 规模（去重 Peer 数），爬虫定期用 HyperLogLog 估计值刷新
 """
 from datetime import datetime, timedelta
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
 class HealthCalculator:
     """种子健康度计算器"""
 
+    # Peer 数达到该值即为满分（对数刻度）
+    FULL_SCORE_PEERS = 1000
+    # 只要还能在 DHT 上看到就给的基础分
+    BASE_SCORE = 20.0
+
+    @staticmethod
+    def score_from_peers(peer_count):
+        """
+        按估计 Peer 数计算健康度 (0-100)
+
+        对数刻度：1 个 Peer ≈ 28 分，10 个 ≈ 48 分，100 个 ≈ 73 分，1000+ 为 100 分
+        """
+        peer_count = max(int(peer_count or 0), 0)
+        if peer_count == 0:
+            return 0.0
+        ratio = math.log2(1 + peer_count) / math.log2(1 + HealthCalculator.FULL_SCORE_PEERS)
+        score = HealthCalculator.BASE_SCORE + (100 - HealthCalculator.BASE_SCORE) * min(ratio, 1.0)
+        return round(score, 2)
+
     @staticmethod
     def calculate(torrent_data):
         """
         计算种子健康度评分 (0-100)
-        仅基于 first_seen（入库时间），入库后不再更新
 
         参数:
             torrent_data: dict {
                 'first_seen': datetime,  # 入库时间
+                'peer_count': int,       # 估计 Peer 数（默认 1，即来源节点自己）
             }
 
         返回:
@@ -28,24 +48,11 @@ class HealthCalculator:
             now = datetime.now()
             first_seen = torrent_data.get('first_seen', now)
 
-            # 计算距今天数
-            age_days = (now - first_seen).days
-
             # 超过2年不存储
-            if age_days > 730:
+            if (now - first_seen).days > 730:
                 return 0
 
-            # 基于时间的评分（0-100）
-            if age_days <= 7:
-                return 100.0      # 0-7天：100分
-            elif age_days <= 30:
-                return 80.0       # 7-30天：80分
-            elif age_days <= 90:
-                return 60.0       # 30-90天：60分
-            elif age_days <= 365:
-                return 40.0       # 90-365天：40分
-            else:  # 365-730天
-                return 20.0
+            return HealthCalculator.score_from_peers(torrent_data.get('peer_count', 1))
 
         except Exception as e:
             logger.error(f"Health calculation error: {e}")
@@ -0,0 +1,183 @@
+"""
+热度评分
+浏览、搜索、下载计数的增量按指数衰减累积，加上 DHT 查询热度得到 hot_score，
+并维护 Redis 热门榜（dht:hot:torrents ZSET）
+
+    activity  = activity_prev × 0.5^(Δt / 半衰期) + Σ 权重 × 计数增量
+    hot_score = activity + DEMAND_WEIGHT × dht_demand
+
+ZSET 中的分数是 ln(hot_score) + t × ln2 / 半衰期（t 为评分时间），
+不同时间评分的种子可以直接比较，榜单不需要随时间整体重算。
+
+衰减是惰性的: hot_activity 与 hot_scored_at 一起保存，下次评分时从 hot_scored_at 起算，
+所以只有计数变化、或评分变化超过 REWRITE_EPSILON（相对值）时才回写该行。
+"""
+import math
+import time
+import logging
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mysql_client import MySQLClient
+from database.redis_client import RedisClient, REDIS_KEY_PREFIX
+from database import keys
+from config.settings import HOT_HALF_LIFE_SEC, HOT_SCORE_CHUNK, CACHE_HOT_TORRENTS_SIZE
+
+logger = logging.getLogger(__name__)
+
+class HotScoreEngine:
+    """热度评分任务"""
+
+    # 计数权重
+    VIEW_WEIGHT = 1.0
+    SEARCH_WEIGHT = 0.2
+    DOWNLOAD_WEIGHT = 3.0
+    DEMAND_WEIGHT = 0.5
+
+    MIN_SCORE = 0.01   # 低于该值视为 0，移出热门榜
+    REWRITE_EPSILON = 0.05   # 计数未变时，评分相对变化超过该值才回写
+
+    HOT_KEY = f"{REDIS_KEY_PREFIX}dht:hot:torrents"
+    CURSOR_KEY = f"{REDIS_KEY_PREFIX}dht:hot:cursor"
+
+    @staticmethod
+    def rank_score(hot_score, scored_at, half_life=None):
+        """ZSET 分数（对数空间，含时间项）"""
+        half_life = half_life or HOT_HALF_LIFE_SEC
+        return math.log(hot_score) + scored_at * math.log(2) / half_life
+
+    @staticmethod
+    def score_row(row, now, half_life=None):
+        """
+        计算一行的新评分
+
+        返回:
+            (hot_score, activity, total)，不需要更新时返回 None
+        """
+        half_life = half_life or HOT_HALF_LIFE_SEC
+        total = (
+            HotScoreEngine.VIEW_WEIGHT * (row['view_count'] or 0)
+            + HotScoreEngine.SEARCH_WEIGHT * (row['search_count'] or 0)
+            + HotScoreEngine.DOWNLOAD_WEIGHT * (row['download_count'] or 0)
+        )
+        activity = float(row['hot_activity'] or 0)
+        delta = max(total - float(row['hot_total'] or 0), 0.0)
+        demand = row['dht_demand'] or 0
+        if not activity and not delta and not demand and not row['hot_score']:
+            return None
+        scored_at = row['hot_scored_at']
+        if activity and scored_at:
+            elapsed = max((now - scored_at).total_seconds(), 0.0)
+            activity *= 0.5 ** (elapsed / half_life)
+        activity += delta
+        if activity < HotScoreEngine.MIN_SCORE:
+            activity = 0.0
+        hot_score = activity + HotScoreEngine.DEMAND_WEIGHT * demand
+        if hot_score < HotScoreEngine.MIN_SCORE:
+            hot_score = 0.0
+        return round(hot_score, 2), activity, total
+
+    @staticmethod
+    def needs_write(row, hot_score, total):
+        """是否需要回写（只有衰减、且评分变化不大的行保持原样，下次从 hot_scored_at 继续衰减）"""
+        if total != float(row['hot_total'] or 0):
+            return True
+        old = float(row['hot_score'] or 0)
+        if not old or not hot_score:
+            return old != hot_score
+        return abs(hot_score - old) > HotScoreEngine.REWRITE_EPSILON * old
+
+    @staticmethod
+    def run_chunk(after_id=None, chunk_size=None):
+        """
+        按主键 keyset 处理一块
+
+        参数:
+            after_id: 上一块最后一个 id（数据库格式），None 从头开始
+
+        返回:
+            (处理行数, 最后一个 id)；处理行数为 0 表示一轮结束
+        """
+        chunk_size = chunk_size or HOT_SCORE_CHUNK
+        where = "WHERE id > %s AND is_blocked = FALSE" if after_id is not None else "WHERE is_blocked = FALSE"
+        params = (after_id, chunk_size) if after_id is not None else (chunk_size,)
+        rows = MySQLClient.fetch_all(
+            f"""
+            SELECT id, view_count, search_count, download_count, dht_demand,
+                   hot_score, hot_activity, hot_total, hot_scored_at
+            FROM torrents {where}
+            ORDER BY id LIMIT %s
+            """,
+            params
+        )
+        if not rows:
+            return 0, after_id
+
+        now = datetime.now()
+        now_ts = time.time()
+        updates = []
+        ranked = {}
+        dropped = []
+        for row in rows:
+            result = HotScoreEngine.score_row(row, now)
+            if result is None:
+                continue
+            hot_score, activity, total = result
+            if HotScoreEngine.needs_write(row, hot_score, total):
+                updates.append((hot_score, activity, total, now, keys.db_id(row['id'])))
+            if hot_score > 0:
+                ranked[row['id']] = HotScoreEngine.rank_score(hot_score, now_ts)
+            elif row['hot_score']:
+                dropped.append(row['id'])
+        if updates:
+            MySQLClient.execute_many(
+                "UPDATE torrents SET hot_score = %s, hot_activity = %s, hot_total = %s, hot_scored_at = %s WHERE id = %s",
+                updates
+            )
+        if ranked or dropped:
+            pipe = RedisClient.get_client().pipeline(transaction=False)
+            if ranked:
+                pipe.zadd(HotScoreEngine.HOT_KEY, ranked)
+            if dropped:
+                pipe.zrem(HotScoreEngine.HOT_KEY, *dropped)
+            pipe.zremrangebyrank(HotScoreEngine.HOT_KEY, 0, -(CACHE_HOT_TORRENTS_SIZE + 1))
+            pipe.execute()
+        return len(rows), keys.db_id(rows[-1]['id'])
+
+    @staticmethod
+    def run(max_chunks=None):
+        """
+        继续上次的进度处理最多 max_chunks 块（进度保存在 Redis，None 表示处理完一整轮）
+
+        返回:
+            (处理行数, 本轮是否结束)
+        """
+        client = RedisClient.get_client()
+        cursor = client.get(HotScoreEngine.CURSOR_KEY)
+        after_id = keys.db_id(cursor.decode()) if cursor else None
+        processed = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            count, after_id = HotScoreEngine.run_chunk(after_id)
+            if not count:
+                client.delete(HotScoreEngine.CURSOR_KEY)
+                return processed, True
+            processed += count
+            chunks += 1
+            client.set(HotScoreEngine.CURSOR_KEY, keys.id_str(after_id))
+        return processed, False
+
+    @staticmethod
+    def top(limit=20):
+        """热门榜上前 limit 个种子 id（按热度排序）"""
+        ids = RedisClient.get_client().zrevrange(HotScoreEngine.HOT_KEY, 0, limit - 1)
+        return [i.decode() for i in ids]
+
+    @staticmethod
+    def remove(torrent_ids):
+        """从热门榜移除（屏蔽种子时）"""
+        if torrent_ids:
+            RedisClient.get_client().zrem(HotScoreEngine.HOT_KEY, *torrent_ids)
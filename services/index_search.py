@@ -0,0 +1,171 @@
+"""
+倒排索引搜索后端
+SEARCH_BACKEND=index 时 SearchService.search 先在 TextIndex 中匹配关键词，
+再按 id 从 MySQL 取行，屏蔽状态和过滤条件仍由 MySQL 判断
+
+- time / size / relevance: 顺序由索引决定，分块取候选直到凑满一页，游标用索引中的排序键；
+  每次请求只求一次匹配（IndexMatches），各轮取候选和统计总数都复用它
+- hot / health: 排序值在 MySQL 中随时变化，匹配数不超过 INDEX_CANDIDATES 时
+  把候选 id 作为 id IN (...) 条件交给 MySQL 排序，否则回退到 FULLTEXT
+
+索引没有可用的词、候选轮数用尽时返回 None，由调用方回退到 MySQL FULLTEXT。
+"""
+import uuid
+import logging
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mysql_client import MySQLClient
+from database import keys
+from services.text_index import TextIndex
+from services.search_cache import SearchCache
+from services.pagination import Cursor
+from config.settings import INDEX_DIR, INDEX_REFRESH_SEC, INDEX_CANDIDATES, SEARCH_COUNT_CAP
+
+logger = logging.getLogger(__name__)
+
+class IndexSearch:
+    """倒排索引搜索后端"""
+
+    MAX_ROUNDS = 10   # 过滤条件淘汰大部分候选时，最多向索引取几轮
+
+    _index = None
+
+    @classmethod
+    def index(cls):
+        """本进程共享的 TextIndex（段文件 mmap 后由各线程共用）"""
+        if cls._index is None:
+            cls._index = TextIndex(INDEX_DIR, INDEX_REFRESH_SEC)
+        return cls._index
+
+    @staticmethod
+    def to_key(sort, cursor):
+        """游标 -> 索引排序键 (值, id_bytes)"""
+        value = cursor['value']
+        if sort == 'time':
+            value = int(value.timestamp()) if isinstance(value, datetime) else int(value)
+        elif sort == 'size':
+            value = int(value)
+        else:
+            value = float(value)
+        return value, uuid.UUID(cursor['id']).bytes
+
+    @staticmethod
+    def cursor_value(sort, value):
+        return datetime.fromtimestamp(value) if sort == 'time' else value
+
+    @staticmethod
+    def _fetch(doc_ids, fields, filter_sql, filter_params):
+        """按 id 取未屏蔽且满足过滤条件的行 -> {id: row}"""
+        if not doc_ids:
+            return {}
+        ids = [str(uuid.UUID(bytes=d)) for d in doc_ids]
+        placeholders = ','.join(['%s'] * len(ids))
+        rows = MySQLClient.fetch_all(
+            f"SELECT {fields} FROM torrents WHERE id IN ({placeholders}) AND {filter_sql}",
+            tuple(keys.db_id(i) for i in ids) + tuple(filter_params)
+        )
+        return {r['id']: r for r in rows}
+
+    @classmethod
+    def candidates(cls, keyword):
+        """
+        hot / health 排序用的候选条件
+
+        返回:
+            (sql, params)；匹配数超过 INDEX_CANDIDATES 或没有可用的词时返回 None
+        """
+        matches = cls.index().match(keyword)
+        if matches is None or matches.total > INDEX_CANDIDATES:
+            return None
+        hits = matches.page('time', INDEX_CANDIDATES)
+        if not hits.hits:
+            return "FALSE", []
+        ids = [keys.db_id(str(uuid.UUID(bytes=d))) for _, d in hits.hits]
+        return f"id IN ({','.join(['%s'] * len(ids))})", ids
+
+    @classmethod
+    def count(cls, matches, processed_keyword, filters, filter_sql, filter_params):
+        """
+        总数: 匹配数不超过 INDEX_CANDIDATES 时在 MySQL 中精确统计（排除屏蔽和不满足过滤条件的），
+        否则用索引匹配数（封顶 SEARCH_COUNT_CAP，标记为非精确）
+
+        参数:
+            matches: IndexMatches - search() 中已求出的匹配
+
+        返回:
+            (total, exact)
+        """
+        cached = SearchCache.get_total(processed_keyword, filters)
+        if cached is not None:
+            return cached
+        total = matches.total
+        if total > INDEX_CANDIDATES:
+            result = (min(total, SEARCH_COUNT_CAP), False)
+        else:
+            doc_ids = list(matches.doc_ids())
+            count = 0
+            if doc_ids:
+                placeholders = ','.join(['%s'] * len(doc_ids))
+                row = MySQLClient.fetch_one(
+                    f"SELECT COUNT(*) AS total FROM torrents WHERE id IN ({placeholders}) AND {filter_sql}",
+                    tuple(keys.db_id(str(uuid.UUID(bytes=d))) for d in doc_ids) + tuple(filter_params)
+                )
+                count = row['total'] if row else 0
+            result = (min(count, SEARCH_COUNT_CAP), count <= SEARCH_COUNT_CAP)
+        SearchCache.set_total(processed_keyword, filters, *result)
+        return result
+
+    @classmethod
+    def search(cls, keyword, processed_keyword, sort, page, limit, cursor, filters, fields, filter_sql, filter_params):
+        """
+        time / size / relevance 排序的搜索
+
+        参数:
+            fields: str - SELECT 的列
+            filter_sql / filter_params: 屏蔽状态和过滤条件（不含关键词）
+
+        返回:
+            {'results', 'total', 'total_exact', 'next_cursor'}，需要回退到 MySQL 时返回 None
+        """
+        matches = cls.index().match(keyword)
+        if matches is None:
+            return None
+        after = cls.to_key(sort, cursor) if cursor else None
+        skip = 0 if cursor else (page - 1) * limit
+        needed = skip + limit
+        chunk = min(max(needed * 2, 100), INDEX_CANDIDATES)
+
+        rows = []
+        for _ in range(cls.MAX_ROUNDS):
+            hits = matches.page(sort, chunk, after)
+            fetched = cls._fetch([d for _, d in hits.hits], fields, filter_sql, filter_params)
+            for key, doc_id in hits.hits:
+                row = fetched.get(str(uuid.UUID(bytes=doc_id)))
+                if row is not None:
+                    rows.append((key, row))
+                    if len(rows) >= needed:
+                        break
+            if len(rows) >= needed or hits.complete:
+                break
+            after = hits.hits[-1]
+        else:
+            logger.debug(f"Index search for {keyword!r} ran out of rounds, falling back to MySQL")
+            return None
+
+        page_rows = rows[skip:skip + limit]
+        results = []
+        for key, row in page_rows:
+            if sort == 'relevance':
+                row['score'] = key
+            results.append(row)
+        next_cursor = None
+        if len(page_rows) == limit:
+            key, row = page_rows[-1]
+            next_cursor = Cursor.encode(sort, cls.cursor_value(sort, key), row['id'], page + 1)
+
+        total, exact = cls.count(matches, processed_keyword, filters, filter_sql, filter_params)
+        return {'results': results, 'total': total, 'total_exact': exact, 'next_cursor': next_cursor}
@@ -0,0 +1,145 @@
+"""
+搜索关键词缓冲
+有结果的搜索把规范化后的关键词累加在 Redis 哈希中（HINCRBY），
+由 API 后台任务和计数缓冲一起定期批量写入 search_keywords（INSERT ... ON DUPLICATE KEY UPDATE）
+
+search_keywords 供搜索建议（services/suggest.py）、热门词结果数刷新（refresh-counts）使用，
+过期低频词由 cleanup_old_data.py --cleanup-keywords 清理。
+"""
+import re
+import time
+import logging
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mysql_client import MySQLClient
+from database.redis_client import RedisClient, REDIS_KEY_PREFIX
+from database import keys
+from config.settings import COUNTER_FLUSH_BATCH
+
+logger = logging.getLogger(__name__)
+
+class KeywordBuffer:
+    """
+    search_keywords 的写入缓冲
+
+    Redis 键:
+        keywords:pending            - 待写入的搜索次数 {关键词: n}
+        keywords:pending:flushing   - 正在写入的快照（RENAME 得到，写入后删除）
+        keywords:stats              - 最近一次写入的统计
+    """
+
+    KEY = f"{REDIS_KEY_PREFIX}keywords:pending"
+    STATS_KEY = f"{REDIS_KEY_PREFIX}keywords:stats"
+    LOCK_KEY = f"{REDIS_KEY_PREFIX}keywords:lock"
+    MAX_LENGTH = 200   # search_keywords.keyword VARCHAR(200)
+
+    @staticmethod
+    def normalize(keyword):
+        """小写、合并空白；太短或太长的返回 None"""
+        if not keyword:
+            return None
+        keyword = re.sub(r'\s+', ' ', keyword).strip().lower()
+        if len(keyword) < 2 or len(keyword) > KeywordBuffer.MAX_LENGTH:
+            return None
+        return keyword
+
+    @classmethod
+    def record(cls, keyword):
+        """累加一次搜索（失败只记日志）"""
+        keyword = cls.normalize(keyword)
+        if keyword is None:
+            return
+        try:
+            RedisClient.get_client().hincrby(cls.KEY, keyword, 1)
+        except Exception as e:
+            logger.error(f"Failed to buffer search keyword: {e}")
+
+    @classmethod
+    def _apply(cls, counts, now):
+        """写入一批关键词，按关键词排序以固定加锁顺序"""
+        params = [(keys.new_id(), keyword, n, now) for keyword, n in sorted(counts.items())]
+        return MySQLClient.execute_many(
+            """
+            INSERT INTO search_keywords (id, keyword, search_count, last_searched)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                search_count = search_count + VALUES(search_count),
+                last_searched = VALUES(last_searched)
+            """,
+            params
+        )
+
+    @classmethod
+    def flush(cls, batch_size=None, lock_ttl=300):
+        """
+        把缓冲的关键词写入 MySQL
+
+        与 CounterBuffer.flush_column 相同: 先 RENAME 成快照，HSCAN 分批写入后删除快照，
+        上次中途失败遗留的快照先重试。多个 API 进程用 Redis 锁保证同一时间只有一个在写，
+        锁的续期和释放与 CounterBuffer.flush 相同（带 token，每批续期，锁丢失时停止）。
+
+        返回:
+            int: 写入的关键词数，未拿到锁时返回 None
+        """
+        batch_size = batch_size or COUNTER_FLUSH_BATCH
+        client = RedisClient.get_client()
+        token = RedisClient.acquire_lock(cls.LOCK_KEY, lock_ttl)
+        if token is None:
+            return None
+        flushing = f"{cls.KEY}:flushing"
+        try:
+            if not client.exists(flushing):
+                if not client.exists(cls.KEY):
+                    return 0
+                try:
+                    client.rename(cls.KEY, flushing)
+                except Exception as e:
+                    logger.debug(f"Keyword snapshot: {e}")
+                    return 0
+
+            start = time.time()
+            now = datetime.now()
+            flushed = 0
+            batch = {}
+            for keyword, n in client.hscan_iter(flushing, count=batch_size):
+                batch[keyword.decode()] = int(n)
+                if len(batch) >= batch_size:
+                    cls._apply(batch, now)
+                    flushed += len(batch)
+                    batch = {}
+                    if not RedisClient.extend_lock(cls.LOCK_KEY, token, lock_ttl):
+                        raise RuntimeError(f"Lost keyword flush lock after {flushed} keywords")
+            if batch:
+                cls._apply(batch, now)
+                flushed += len(batch)
+            client.delete(flushing)
+            if flushed:
+                client.hset(cls.STATS_KEY, mapping={
+                    'flushed_at': int(time.time()),
+                    'keywords': flushed,
+                    'duration_ms': int((time.time() - start) * 1000),
+                })
+                logger.info(f"Flushed {flushed} search keywords")
+            return flushed
+        finally:
+            RedisClient.release_lock(cls.LOCK_KEY, token)
+
+    @classmethod
+    def stats(cls):
+        """待写入的关键词数和最近一次写入的统计"""
+        client = RedisClient.get_client()
+        pipe = client.pipeline(transaction=False)
+        pipe.hlen(cls.KEY)
+        pipe.hlen(f"{cls.KEY}:flushing")
+        pipe.hgetall(cls.STATS_KEY)
+        pending, flushing, last = pipe.execute()
+        last = {k.decode(): int(v) for k, v in last.items()}
+        return {
+            'pending': pending + flushing,
+            'last_flushed_at': last.get('flushed_at', 0),
+            'last_keywords': last.get('keywords', 0),
+        }
@@ -0,0 +1,97 @@
+"""
+游标分页
+深翻页用 keyset（WHERE 排序键 < 上一页最后一行）代替 LIMIT OFFSET，
+MySQL 不再需要生成并丢弃前面所有页的结果，第 500 页和第 1 页代价相同
+
+游标是不透明的 base64 字符串，内容为 [排序方式, 值类型, 排序键值, id, 页码]，
+id 作为唯一的次级排序键，排序键相同的行也能稳定翻页。
+"""
+import json
+import base64
+import sys
+import os
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import keys
+
+class Cursor:
+    """分页游标"""
+
+    @staticmethod
+    def encode(sort, value, last_id, page):
+        """
+        生成游标
+
+        参数:
+            sort: str - 排序方式（游标只能用于同一种排序）
+            value: 最后一行的排序键值
+            last_id: 最后一行的 id
+            page: int - 游标指向的页码（用于返回 page 字段）
+        """
+        if isinstance(value, datetime):
+            kind, value = 'dt', value.isoformat()
+        elif isinstance(value, Decimal):
+            kind, value = 'dec', str(value)
+        else:
+            kind = 'num'
+        payload = json.dumps([sort, kind, value, keys.id_str(last_id), page], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode(token, sort):
+        """
+        解析游标
+
+        参数:
+            sort: str 或 tuple - 允许的排序方式
+
+        返回:
+            {'sort': str, 'value': 排序键值, 'id': str, 'page': int}
+
+        异常:
+            ValueError: 游标无效或与排序方式不匹配
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            cursor_sort, kind, value, last_id, page = json.loads(raw)
+            if kind == 'dt':
+                value = datetime.fromisoformat(value)
+            elif kind == 'dec':
+                value = Decimal(value)
+            elif not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise ValueError(f"bad value {value!r}")
+            page = int(page)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {e}")
+        allowed = (sort,) if isinstance(sort, str) else tuple(sort)
+        if cursor_sort not in allowed:
+            raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{'/'.join(allowed)}'")
+        return {'sort': cursor_sort, 'value': value, 'id': last_id, 'page': page}
+
+    @staticmethod
+    def keyset(column, id_direction, cursor, column_params=()):
+        """
+        keyset 条件（排序键降序，id 按 id_direction）
+
+        参数:
+            column: 排序列或表达式
+            column_params: 表达式中的参数（表达式出现两次，参数也重复两次）
+
+        返回:
+            (sql, params)
+        """
+        op = '<' if id_direction == 'DESC' else '>'
+        sql = f"({column} < %s OR ({column} = %s AND id {op} %s))"
+        params = [*column_params, cursor['value'], *column_params, cursor['value'], keys.db_id(cursor['id'])]
+        return sql, params
+
+    @staticmethod
+    def next(sort, rows, limit, page, value_key):
+        """结果满一页时返回下一页的游标，否则 None"""
+        if not rows or len(rows) < limit:
+            return None
+        last = rows[-1]
+        return Cursor.encode(sort, last[value_key], last['id'], page + 1)
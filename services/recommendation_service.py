@@ -10,6 +10,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.mysql_client import MySQLClient
+from database import keys
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +54,7 @@ class RecommendationService:
                 FROM torrents
                 WHERE info_hash = %s
                 """,
-                (info_hash,)
+                (keys.db_hash(info_hash),)
             )
 
             if not current:
@@ -82,7 +83,7 @@ class RecommendationService:
                 ORDER BY health_score DESC
                 LIMIT %s
                 """,
-                (keyword_query, info_hash, limit)
+                (keyword_query, keys.db_hash(info_hash), limit)
             )
 
             # 如果结果不足，补充同类型种子
@@ -118,7 +119,7 @@ class RecommendationService:
             exclude_sql = ""
             if exclude_hash:
                 exclude_sql = "AND info_hash != %s"
-                params = [keyword_query, exclude_hash, limit]
+                params = [keyword_query, keys.db_hash(exclude_hash), limit]
 
             results = MySQLClient.fetch_all(
                 f"""
@@ -172,7 +173,7 @@ class RecommendationService:
             if exclude_hashes:
                 placeholders = ','.join(['%s'] * len(exclude_hashes))
                 exclude_sql = f"AND info_hash NOT IN ({placeholders})"
-                params = [min_size, max_size] + exclude_hashes + [limit]
+                params = [min_size, max_size] + [keys.db_hash(h) for h in exclude_hashes] + [limit]
             
             sql = f"""
                 SELECT 
@@ -0,0 +1,239 @@
+"""
+数据保留
+删除超过保留期（按入库时间 created_at）的种子，分块小事务执行并限速，
+子表按行数分块单独提交，不会出现长时间运行的大 DELETE 阻塞爬虫写入
+
+文件表（torrent_files / torrent_file_lists）可以按月分区（db_manager.py partition），
+分区后过期文件行直接 DROP PARTITION，只有 torrents 本身需要分块删除。
+torrents 有 FULLTEXT 索引，InnoDB 分区表不支持全文索引，所以 torrents 不分区。
+"""
+import time
+import logging
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mysql_client import MySQLClient
+from database import keys
+from services.hot_score import HotScoreEngine
+from services.search_cache import SearchCache
+from config.settings import RETENTION_CHUNK, RETENTION_SLEEP_SEC, RETENTION_PARTITIONS_AHEAD
+
+logger = logging.getLogger(__name__)
+
+# 按月分区的文件表 -> 主键列（分区后主键为 (列, created_at)）
+PARTITIONED_TABLES = {
+    'torrent_files': 'id',
+    'torrent_file_lists': 'torrent_id',
+}
+
+# 引用 torrents 的子表（删除种子前先分块删除）
+CHILD_TABLES = ('torrent_files', 'torrent_file_lists', 'torrent_file_terms', 'torrent_keywords')
+
+def month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+def next_month(dt):
+    return datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1)
+
+def partition_name(dt):
+    """分区名 pYYYYMM，保存该月的数据"""
+    return f"p{dt.year:04d}{dt.month:02d}"
+
+def partition_clause(dt):
+    return f"PARTITION {partition_name(dt)} VALUES LESS THAN ('{next_month(dt):%Y-%m-%d}')"
+
+class RetentionService:
+    """数据保留任务"""
+
+    @staticmethod
+    def partitions(table):
+        """
+        表的分区
+
+        返回:
+            [(分区名, 上界 datetime 或 None(MAXVALUE))]，未分区时为空列表
+        """
+        rows = MySQLClient.fetch_all(
+            """
+            SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+            """,
+            (table,)
+        )
+        result = []
+        for r in rows:
+            bound = r['bound']
+            if bound is None or bound == 'MAXVALUE':
+                result.append((r['name'], None))
+            else:
+                result.append((r['name'], datetime.strptime(bound.strip("'")[:10], '%Y-%m-%d')))
+        return result
+
+    @staticmethod
+    def ensure_partitions(months_ahead=None):
+        """从 pmax 中拆出未来几个月的分区（pmax 为空，拆分不移动数据）"""
+        months_ahead = RETENTION_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+        horizon = month_start(datetime.now())
+        for _ in range(months_ahead):
+            horizon = next_month(horizon)
+        added = 0
+        for table in PARTITIONED_TABLES:
+            parts = RetentionService.partitions(table)
+            bounds = [b for _, b in parts if b is not None]
+            if not parts or not bounds:
+                continue
+            month = bounds[-1]   # 最后一个有上界的分区之后的月份
+            clauses = []
+            while month <= horizon:
+                clauses.append(partition_clause(month))
+                month = next_month(month)
+            if clauses:
+                MySQLClient.execute(
+                    f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ("
+                    + ", ".join(clauses) + ", PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+                )
+                added += len(clauses)
+                logger.info(f"{table}: added {len(clauses)} partitions")
+        return added
+
+    @staticmethod
+    def drop_expired_partitions(cutoff, dry_run=False):
+        """删除整月都早于 cutoff 的分区，返回 [(表, 分区名)]"""
+        dropped = []
+        for table in PARTITIONED_TABLES:
+            bounded = [(name, bound) for name, bound in RetentionService.partitions(table) if bound is not None]
+            expired = [name for name, bound in bounded if bound <= cutoff]
+            # 至少保留一个有上界的分区，REORGANIZE pmax 需要它确定起点
+            if len(expired) >= len(bounded):
+                expired = expired[:-1]
+            if expired and not dry_run:
+                MySQLClient.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+            dropped += [(table, name) for name in expired]
+        return dropped
+
+    @staticmethod
+    def _delete_chunked(sql, params, limit=5000):
+        """DELETE ... LIMIT 循环直到删完，每条语句单独提交（事务大小按子表行数限定）"""
+        total = 0
+        while True:
+            count = MySQLClient.execute(f"{sql} LIMIT {limit}", params)
+            total += count
+            if count < limit:
+                return total
+
+    @staticmethod
+    def delete_chunk(cutoff, chunk_size=None, partitioned=(), dry_run=False):
+        """
+        删除一块过期种子（created_at 最早的 chunk_size 个）
+
+        子表（文件行、文件列表、文件名词表、关键词关联）先按行数分块删除，每块一个事务；
+        最后删除种子本身，此时外键级联已无行可删。中途失败时种子仍然过期，下次运行继续删。
+
+        参数:
+            cutoff: datetime - 早于该时间的种子过期
+            partitioned: 已分区的文件表（过期行由 DROP PARTITION 清理，这里跳过）
+
+        返回:
+            int: 删除（dry_run 时为待删除）的种子数
+        """
+        chunk_size = chunk_size or RETENTION_CHUNK
+        rows = MySQLClient.fetch_all(
+            "SELECT id FROM torrents WHERE created_at < %s ORDER BY created_at, id LIMIT %s",
+            (cutoff, chunk_size)
+        )
+        if not rows or dry_run:
+            return len(rows)
+        ids = [r['id'] for r in rows]
+        params = [keys.db_id(i) for i in ids]
+        placeholders = ','.join(['%s'] * len(params))
+        for table in CHILD_TABLES:
+            if table not in partitioned:
+                RetentionService._delete_chunked(
+                    f"DELETE FROM {table} WHERE torrent_id IN ({placeholders})", params)
+        MySQLClient.execute(f"DELETE FROM torrents WHERE id IN ({placeholders})", params)
+        try:
+            HotScoreEngine.remove(ids)
+        except Exception as e:
+            logger.debug(f"Failed to remove expired torrents from hot list: {e}")
+        return len(ids)
+
+    @staticmethod
+    def purge_torrents(days, chunk_size=None, sleep=None, max_rows=None, dry_run=False, progress=None):
+        """
+        删除入库超过 days 天的种子
+
+        每块一个小事务；块之间至少休眠 sleep 秒，且不少于上一块的耗时
+        （写入负载高、删除变慢时自动放慢）。
+
+        返回:
+            dict: 统计
+        """
+        sleep = RETENTION_SLEEP_SEC if sleep is None else sleep
+        cutoff = datetime.now() - timedelta(days=days)
+        partitioned = tuple(t for t in PARTITIONED_TABLES if RetentionService.partitions(t))
+        stats = {'cutoff': cutoff, 'torrents': 0, 'partitions': [], 'partitioned': list(partitioned)}
+
+        if partitioned and not dry_run:
+            stats['partitions_added'] = RetentionService.ensure_partitions()
+
+        if dry_run:
+            row = MySQLClient.fetch_one("SELECT COUNT(*) AS n FROM torrents WHERE created_at < %s", (cutoff,))
+            stats['torrents'] = row['n'] if row else 0
+        else:
+            while max_rows is None or stats['torrents'] < max_rows:
+                start = time.time()
+                size = chunk_size or RETENTION_CHUNK
+                if max_rows is not None:
+                    size = min(size, max_rows - stats['torrents'])
+                deleted = RetentionService.delete_chunk(cutoff, size, partitioned)
+                stats['torrents'] += deleted
+                if progress:
+                    progress(stats['torrents'])
+                if deleted < size:
+                    break
+                time.sleep(max(sleep, time.time() - start))
+
+        if partitioned:
+            stats['partitions'] = RetentionService.drop_expired_partitions(cutoff, dry_run)
+        if stats['torrents'] and not dry_run:
+            SearchCache.invalidate()
+        return stats
+
+    @staticmethod
+    def purge_admin_logs(days, chunk_size=None, sleep=None):
+        """删除超过 days 天的后台操作日志（分块）"""
+        return RetentionService._purge_by_query(
+            "SELECT id FROM admin_logs WHERE created_at < %s ORDER BY created_at LIMIT %s",
+            "DELETE FROM admin_logs WHERE id IN ({})",
+            datetime.now() - timedelta(days=days), chunk_size, sleep
+        )
+
+    @staticmethod
+    def purge_keywords(days=90, max_count=1, chunk_size=None, sleep=None):
+        """删除超过 days 天未被搜索、且搜索次数不超过 max_count 的关键词（分块）"""
+        return RetentionService._purge_by_query(
+            f"SELECT id FROM search_keywords WHERE last_searched < %s AND search_count <= {int(max_count)} "
+            "ORDER BY last_searched LIMIT %s",
+            "DELETE FROM search_keywords WHERE id IN ({})",
+            datetime.now() - timedelta(days=days), chunk_size, sleep
+        )
+
+    @staticmethod
+    def _purge_by_query(select_sql, delete_sql, cutoff, chunk_size=None, sleep=None):
+        chunk_size = chunk_size or RETENTION_CHUNK
+        sleep = RETENTION_SLEEP_SEC if sleep is None else sleep
+        total = 0
+        while True:
+            start = time.time()
+            ids = [r['id'] for r in MySQLClient.fetch_all(select_sql, (cutoff, chunk_size))]
+            if ids:
+                MySQLClient.execute(delete_sql.format(','.join(['%s'] * len(ids))), tuple(ids))
+                total += len(ids)
+            if len(ids) < chunk_size:
+                return total
+            time.sleep(max(sleep, time.time() - start))
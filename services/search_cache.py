@@ -0,0 +1,202 @@
+"""
+搜索结果缓存
+SearchService.search 的结果按 (关键词, 过滤条件, 排序, 页码/游标, 每页数量, 搜索范围) 缓存在 Redis，
+热门查询在 TTL 内不再重复执行 COUNT(*) 和分页全文查询；
+总数另外按 (关键词, 过滤条件, 搜索范围) 缓存更长时间（SEARCH_COUNT_TTL），翻页和换排序都能复用
+
+失效方式: 缓存键包含全局代数（generation），屏蔽/解除屏蔽种子、批量导入、
+过期清理之后调用 invalidate() 把代数加一，旧代数的条目不再命中，随 TTL 自然过期。
+"""
+import json
+import hashlib
+import logging
+import sys
+import os
+from datetime import datetime, date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.redis_client import RedisClient, REDIS_KEY_PREFIX
+from config.settings import (
+    SEARCH_CACHE_ENABLED, SEARCH_CACHE_TTL, SEARCH_CACHE_TTL_TIME,
+    SEARCH_CACHE_TTL_HOT, SEARCH_CACHE_MAX_PAGE, SEARCH_COUNT_TTL
+)
+
+logger = logging.getLogger(__name__)
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    raise TypeError(f"Unserializable value: {type(value).__name__}")
+
+class SearchCache:
+    """
+    搜索结果缓存
+
+    Redis 键:
+        search:gen                 - 当前代数
+        search:<代数>:<摘要>        - 缓存的结果（JSON）
+        search:count:<代数>:<摘要>  - 缓存的总数 "总数:是否精确"
+        search:stats               - 命中/未命中计数 {hits, misses, hits:<排序>, misses:<排序>, invalidations}
+    """
+
+    PREFIX = f"{REDIS_KEY_PREFIX}search:"
+    GEN_KEY = f"{REDIS_KEY_PREFIX}search:gen"
+    STATS_KEY = f"{REDIS_KEY_PREFIX}search:stats"
+
+    # 各排序方式的 TTL（秒）: 按时间排序的结果随新种子入库变化最快
+    TTLS = {
+        'time': SEARCH_CACHE_TTL_TIME,
+        'hot': SEARCH_CACHE_TTL_HOT,
+        'health': SEARCH_CACHE_TTL_HOT,
+        'size': SEARCH_CACHE_TTL,
+        'relevance': SEARCH_CACHE_TTL,
+    }
+
+    @classmethod
+    def cacheable(cls, page):
+        """只缓存前 SEARCH_CACHE_MAX_PAGE 页（深翻页命中率低，不占用内存）"""
+        return SEARCH_CACHE_ENABLED and page <= SEARCH_CACHE_MAX_PAGE
+
+    @classmethod
+    def digest(cls, processed_keyword, filters, sort, page, limit, cursor=None, scope='name'):
+        """缓存键摘要（过滤条件按键排序，顺序不同的相同条件命中同一条目）"""
+        payload = json.dumps(
+            [processed_keyword.lower(), filters or {}, sort, page, limit, cursor, scope],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _generation(cls, client):
+        return int(client.get(cls.GEN_KEY) or 0)
+
+    @classmethod
+    def get(cls, processed_keyword, filters, sort, page, limit, cursor=None, scope='name'):
+        """
+        读取缓存
+
+        返回:
+            (结果 dict 或 None, 缓存键)；缓存键为 None 表示不缓存（未启用、深翻页或 Redis 不可用）
+        """
+        if not cls.cacheable(page):
+            return None, None
+        try:
+            client = RedisClient.get_client()
+            generation = cls._generation(client)
+            key = f"{cls.PREFIX}{generation}:{cls.digest(processed_keyword, filters, sort, page, limit, cursor, scope)}"
+            data = client.get(key)
+            outcome = 'hits' if data else 'misses'
+            pipe = client.pipeline(transaction=False)
+            pipe.hincrby(cls.STATS_KEY, outcome, 1)
+            pipe.hincrby(cls.STATS_KEY, f"{outcome}:{sort}", 1)
+            pipe.execute()
+            return (json.loads(data) if data else None), key
+        except Exception as e:
+            logger.debug(f"Search cache read failed: {e}")
+            return None, None
+
+    @classmethod
+    def set(cls, key, sort, result):
+        """写入缓存（失败只记日志）"""
+        if not key:
+            return
+        try:
+            RedisClient.get_client().setex(
+                key,
+                cls.TTLS.get(sort, SEARCH_CACHE_TTL),
+                json.dumps(result, ensure_ascii=False, default=_json_default)
+            )
+        except Exception as e:
+            logger.debug(f"Search cache write failed: {e}")
+
+    @classmethod
+    def _total_key(cls, client, processed_keyword, filters, scope):
+        digest = cls.digest(processed_keyword, filters, None, None, None, scope=scope)
+        return f"{cls.PREFIX}count:{cls._generation(client)}:{digest}"
+
+    @classmethod
+    def get_total(cls, processed_keyword, filters, scope='name'):
+        """
+        读取缓存的总数
+
+        返回:
+            (总数, 是否精确)，未缓存时返回 None
+        """
+        if not SEARCH_CACHE_ENABLED:
+            return None
+        try:
+            client = RedisClient.get_client()
+            data = client.get(cls._total_key(client, processed_keyword, filters, scope))
+            if not data:
+                return None
+            total, exact = data.decode().split(':')
+            return int(total), exact == '1'
+        except Exception as e:
+            logger.debug(f"Search count cache read failed: {e}")
+            return None
+
+    @classmethod
+    def set_total(cls, processed_keyword, filters, total, exact, ttl=None, scope='name'):
+        """缓存总数（失败只记日志）"""
+        if not SEARCH_CACHE_ENABLED:
+            return
+        try:
+            client = RedisClient.get_client()
+            client.setex(
+                cls._total_key(client, processed_keyword, filters, scope),
+                ttl or SEARCH_COUNT_TTL,
+                f"{int(total)}:{1 if exact else 0}"
+            )
+        except Exception as e:
+            logger.debug(f"Search count cache write failed: {e}")
+
+    @classmethod
+    def invalidate(cls):
+        """使所有缓存条目失效（代数加一），返回新代数"""
+        try:
+            client = RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.incr(cls.GEN_KEY)
+            pipe.hincrby(cls.STATS_KEY, 'invalidations', 1)
+            return pipe.execute()[0]
+        except Exception as e:
+            logger.error(f"Search cache invalidation failed: {e}")
+            return None
+
+    @classmethod
+    def stats(cls):
+        """命中统计: 总体和各排序方式的命中次数、未命中次数、命中率"""
+        client = RedisClient.get_client()
+        pipe = client.pipeline(transaction=False)
+        pipe.hgetall(cls.STATS_KEY)
+        pipe.get(cls.GEN_KEY)
+        raw, generation = pipe.execute()
+        counts = {k.decode(): int(v) for k, v in raw.items()}
+
+        def rate(hits, misses):
+            return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+        hits, misses = counts.get('hits', 0), counts.get('misses', 0)
+        return {
+            'enabled': SEARCH_CACHE_ENABLED,
+            'generation': int(generation or 0),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': rate(hits, misses),
+            'invalidations': counts.get('invalidations', 0),
+            'by_sort': {
+                sort: {
+                    'hits': counts.get(f"hits:{sort}", 0),
+                    'misses': counts.get(f"misses:{sort}", 0),
+                    'hit_rate': rate(counts.get(f"hits:{sort}", 0), counts.get(f"misses:{sort}", 0)),
+                    'ttl': ttl,
+                }
+                for sort, ttl in cls.TTLS.items()
+            },
+        }
@@ -1,8 +1,10 @@
 """
 搜索服务
-基于 MySQL ngram 全文索引的高性能搜索
+基于 MySQL ngram 全文索引的高性能搜索，SEARCH_BACKEND=index 时改用内置倒排索引（见 index_search.py）
+scope=files 时匹配种子内的文件名（torrent_file_terms，每个种子一行，结果直接按种子返回）
 """
 import re
+import json
 import logging
 import sys
 import os
@@ -11,21 +13,57 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.mysql_client import MySQLClient
 from database.redis_client import RedisClient
+from database import keys
+from services.file_list import FileListCodec
+from services.counter_buffer import CounterBuffer
+from services.hot_score import HotScoreEngine
+from services.search_cache import SearchCache
+from services.pagination import Cursor
+from services.text_index import TextIndex
+from services.index_search import IndexSearch
+from config.settings import SEARCH_COUNT_CAP, SEARCH_MAX_PAGE, SEARCH_BACKEND
 
 logger = logging.getLogger(__name__)
 
 class SearchService:
     """搜索服务"""
     
+    # 排序方式 -> (排序键（降序）, id 方向)
+    # id 是唯一的次级排序键，游标翻页依赖它；health/hot 是降序索引，索引内 id 升序
+    SORT_KEYS = {
+        'time': ('created_at', 'DESC'),      # 时间倒序（最新）
+        'health': ('health_score', 'ASC'),   # 健康度倒序
+        'hot': ('hot_score', 'ASC'),         # 热度倒序
+        'size': ('total_size', 'DESC'),      # 大小倒序
+        'relevance': ('score', 'DESC'),      # 相关度倒序（全文搜索评分）
+    }
+    
     # 排序方式映射
-    SORT_MODES = {
-        'time': 'created_at DESC',           # 时间倒序（最新）
-        'health': 'health_score DESC',       # 健康度倒序
-        'hot': 'hot_score DESC',             # 热度倒序
-        'size': 'total_size DESC',           # 大小倒序
-        'relevance': 'score DESC'            # 相关度倒序（全文搜索评分）
+    SORT_MODES = {sort: f"{column} DESC, id {direction}" for sort, (column, direction) in SORT_KEYS.items()}
+    
+    MATCH_SQL = "MATCH(name, name_utf8) AGAINST(%s IN BOOLEAN MODE)"
+    
+    # 搜索范围 -> (FROM 子句, 关键词匹配条件)
+    # torrent_file_terms 只有 torrent_id / terms 两列，SELECT_FIELDS 和过滤条件里的列名不会冲突
+    SCOPES = {
+        'name': ("torrents", MATCH_SQL),
+        'files': (
+            "torrents JOIN torrent_file_terms ON torrent_file_terms.torrent_id = torrents.id",
+            "MATCH(terms) AGAINST(%s IN BOOLEAN MODE)"
+        ),
     }
     
+    # 搜索结果返回的列
+    SELECT_FIELDS = """
+        id, info_hash, name, total_size, file_count,
+        health_score, peer_count, hot_score, search_count,
+        has_video, has_audio, category, sub_category, quality, codec, language,
+        last_seen, created_at
+    """
+    
+    # 详情页随种子返回的文件数，其余通过 get_torrent_files 分页
+    DETAIL_FILES_LIMIT = 100
+    
     @staticmethod
     def preprocess_keyword(keyword):
         """
@@ -58,13 +96,13 @@ class SearchService:
         return ' '.join([f'+{w}' for w in words])
     
     @staticmethod
-    def search(keyword, page=1, sort='time', limit=20, filters=None):
+    def search(keyword, page=1, sort='time', limit=20, filters=None, cursor=None, scope='name'):
         """
         搜索种子
         
         参数:
             keyword: str - 搜索关键词
-            page: int - 页码（从1开始）
+            page: int - 页码（从1开始，使用 LIMIT OFFSET，只适合前几页）
             sort: str - 排序方式 (time/health/hot/size/relevance)
             limit: int - 每页数量
             filters: dict - 额外过滤条件 {
@@ -72,15 +110,24 @@ class SearchService:
                 'max_size': int,  # 最大大小
                 'has_video': bool,
                 'has_audio': bool,
-                'quality': str,  # 720p/1080p/4K
+                'category': str,  # video/audio/image/document/software/archive/other
+                'sub_category': str,
+                'quality': str,  # 4K/1080p/720p/SD
+                'codec': str,
+                'language': str,
             }
+            cursor: dict - Cursor.decode 解析后的游标，给出时按 keyset 翻页并忽略 page
+            scope: str - 搜索范围 name（种子名称）/ files（种子内的文件名）
         
         返回:
             {
                 'results': [...],
-                'total': int,
+                'total': int,            # 超过 SEARCH_COUNT_CAP 时为 SEARCH_COUNT_CAP
+                'total_exact': bool,     # total 是否为精确值
+                'total_display': str,    # 如 "1,234" / "10,000+"
                 'page': int,
-                'total_pages': int
+                'total_pages': int,      # 不超过 SEARCH_MAX_PAGE
+                'next_cursor': str 或 None
             }
         """
         try:
@@ -92,21 +139,33 @@ class SearchService:
                 return {
                     'results': [],
                     'total': 0,
+                    'total_exact': True,
                     'page': page,
                     'total_pages': 0,
                     'keyword': keyword,
-                    'processed_keyword': processed_keyword
+                    'processed_keyword': processed_keyword,
+                    'scope': scope
                 }
 
-            # 2. 构建查询条件
+            if sort not in SearchService.SORT_MODES:
+                sort = 'time'
+            if scope not in SearchService.SCOPES:
+                scope = 'name'
+            if cursor:
+                page = cursor['page']
+
+            # 命中缓存时跳过 COUNT(*) 和分页查询（搜索次数照常累加）
+            cached, cache_key = SearchCache.get(processed_keyword, filters, sort, page, limit, cursor, scope)
+            if cached is not None:
+                if cached['results']:
+                    CounterBuffer.incr('search_count', [r['id'] for r in cached['results']])
+                cached['keyword'] = keyword
+                return cached
+
+            # 2. 构建查询条件（屏蔽状态和额外过滤条件，关键词条件见第 3 步）
             where_clauses = ["is_blocked = FALSE"]
             params = []
             
-            # 全文搜索条件
-            if processed_keyword:
-                where_clauses.append("MATCH(name, name_utf8) AGAINST(%s IN BOOLEAN MODE)")
-                params.append(processed_keyword)
-            
             # 额外过滤条件
             if filters:
                 if 'min_size' in filters:
@@ -125,75 +184,56 @@ class SearchService:
                     where_clauses.append("has_audio = %s")
                     params.append(filters['has_audio'])
                 
-                if 'quality' in filters:
-                    where_clauses.append("quality = %s")
-                    params.append(filters['quality'])
-            
-            where_sql = " AND ".join(where_clauses)
-            
-            # 3. 获取排序方式
-            order_by = SearchService.SORT_MODES.get(sort, SearchService.SORT_MODES['time'])
-            
-            # 4. 查询总数
-            count_sql = f"SELECT COUNT(*) as total FROM torrents WHERE {where_sql}"
-            count_result = MySQLClient.fetch_one(count_sql, tuple(params))
-            total = count_result['total'] if count_result else 0
-            
-            # 5. 查询结果
-            offset = (page - 1) * limit
-            
-            # 如果是相关度排序，添加评分字段
-            if sort == 'relevance' and processed_keyword:
-                select_fields = """
-                    id, info_hash, name, total_size, file_count,
-                    health_score, hot_score, search_count,
-                    has_video, has_audio, quality,
-                    last_seen, created_at,
-                    MATCH(name, name_utf8) AGAINST(%s IN BOOLEAN MODE) as score
-                """
-                params_with_score = [processed_keyword] + params + [limit, offset]
-            else:
-                select_fields = """
-                    id, info_hash, name, total_size, file_count,
-                    health_score, hot_score, search_count,
-                    has_video, has_audio, quality,
-                    last_seen, created_at
-                """
-                params_with_score = params + [limit, offset]
+                # 分类字段（入库时由 TorrentClassifier 填充）
+                for column in ('category', 'sub_category', 'quality', 'codec', 'language'):
+                    if column in filters:
+                        where_clauses.append(f"{column} = %s")
+                        params.append(filters[column])
             
-            search_sql = f"""
-                SELECT {select_fields}
-                FROM torrents
-                WHERE {where_sql}
-                ORDER BY {order_by}
-                LIMIT %s OFFSET %s
-            """
+            filter_sql = " AND ".join(where_clauses)
             
-            results = MySQLClient.fetch_all(search_sql, tuple(params_with_score))
+            # 3. 关键词匹配: MySQL FULLTEXT，或内置倒排索引（SEARCH_BACKEND=index，只索引名称，不可用时回退）
+            found = None
+            text_sql, text_params = SearchService.SCOPES[scope][1], [processed_keyword]
+            if SEARCH_BACKEND == 'index' and scope == 'name':
+                try:
+                    if sort in TextIndex.SORTS:
+                        found = IndexSearch.search(
+                            keyword, processed_keyword, sort, page, limit, cursor, filters,
+                            SearchService.SELECT_FIELDS, filter_sql, params
+                        )
+                    else:
+                        text_sql, text_params = IndexSearch.candidates(keyword) or (text_sql, text_params)
+                except Exception as e:
+                    logger.error(f"Index search failed, falling back to MySQL: {e}")
+            if found is None:
+                found = SearchService._search_mysql(
+                    processed_keyword, sort, page, limit, cursor, filters,
+                    f"{filter_sql} AND {text_sql}", params + list(text_params), scope
+                )
+            results, total, total_exact = found['results'], found['total'], found['total_exact']
             
-            # 6. 计算总页数
-            total_pages = (total + limit - 1) // limit
+            # 4. 计算总页数（页码翻页最多到 SEARCH_MAX_PAGE，之后只能用游标）
+            total_pages = min((total + limit - 1) // limit, SEARCH_MAX_PAGE)
 
-            # 7. 更新搜索次数（批量更新）
+            # 5. 累加搜索次数（缓冲在 Redis，由 CounterBuffer 定期写回）
             if results and keyword:
-                try:
-                    ids = [r['id'] for r in results]
-                    placeholders = ','.join(['%s'] * len(ids))
-                    MySQLClient.execute(
-                        f"UPDATE torrents SET search_count = search_count + 1 WHERE id IN ({placeholders})",
-                        tuple(ids)
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to update search count: {e}")
+                CounterBuffer.incr('search_count', [r['id'] for r in results])
             
-            return {
+            result = {
                 'results': results,
                 'total': total,
+                'total_exact': total_exact,
+                'total_display': SearchService.format_total(total, total_exact),
                 'page': page,
                 'total_pages': total_pages,
+                'next_cursor': found['next_cursor'],
                 'keyword': keyword,
-                'processed_keyword': processed_keyword
+                'processed_keyword': processed_keyword,
+                'scope': scope
             }
+            SearchCache.set(cache_key, sort, result)
+            return result
             
         except Exception as e:
             logger.error(f"Search error: {e}")
@@ -205,6 +245,133 @@ class SearchService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def _search_mysql(processed_keyword, sort, page, limit, cursor, filters, where_sql, params, scope='name'):
+        """
+        在 MySQL 中查询一页（where_sql 已包含关键词条件）
+
+        返回:
+            {'results', 'total', 'total_exact', 'next_cursor'}
+        """
+        # 获取排序方式
+        order_by = SearchService.SORT_MODES[sort]
+        column, direction = SearchService.SORT_KEYS[sort]
+        from_sql, match_sql = SearchService.SCOPES[scope]
+        relevance = sort == 'relevance'
+        
+        # 查询总数（优先读缓存，最多数到 SEARCH_COUNT_CAP）
+        total, total_exact = SearchService.count(where_sql, params, processed_keyword, filters, scope=scope)
+        
+        # 查询结果（有游标时用 keyset 条件代替 OFFSET）
+        if cursor:
+            if relevance:
+                keyset_sql, keyset_params = Cursor.keyset(
+                    match_sql, direction, cursor, (processed_keyword,))
+            else:
+                keyset_sql, keyset_params = Cursor.keyset(column, direction, cursor)
+            where_sql = f"{where_sql} AND {keyset_sql}"
+            limit_sql = "LIMIT %s"
+            page_params = keyset_params + [limit]
+        else:
+            limit_sql = "LIMIT %s OFFSET %s"
+            page_params = [limit, (page - 1) * limit]
+        
+        # 如果是相关度排序，添加评分字段
+        if relevance:
+            select_fields = f"{SearchService.SELECT_FIELDS}, {match_sql} as score"
+            params_with_score = [processed_keyword] + params + page_params
+        else:
+            select_fields = SearchService.SELECT_FIELDS
+            params_with_score = params + page_params
+        
+        search_sql = f"""
+            SELECT {select_fields}
+            FROM {from_sql}
+            WHERE {where_sql}
+            ORDER BY {order_by}
+            {limit_sql}
+        """
+        
+        results = MySQLClient.fetch_all(search_sql, tuple(params_with_score))
+        return {
+            'results': results,
+            'total': total,
+            'total_exact': total_exact,
+            'next_cursor': Cursor.next(sort, results, limit, page, 'score' if relevance else column),
+        }
+    
+    @staticmethod
+    def count(where_sql, params, processed_keyword, filters, cap=None, use_cache=True, scope='name'):
+        """
+        统计匹配的种子数
+
+        宽泛的 ngram 词可能匹配上百万行，完整 COUNT(*) 比取一页还慢，
+        所以只数到 cap（子查询 LIMIT cap + 1），超过时返回 (cap, False)。
+        结果按 (关键词, 过滤条件) 缓存 SEARCH_COUNT_TTL 秒。
+
+        参数:
+            cap: int - 计数上限，None 使用 SEARCH_COUNT_CAP，0 表示精确计数
+            scope: str - 搜索范围（决定 FROM 子句和缓存键）
+
+        返回:
+            (total, exact)
+        """
+        if use_cache:
+            cached = SearchCache.get_total(processed_keyword, filters, scope)
+            if cached is not None:
+                return cached
+        from_sql = SearchService.SCOPES[scope][0]
+        cap = SEARCH_COUNT_CAP if cap is None else cap
+        if cap:
+            row = MySQLClient.fetch_one(
+                f"SELECT COUNT(*) AS total FROM (SELECT 1 FROM {from_sql} WHERE {where_sql} LIMIT %s) AS capped",
+                tuple(params) + (cap + 1,)
+            )
+            total = row['total'] if row else 0
+            exact = total <= cap
+            total = min(total, cap)
+        else:
+            row = MySQLClient.fetch_one(f"SELECT COUNT(*) AS total FROM {from_sql} WHERE {where_sql}", tuple(params))
+            total, exact = (row['total'] if row else 0), True
+        SearchCache.set_total(processed_keyword, filters, total, exact, scope=scope)
+        return total, exact
+    
+    @staticmethod
+    def format_total(total, exact):
+        """总数显示文本: 1,234 / 10,000+"""
+        return f"{total:,}" if exact else f"{total:,}+"
+    
+    @staticmethod
+    def refresh_popular_totals(top_n=100):
+        """
+        为搜索次数最多的关键词计算精确总数并写入缓存（无过滤条件）
+
+        由 admin_cli.py refresh-counts 定期执行，热门词的 "10,000+" 会变成精确值。
+        关键词来自 search_keywords，该表由 KeywordBuffer 写入（API 记录有结果的首页搜索，
+        随计数缓冲定期落库）；表为空时（如关键词尚未落库）不刷新任何词
+
+        返回:
+            int: 刷新的关键词数
+        """
+        rows = MySQLClient.fetch_all(
+            "SELECT keyword FROM search_keywords ORDER BY search_count DESC LIMIT %s",
+            (top_n,)
+        )
+        refreshed = 0
+        for row in rows:
+            processed_keyword = SearchService.preprocess_keyword(row['keyword'])
+            if not processed_keyword.strip():
+                continue
+            try:
+                SearchService.count(
+                    f"is_blocked = FALSE AND {SearchService.MATCH_SQL}", [processed_keyword],
+                    processed_keyword, None, cap=0, use_cache=False
+                )
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"Count refresh failed for {row['keyword']!r}: {e}")
+        return refreshed
+    
     @staticmethod
     def get_torrent_detail(info_hash):
         """
@@ -226,32 +393,25 @@ class SearchService:
                 SELECT * FROM torrents
                 WHERE info_hash = %s AND is_blocked = FALSE
                 """,
-                (info_hash,)
+                (keys.db_hash(info_hash),)
             )
             
             if not torrent:
                 return None
             
-            # 查询文件列表
-            files = MySQLClient.fetch_all(
-                """
-                SELECT file_name, file_path, file_size, file_extension
-                FROM torrent_files
-                WHERE torrent_id = %s
-                ORDER BY file_index
-                """,
-                (torrent['id'],)
-            )
+            # 查询文件列表（只取第一页，压缩存储的种子附带摘要）
+            files, file_list = SearchService._load_files(torrent['id'], 0, SearchService.DETAIL_FILES_LIMIT)
+            if file_list and file_list.get('summary'):
+                summary = file_list['summary']
+                torrent['file_summary'] = json.loads(summary) if isinstance(summary, str) else summary
             
-            # 更新浏览次数
-            MySQLClient.execute(
-                "UPDATE torrents SET view_count = view_count + 1 WHERE id = %s",
-                (torrent['id'],)
-            )
+            # 累加浏览次数（缓冲写回）
+            CounterBuffer.incr('view_count', [torrent['id']])
             
             return {
                 'torrent': torrent,
-                'files': files
+                'files': files,
+                'files_total': torrent.get('file_count') or len(files)
             }
             
         except Exception as e:
@@ -259,41 +419,185 @@ class SearchService:
             return None
     
     @staticmethod
-    def get_hot_torrents(limit=20):
-        """获取热门种子"""
-        try:
-            results = MySQLClient.fetch_all(
+    def _load_files(torrent_id, offset, limit):
+        """
+        读取一页文件列表，兼容逐行存储和压缩 blob 存储
+
+        blob 存储只读取头部和目标压缩块（SUBSTRING），不随文件总数增长。
+        两种存储返回的文件字段相同（file_index / file_name / file_path / file_size / file_extension）
+
+        返回:
+            (files, file_list)，file_list 为 torrent_file_lists 的元信息（逐行存储时为 None）
+        """
+        db_id = keys.db_id(torrent_id)
+        file_list = MySQLClient.fetch_one(
+            """
+            SELECT file_count, block_size, block_count, summary,
+                   SUBSTRING(data, 1, %s + 4 * block_count) AS header
+            FROM torrent_file_lists
+            WHERE torrent_id = %s
+            """,
+            (FileListCodec.header_length(0), db_id)
+        )
+        if not file_list:
+            files = MySQLClient.fetch_all(
                 """
-                SELECT 
-                    info_hash, name, total_size, health_score, hot_score
-                FROM torrents
-                WHERE is_blocked = FALSE
-                ORDER BY hot_score DESC, search_count DESC
-                LIMIT %s
+                SELECT file_index, file_name, file_path, file_size, file_extension
+                FROM torrent_files
+                WHERE torrent_id = %s
+                ORDER BY file_index
+                LIMIT %s OFFSET %s
                 """,
-                (limit,)
+                (db_id, limit, offset)
             )
-            return results
+            return files, None
+        
+        _, block_size, lengths = FileListCodec.parse_header(file_list['header'])
+        span = FileListCodec.block_range(lengths, block_size, offset, limit)
+        if span is None:
+            return [], file_list
+        first, last, byte_start, byte_length = span
+        chunk = MySQLClient.fetch_one(
+            "SELECT SUBSTRING(data, %s, %s) AS chunk FROM torrent_file_lists WHERE torrent_id = %s",
+            (byte_start + 1, byte_length, db_id)
+        )
+        page = FileListCodec.read_page(chunk['chunk'], lengths, first, last, block_size, offset, limit)
+        return [FileListCodec.file_dict(*f) for f in page], file_list
+    
+    @staticmethod
+    def get_torrent_files(info_hash, page=1, limit=100):
+        """
+        分页获取种子文件列表
+        
+        参数:
+            info_hash: str - 种子哈希
+            page: int - 页码（从 1 开始）
+            limit: int - 每页数量
+        
+        返回:
+            {'files': [...], 'total': int, 'page': int, 'total_pages': int} 或 None
+        """
+        try:
+            torrent = MySQLClient.fetch_one(
+                "SELECT id, file_count FROM torrents WHERE info_hash = %s AND is_blocked = FALSE",
+                (keys.db_hash(info_hash),)
+            )
+            if not torrent:
+                return None
+            
+            files, _ = SearchService._load_files(torrent['id'], (page - 1) * limit, limit)
+            total = torrent['file_count'] or 0
+            return {
+                'files': files,
+                'total': total,
+                'page': page,
+                'total_pages': (total + limit - 1) // limit
+            }
         except Exception as e:
-            logger.error(f"Get hot torrents error: {e}")
-            return []
+            logger.error(f"Get torrent files error: {e}")
+            return None
     
     @staticmethod
-    def get_recent_torrents(limit=20):
-        """获取最新种子"""
+    def get_hot_torrents(limit=20, cursor=None):
+        """
+        获取热门种子（优先读 Redis 热门榜，榜单为空时回退到数据库排序）
+
+        参数:
+            cursor: dict - Cursor.decode(token, ('hot_rank', 'hot')) 的结果，
+                    hot_rank 游标按热门榜分数翻页，hot 游标按数据库 keyset 翻页
+
+        热门榜只保留 CACHE_HOT_TORRENTS_SIZE 个，翻到榜单末尾时不再返回 next_cursor
+        （榜单分数含时间项，与数据库 hot_score 顺序不一致，不能接着用数据库 keyset 翻页）
+
+        返回:
+            {'results': [...], 'next_cursor': str 或 None}
+        """
+        page = cursor['page'] if cursor else 1
+        if cursor is None or cursor['sort'] == 'hot_rank':
+            try:
+                client = RedisClient.get_client()
+                if cursor:
+                    # 分数严格小于上一页最后一个（分数为浮点，相同分数的概率可以忽略）
+                    entries = client.zrevrangebyscore(
+                        HotScoreEngine.HOT_KEY, f"({cursor['value']!r}", '-inf',
+                        start=0, num=limit + 1, withscores=True
+                    )
+                else:
+                    entries = client.zrevrange(HotScoreEngine.HOT_KEY, 0, limit, withscores=True)
+                # 多取一个判断榜单后面是否还有
+                has_more = len(entries) > limit
+                entries = entries[:limit]
+                if entries or cursor:
+                    ids = [member.decode() for member, _ in entries]
+                    rows = []
+                    if ids:
+                        placeholders = ','.join(['%s'] * len(ids))
+                        rows = MySQLClient.fetch_all(
+                            f"""
+                            SELECT id, info_hash, name, total_size, health_score, hot_score
+                            FROM torrents
+                            WHERE id IN ({placeholders}) AND is_blocked = FALSE
+                            """,
+                            tuple(keys.db_id(i) for i in ids)
+                        )
+                    by_id = {r['id']: r for r in rows}
+                    next_cursor = None
+                    if has_more:
+                        next_cursor = Cursor.encode('hot_rank', entries[-1][1], ids[-1], page + 1)
+                    return {'results': [by_id[i] for i in ids if i in by_id], 'next_cursor': next_cursor}
+            except Exception as e:
+                logger.error(f"Hot leaderboard read failed, falling back to MySQL: {e}")
+            if cursor:
+                return {'results': [], 'next_cursor': None}
+        return SearchService._list_torrents(
+            'hot', "info_hash, name, total_size, health_score, hot_score", limit, cursor
+        )
+    
+    @staticmethod
+    def get_recent_torrents(limit=20, cursor=None):
+        """
+        获取最新种子
+
+        参数:
+            cursor: dict - Cursor.decode(token, 'recent') 的结果
+
+        返回:
+            {'results': [...], 'next_cursor': str 或 None}
+        """
+        return SearchService._list_torrents(
+            'recent', "info_hash, name, total_size, health_score, created_at", limit, cursor
+        )
+    
+    # 列表接口的排序: 名称 -> (排序键（降序）, id 方向)，与对应索引的顺序一致
+    LIST_SORT_KEYS = {
+        'hot': ('hot_score', 'ASC'),
+        'recent': ('created_at', 'DESC'),
+    }
+    
+    @staticmethod
+    def _list_torrents(sort, fields, limit, cursor=None):
+        """按索引顺序列出种子，游标翻页用 keyset 条件"""
+        column, direction = SearchService.LIST_SORT_KEYS[sort]
+        where_sql = "is_blocked = FALSE"
+        params = []
+        page = 1
+        if cursor:
+            keyset_sql, params = Cursor.keyset(column, direction, cursor)
+            where_sql = f"{where_sql} AND {keyset_sql}"
+            page = cursor['page']
         try:
             results = MySQLClient.fetch_all(
-                """
+                f"""
                 SELECT 
-                    info_hash, name, total_size, health_score, created_at
+                    id, {fields}
                 FROM torrents
-                WHERE is_blocked = FALSE
-                ORDER BY created_at DESC
+                WHERE {where_sql}
+                ORDER BY {column} DESC, id {direction}
                 LIMIT %s
                 """,
-                (limit,)
+                tuple(params + [limit])
             )
-            return results
+            return {'results': results, 'next_cursor': Cursor.next(sort, results, limit, page, column)}
         except Exception as e:
-            logger.error(f"Get recent torrents error: {e}")
-            return []
+            logger.error(f"List {sort} torrents error: {e}")
+            return {'results': [], 'next_cursor': None}
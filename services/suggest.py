@@ -0,0 +1,157 @@
+"""
+搜索建议
+API 进程内的前缀索引: 搜索次数最多的 SUGGEST_TOP_N 个关键词按字典序排成数组，
+前缀对应数组中连续的一段（bisect 定位），取段内搜索次数最多的几个返回
+
+前缀匹配的关键词超过 SPAN 个时（短前缀，如单个字母），建索引时预先算好该前缀的前 SUGGEST_LIMIT 个；
+其余前缀的段不超过 SPAN 个，查询时现场挑选。两种情况都不访问 MySQL / Redis，单次查询在百微秒以内。
+
+索引由 API 后台任务每 SUGGEST_REFRESH_SEC 秒从 search_keywords 重建，整体替换（查询无需加锁）。
+"""
+import re
+import time
+import heapq
+import logging
+import sys
+import os
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mysql_client import MySQLClient
+from config.settings import SUGGEST_TOP_N, SUGGEST_MIN_COUNT, SUGGEST_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# 大于任何字符，prefix + _MAX_CHAR 是所有以 prefix 开头的字符串的上界
+_MAX_CHAR = chr(0x10FFFF)
+
+class SuggestIndex:
+    """关键词前缀索引（不可变，重建时整体替换）"""
+
+    SPAN = 256   # 前缀段超过该长度时预先计算结果
+
+    def __init__(self, entries=(), limit=None):
+        """
+        参数:
+            entries: [(关键词, 搜索次数)]，关键词已规范化（小写、合并空白）
+            limit: int - 每个前缀最多返回的建议数
+        """
+        self.limit = limit or SUGGEST_LIMIT
+        entries = sorted(entries)
+        self.words = [w for w, _ in entries]
+        self.counts = [n for _, n in entries]
+        self.top = self._precompute()
+        self.built_at = time.time()
+
+    def _best(self, lo, hi, limit):
+        """[lo, hi) 中搜索次数最多的 limit 个下标（次数相同时字典序在前的优先）"""
+        return heapq.nsmallest(limit, range(lo, hi), key=lambda i: -self.counts[i])
+
+    def _precompute(self):
+        """
+        逐层找出匹配数超过 SPAN 的前缀，预先计算其结果
+
+        第 d 层只在第 d-1 层超过 SPAN 的段里查找，每层的总代价不超过 O(N)
+        """
+        words = self.words
+        top = {}
+        spans = [(0, len(words))]
+        depth = 0
+        while spans:
+            depth += 1
+            deeper = []
+            for lo, hi in spans:
+                i = lo
+                while i < hi:
+                    if len(words[i]) < depth:
+                        # 恰好等于上一层前缀的词
+                        i += 1
+                        continue
+                    prefix = words[i][:depth]
+                    j = bisect_left(words, prefix + _MAX_CHAR, i, hi)
+                    if j - i > self.SPAN:
+                        top[prefix] = [words[k] for k in self._best(i, j, self.limit)]
+                        deeper.append((i, j))
+                    i = j
+            spans = deeper
+        return top
+
+    def suggest(self, prefix, limit=None):
+        """
+        前缀匹配的建议
+
+        参数:
+            prefix: str - 已规范化的前缀
+            limit: int - 最多返回数（不超过建索引时的 limit）
+
+        返回:
+            [关键词]，按搜索次数降序
+        """
+        limit = min(limit or self.limit, self.limit)
+        if not prefix:
+            return []
+        cached = self.top.get(prefix)
+        if cached is not None:
+            return cached[:limit]
+        lo = bisect_left(self.words, prefix)
+        hi = bisect_left(self.words, prefix + _MAX_CHAR, lo)
+        return [self.words[i] for i in self._best(lo, hi, limit)]
+
+    def stats(self):
+        return {
+            'keywords': len(self.words),
+            'precomputed_prefixes': len(self.top),
+            'built_at': int(self.built_at),
+        }
+
+class SuggestService:
+    """搜索建议（进程内共享一个 SuggestIndex）"""
+
+    _index = SuggestIndex()
+
+    @staticmethod
+    def normalize(prefix):
+        """与 KeywordBuffer.normalize 一致，但保留末尾空格（用户正在输入下一个词）"""
+        if not prefix:
+            return ''
+        prefix = re.sub(r'\s+', ' ', prefix).lstrip().lower()
+        return prefix[:200]
+
+    @classmethod
+    def load(cls, top_n=None, min_count=None):
+        """读取搜索次数最多的关键词，去掉禁搜词"""
+        from services.security_middleware import SecurityMiddleware
+        
+        rows = MySQLClient.fetch_all(
+            """
+            SELECT keyword, search_count FROM search_keywords
+            WHERE search_count >= %s
+            ORDER BY search_count DESC LIMIT %s
+            """,
+            (SUGGEST_MIN_COUNT if min_count is None else min_count, top_n or SUGGEST_TOP_N)
+        )
+        entries = []
+        for row in rows:
+            keyword = row['keyword'].lower()
+            if not SecurityMiddleware.check_banned_keyword(keyword)[0]:
+                entries.append((keyword, row['search_count']))
+        return entries
+
+    @classmethod
+    def refresh(cls):
+        """重建索引，返回关键词数"""
+        start = time.time()
+        index = SuggestIndex(cls.load())
+        cls._index = index
+        logger.info(f"Suggest index rebuilt: {len(index.words)} keywords, "
+                    f"{len(index.top)} precomputed prefixes in {time.time() - start:.2f}s")
+        return len(index.words)
+
+    @classmethod
+    def suggest(cls, prefix, limit=None):
+        return cls._index.suggest(cls.normalize(prefix), limit)
+
+    @classmethod
+    def stats(cls):
+        return cls._index.stats()
@@ -0,0 +1,613 @@
+"""
+倒排索引
+种子名称的进程内全文索引，SEARCH_BACKEND=index 时代替 MySQL ngram FULLTEXT
+
+- 分词: 拉丁字母/数字按词切分，中日韩文字切成重叠的二元组（与 ngram_token_size=2 一致）
+- 段（segment）: 不可变文件。写入进程每 INDEX_FLUSH_SEC 秒把新入库的种子写成一个小段，
+  workers/search_index.py 把同一层级的小段合并成大段
+- 读取: 段文件用 mmap 打开，词典二分查找，倒排表按需解码
+- 倒排表: 段内文档号按 (created_at, id) 升序分配，倒排表存文档号差值，每 128 个一块，
+  按块内最大差值选 1/2/4 字节宽度，用 array 整块解码
+
+段文件格式（小端）:
+    头部      magic(8) version(u32) doc_count(u32) term_count(u32) pad(u32)
+              docs_off terms_off strings_off postings_off replaces_off（u64）
+    docs      doc_count × 32 字节: id(16) created_at(u32) token_count(u16) pad(u16) total_size(u64)
+    terms     term_count × 24 字节: string_off(u32) string_len(u16) pad(u16) postings_off(u64) doc_freq(u32) postings_len(u32)
+    strings   词（UTF-8，按字节序排列）
+    postings  各词的倒排表
+    replaces  合并得到的段所替换的段文件名（换行分隔），读取时忽略被替换的段
+"""
+import os
+import re
+import sys
+import math
+import mmap
+import time
+import heapq
+import struct
+import logging
+import threading
+import unicodedata
+from array import array
+from itertools import accumulate
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'DHTIDX\x00\x01'
+VERSION = 1
+HEADER = struct.Struct('<8sIIII5Q')
+DOC = struct.Struct('<16sIHHQ')
+TERM = struct.Struct('<IHHQII')
+BLOCK = 128
+SEGMENT_SUFFIX = '.idx'
+
+# 差值宽度 -> array 类型码
+_WIDTHS = {1: 'B', 2: 'H', 4: 'I'}
+_SWAP = sys.byteorder != 'little'
+
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'   # 假名、中日韩汉字、韩文
+_TOKEN_RE = re.compile(f'[{_CJK}]+|[^\\W_{_CJK}]+')
+_CJK_RE = re.compile(f'[{_CJK}]')
+
+MAX_TOKENS = 256   # 每个名称最多索引的词数
+
+def tokenize(text):
+    """
+    分词（索引和查询使用同一规则）
+
+    "复仇者联盟4 1080p" -> ['复仇', '仇者', '者联', '联盟', '4', '1080p']
+    单个拉丁字母不索引（与 preprocess_keyword 过滤单字符一致），数字保留
+    """
+    if not text:
+        return []
+    tokens = []
+    for run in _TOKEN_RE.findall(unicodedata.normalize('NFKC', text).lower()):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        elif len(run) > 1 or run.isdigit():
+            tokens.append(run)
+    return tokens[:MAX_TOKENS]
+
+def encode_postings(doc_nums):
+    """升序文档号 -> 分块差值编码"""
+    out = bytearray()
+    prev = 0
+    deltas = []
+    for n in doc_nums:
+        deltas.append(n - prev)
+        prev = n
+    for start in range(0, len(deltas), BLOCK):
+        block = deltas[start:start + BLOCK]
+        peak = max(block)
+        width = 1 if peak < 0x100 else 2 if peak < 0x10000 else 4
+        packed = array(_WIDTHS[width], block)
+        if _SWAP:
+            packed.byteswap()
+        out.append(width)
+        out += packed.tobytes()
+    return bytes(out)
+
+def decode_postings(buf, offset, count):
+    """分块差值编码 -> 升序文档号列表"""
+    deltas = []
+    pos = offset
+    remaining = count
+    while remaining:
+        n = min(BLOCK, remaining)
+        width = buf[pos]
+        block = array(_WIDTHS[width])
+        block.frombytes(buf[pos + 1:pos + 1 + n * width])
+        if _SWAP:
+            block.byteswap()
+        deltas.extend(block)
+        pos += 1 + n * width
+        remaining -= n
+    return list(accumulate(deltas))
+
+def segment_filename():
+    return f"seg-{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+
+def write_segment(directory, documents, replaces=()):
+    """
+    写入一个段
+
+    参数:
+        documents: list of (id_bytes, created_at, total_size, tokens)，tokens 为分词结果
+        replaces: 本段替换的段文件名（合并时）
+
+    返回:
+        str: 段文件路径，没有文档时为 None
+    """
+    if not documents and not replaces:
+        return None
+    docs = sorted(documents, key=lambda d: (d[1], d[0]))
+    postings = {}
+    doc_table = bytearray()
+    for num, (doc_id, created_at, total_size, tokens) in enumerate(docs):
+        doc_table += DOC.pack(doc_id, created_at, min(len(tokens), 0xFFFF), 0, total_size)
+        for token in set(tokens):
+            postings.setdefault(token.encode('utf-8'), []).append(num)
+    return _write_file(directory, len(docs), doc_table, postings, replaces)
+
+def _write_file(directory, doc_count, doc_table, postings, replaces):
+    """postings: {词 bytes: 升序文档号}"""
+    terms = sorted(postings)
+    term_table = bytearray()
+    strings = bytearray()
+    blob = bytearray()
+    for term in terms:
+        encoded = encode_postings(postings[term])
+        term_table += TERM.pack(len(strings), len(term), 0, len(blob), len(postings[term]), len(encoded))
+        strings += term
+        blob += encoded
+    replaces_blob = '\n'.join(replaces).encode('utf-8')
+
+    docs_off = HEADER.size
+    terms_off = docs_off + len(doc_table)
+    strings_off = terms_off + len(term_table)
+    postings_off = strings_off + len(strings)
+    replaces_off = postings_off + len(blob)
+    header = HEADER.pack(MAGIC, VERSION, doc_count, len(terms), 0,
+                         docs_off, terms_off, strings_off, postings_off, replaces_off)
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, segment_filename())
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        for part in (header, doc_table, term_table, strings, blob, replaces_blob):
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+class Segment:
+    """只读段（mmap）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        (magic, version, self.doc_count, self.term_count, _,
+         self._docs_off, self._terms_off, self._strings_off,
+         self._postings_off, replaces_off) = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a search index segment")
+        raw = bytes(self._buf[replaces_off:])
+        self.replaces = set(raw.decode('utf-8').split('\n')) if raw else set()
+
+    def _term(self, i):
+        string_off, string_len, _, postings_off, doc_freq, postings_len = TERM.unpack_from(
+            self._buf, self._terms_off + i * TERM.size)
+        start = self._strings_off + string_off
+        return self._buf[start:start + string_len], postings_off, doc_freq
+
+    def lookup(self, term):
+        """词 -> (倒排表偏移, 文档数)，不存在时返回 None（二分查找）"""
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value, postings_off, doc_freq = self._term(mid)
+            if value < term:
+                lo = mid + 1
+            elif value > term:
+                hi = mid
+            else:
+                return postings_off, doc_freq
+        return None
+
+    def postings(self, term):
+        found = self.lookup(term)
+        if found is None:
+            return []
+        postings_off, doc_freq = found
+        return decode_postings(self._buf, self._postings_off + postings_off, doc_freq)
+
+    def doc_freq(self, term):
+        found = self.lookup(term)
+        return found[1] if found else 0
+
+    def doc(self, num):
+        """文档号 -> (id_bytes, created_at, token_count, total_size)"""
+        doc_id, created_at, token_count, _, total_size = DOC.unpack_from(
+            self._buf, self._docs_off + num * DOC.size)
+        return doc_id, created_at, token_count, total_size
+
+    def doc_id(self, num):
+        """文档号 -> id_bytes（只读 id，不解码整条记录）"""
+        start = self._docs_off + num * DOC.size
+        return self._buf[start:start + 16]
+
+    def terms(self):
+        """遍历 (词, 倒排表)，合并时使用"""
+        for i in range(self.term_count):
+            term, postings_off, doc_freq = self._term(i)
+            yield term, decode_postings(self._buf, self._postings_off + postings_off, doc_freq)
+
+class IndexHits:
+    """
+    一次查询的结果
+
+    属性:
+        total: 全部匹配的文档数（不考虑游标，跨段去重，可能含已屏蔽/已删除的种子）
+        hits: [(排序键值, id_bytes)]，按排序降序
+        complete: hits 是否包含游标之后的全部匹配
+    """
+
+    __slots__ = ('total', 'hits', 'complete')
+
+    def __init__(self, total, hits, complete):
+        self.total = total
+        self.hits = hits
+        self.complete = complete
+
+class IndexMatches:
+    """
+    一个查询在各段中的匹配文档（每次请求求一次交集，分轮取候选、统计总数时复用）
+
+    同一种子可能同时出现在多个段中（如 build 生成的段和写入进程的新段尚未合并），
+    总数和命中都按 id 去重。写入进程和 build 都用数据库里的 created_at（整秒），
+    重复文档的排序键完全相同，游标翻页时会一起被跳过，不会在下一页再出现。
+    """
+
+    OVERLAP_MARGIN = 300   # 统计总数时容忍的 created_at 差值（秒），兼容旧版本写入进程生成的段
+
+    def __init__(self, segments, per_segment, terms):
+        self.segments = segments         # 查询时可见的全部段（idf 统计用）
+        self.per_segment = per_segment   # [(segment, 升序文档号)]
+        self.terms = terms
+        self._ids = None
+        self._idf = None
+        self._total = None
+
+    def doc_ids(self):
+        """全部匹配文档的 id 集合（跨段去重）"""
+        if self._ids is None:
+            ids = set()
+            for segment, nums in self.per_segment:
+                ids.update(segment.doc_id(num) for num in nums)
+            self._ids = ids
+        return self._ids
+
+    @property
+    def total(self):
+        """
+        匹配文档数（跨段去重）
+
+        同一种子在不同段中的 created_at 相同（旧段最多差 OVERLAP_MARGIN 秒），重复只可能出现在
+        段的时间范围相交的部分: 只读这部分文档的 id，代价与匹配总数无关
+        """
+        if self._total is None:
+            total = sum(len(nums) for _, nums in self.per_segment)
+            if len(self.per_segment) > 1:
+                ranges = [(segment.doc(nums[0])[1], segment.doc(nums[-1])[1]) for segment, nums in self.per_segment]
+                seen = set()
+                for i, (segment, nums) in enumerate(self.per_segment):
+                    positions = set()
+                    for j, (lo, hi) in enumerate(ranges):
+                        if j != i:
+                            start, stop = self._span(segment, nums, lo - self.OVERLAP_MARGIN, hi + self.OVERLAP_MARGIN)
+                            positions.update(range(start, stop))
+                    for pos in positions:
+                        doc_id = segment.doc_id(nums[pos])
+                        if doc_id in seen:
+                            total -= 1
+                        else:
+                            seen.add(doc_id)
+                self._total = total
+            else:
+                # 段内文档不重复
+                self._total = total
+        return self._total
+
+    @staticmethod
+    def _span(segment, nums, lo, hi):
+        """nums 中 created_at 落在 [lo, hi] 的下标范围（nums 按 created_at 升序，二分）"""
+        def bound(value):
+            left, right = 0, len(nums)
+            while left < right:
+                mid = (left + right) // 2
+                if segment.doc(nums[mid])[1] < value:
+                    left = mid + 1
+                else:
+                    right = mid
+            return left
+        return bound(lo), bound(hi + 1)
+
+    def idf(self):
+        """查询词的 idf 之和（relevance 排序用）"""
+        if self._idf is None:
+            segments = self.segments
+            doc_count = sum(s.doc_count for s in segments) or 1
+            self._idf = sum(
+                math.log(1 + doc_count / (1 + sum(s.doc_freq(t) for s in segments)))
+                for t in self.terms
+            )
+        return self._idf
+
+    def page(self, sort='time', limit=1000, after=None):
+        """
+        取游标之后的 limit 个命中
+
+        time 从各段倒排表尾部倒序流式归并，代价与翻过的命中数有关，与匹配总数无关；
+        size / relevance 用 heapq.nlargest 选出前 limit 个，不整体排序。
+
+        relevance 是 idf / sqrt(名称词数): 倒排表不存词频，idf 对同一查询的所有命中相同，
+        实际效果是名称越短越靠前，与 MySQL 后端 MATCH AGAINST 的评分和排序并不一致。
+
+        返回:
+            IndexHits
+        """
+        if sort not in TextIndex.SORTS:
+            sort = 'time'
+        if sort == 'time':
+            streams = [TextIndex._time_stream(segment, nums, after) for segment, nums in self.per_segment]
+            hits = []
+            seen = set()
+            complete = True
+            for key, doc_id in heapq.merge(*streams, reverse=True):
+                if doc_id in seen:
+                    continue
+                if len(hits) >= limit:
+                    complete = False
+                    break
+                seen.add(doc_id)
+                hits.append((key, doc_id))
+            return IndexHits(self.total, hits, complete)
+
+        keyed = TextIndex._keyed(self.per_segment, sort, self.idf() if sort == 'relevance' else None, after)
+        if len(self.per_segment) > 1:
+            # 重复文档的 (键值, id) 完全相同
+            keyed = set(keyed)
+        top = heapq.nlargest(limit + 1, keyed)
+        return IndexHits(self.total, top[:limit], len(top) <= limit)
+
+class TextIndex:
+    """
+    索引目录的读取端（线程安全）
+
+    每 refresh_sec 秒重新扫描目录，打开新段、丢弃已删除和已被合并替换的段。
+    旧段不显式关闭（可能有查询仍在读取），随引用释放由 mmap 自行关闭。
+    """
+
+    # 可以直接在索引里排序的方式 -> 排序键
+    SORTS = ('time', 'size', 'relevance')
+
+    def __init__(self, directory, refresh_sec=5):
+        self.directory = directory
+        self.refresh_sec = refresh_sec
+        self._segments = {}
+        self._visible = []
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        if not force and time.time() - self._refreshed < self.refresh_sec:
+            return
+        with self._lock:
+            try:
+                names = {n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX)}
+            except FileNotFoundError:
+                names = set()
+            segments = {n: s for n, s in self._segments.items() if n in names}
+            for name in sorted(names - set(segments)):
+                try:
+                    segments[name] = Segment(os.path.join(self.directory, name))
+                except (OSError, ValueError, struct.error) as e:
+                    logger.error(f"Failed to open index segment {name}: {e}")
+            replaced = set().union(*(s.replaces for s in segments.values())) if segments else set()
+            self._segments = segments
+            self._visible = [s for n, s in sorted(segments.items()) if n not in replaced]
+            self._refreshed = time.time()
+
+    def segments(self):
+        self.refresh()
+        return self._visible
+
+    def stats(self):
+        segments = self.segments()
+        return {
+            'segments': len(segments),
+            'docs': sum(s.doc_count for s in segments),
+            'bytes': sum(os.path.getsize(s.path) for s in segments if os.path.exists(s.path)),
+        }
+
+    def match(self, query):
+        """
+        求查询在各段中的匹配（所有词都必须出现）
+
+        交集结果保持升序（段内按 created_at 排列），time 排序直接从尾部读取。
+
+        返回:
+            IndexMatches；查询没有可用的词时返回 None
+        """
+        terms = sorted({t.encode('utf-8') for t in tokenize(query)})
+        if not terms:
+            return None
+        segments = self.segments()
+        per_segment = []
+        for segment in segments:
+            lists = []
+            for term in terms:
+                found = segment.postings(term)
+                if not found:
+                    break
+                lists.append(found)
+            else:
+                lists.sort(key=len)
+                matched = lists[0]
+                if len(lists) > 1:
+                    matched = sorted(set(matched).intersection(*lists[1:]))
+                if matched:
+                    per_segment.append((segment, matched))
+        return IndexMatches(segments, per_segment, terms)
+
+    def search(self, query, sort='time', limit=1000, after=None):
+        """
+        查询（所有词都必须出现），相当于 match(query).page(sort, limit, after)
+
+        参数:
+            query: str - 原始关键词
+            sort: time（created_at）/ size（total_size）/ relevance（名称越短越靠前，见 IndexMatches.page），
+                  其他排序方式按 time 返回候选
+            limit: int - 最多返回的命中数
+            after: (排序键值, id_bytes) - 游标，只返回排在它之后的命中
+
+        返回:
+            IndexHits；查询没有可用的词时返回 None
+        """
+        matches = self.match(query)
+        if matches is None:
+            return None
+        return matches.page(sort, limit, after)
+
+    @staticmethod
+    def _time_stream(segment, nums, after=None):
+        """nums 为升序文档号，从尾部倒序产出；有游标时先二分跳到游标之后，深翻页不需要逐个跳过"""
+        stop = len(nums)
+        if after is not None:
+            lo, hi = 0, stop
+            while lo < hi:
+                mid = (lo + hi) // 2
+                doc_id, created_at, _, _ = segment.doc(nums[mid])
+                if (created_at, doc_id) < after:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            stop = lo
+        for i in range(stop - 1, -1, -1):
+            doc_id, created_at, _, _ = segment.doc(nums[i])
+            yield created_at, doc_id
+
+    @staticmethod
+    def _keyed(per_segment, sort, idf, after=None):
+        """产出游标之后的 (排序键值, id_bytes)"""
+        for segment, nums in per_segment:
+            for num in nums:
+                doc_id, _, token_count, total_size = segment.doc(num)
+                if sort == 'size':
+                    key = (total_size, doc_id)
+                else:
+                    key = (round(idf / math.sqrt(max(token_count, 1)), 6), doc_id)
+                if after is None or key < after:
+                    yield key
+
+class IndexWriter:
+    """
+    写入进程的段缓冲: add() 累积新文档，达到 segment_docs 或超过 flush_sec 时写成一个段
+    """
+
+    def __init__(self, directory, segment_docs=50000, flush_sec=60):
+        self.directory = directory
+        self.segment_docs = segment_docs
+        self.flush_sec = flush_sec
+        self._docs = []
+        self._since = time.time()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id, name, created_at, total_size, alt_name=None):
+        """
+        参数:
+            doc_id: bytes - 种子 id（UUID 16 字节）
+            created_at: int - 入库时间（Unix 时间戳）
+        """
+        tokens = tokenize(name)
+        if alt_name and alt_name != name:
+            tokens += tokenize(alt_name)
+        if not tokens:
+            return
+        if not self._docs:
+            self._since = time.time()
+        self._docs.append((doc_id, int(created_at), int(total_size or 0), tokens))
+        if len(self._docs) >= self.segment_docs:
+            self.flush()
+
+    def maybe_flush(self):
+        if self._docs and time.time() - self._since >= self.flush_sec:
+            self.flush()
+
+    def flush(self):
+        """写出缓冲中的文档，返回段文件路径"""
+        if not self._docs:
+            return None
+        path = write_segment(self.directory, self._docs)   # 写入失败时保留缓冲，下次重试
+        logger.info(f"Wrote index segment {os.path.basename(path)} ({len(self._docs)} docs)")
+        self._docs = []
+        return path
+
+def merge_segments(segments, directory, drop_before=None):
+    """
+    把多个段合并成一个（同一 id 只保留一次，可丢弃 created_at 早于 drop_before 的文档）
+
+    返回:
+        str: 新段路径
+    """
+    docs = {}
+    for segment in segments:
+        for num in range(segment.doc_count):
+            doc_id, created_at, token_count, total_size = segment.doc(num)
+            if drop_before is not None and created_at < drop_before:
+                continue
+            docs.setdefault(doc_id, (created_at, token_count, total_size))
+    ordered = sorted(docs.items(), key=lambda d: (d[1][0], d[0]))
+    new_num = {doc_id: num for num, (doc_id, _) in enumerate(ordered)}
+    doc_table = bytearray()
+    for doc_id, (created_at, token_count, total_size) in ordered:
+        doc_table += DOC.pack(doc_id, created_at, token_count, 0, total_size)
+
+    postings = {}
+    for segment in segments:
+        mapping = [new_num.get(segment.doc(num)[0]) for num in range(segment.doc_count)]
+        for term, nums in segment.terms():
+            target = postings.setdefault(term, set())
+            target.update(m for m in (mapping[n] for n in nums) if m is not None)
+    postings = {term: sorted(nums) for term, nums in postings.items() if nums}
+    return _write_file(directory, len(ordered), doc_table, postings, [s.name for s in segments])
+
+def merge_pending(directory, factor=10, drop_before=None, max_docs=5000000):
+    """
+    分层合并: 文档数同一数量级（log10）的段达到 factor 个时合并成一个，直到没有可合并的层；
+    合并在内存中进行，合并结果最多约 max_docs 个文档（更大的段不再参与合并）。
+    最后删除已被合并替换的段文件（Windows 上仍被映射的文件删除失败时下次再删）
+
+    返回:
+        int: 合并次数
+    """
+    index = TextIndex(directory)
+    merges = 0
+    while True:
+        index.refresh(force=True)
+        tiers = {}
+        for segment in index.segments():
+            if segment.doc_count * factor > max_docs:
+                continue
+            tiers.setdefault(int(math.log10(max(segment.doc_count, 1))), []).append(segment)
+        tier = next((t for t in sorted(tiers) if len(tiers[t]) >= factor), None)
+        if tier is None:
+            break
+        group = sorted(tiers[tier], key=lambda s: s.doc_count)[:factor]
+        path = merge_segments(group, directory, drop_before)
+        logger.info(f"Merged {len(group)} index segments into {os.path.basename(path)}")
+        merges += 1
+    remove_replaced(directory)
+    return merges
+
+def remove_replaced(directory):
+    """删除已被合并段替换的段文件"""
+    index = TextIndex(directory)
+    index.refresh(force=True)
+    visible = {s.name for s in index.segments()}
+    for name in list(index._segments):
+        if name not in visible:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError as e:
+                logger.debug(f"Could not remove replaced segment {name}: {e}")
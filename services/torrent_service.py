@@ -1,9 +1,9 @@
 """
 种子业务逻辑服务
 """
-import uuid
 from datetime import datetime, timedelta
 import json
+import uuid
 import logging
 import sys
 import os
@@ -12,13 +12,34 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.mysql_client import MySQLClient
 from database.redis_client import RedisClient
+from database import keys
 from services.health_calculator import HealthCalculator
+from services.announce_aggregator import AnnounceAggregator
+from services.file_list import FileListCodec
+from services.classifier import TorrentClassifier, CLASSIFY_COLUMNS
+from config.settings import FILE_STORAGE_MODE, FILE_BLOB_MIN_FILES, FILE_TERMS_MAX_CHARS
 
 logger = logging.getLogger(__name__)
 
 # 数据保留天数（2年）
 DATA_RETENTION_DAYS = 730
 
+# 批量写入的列顺序（与 prepare_torrent 生成的行一致）
+TORRENT_COLUMNS = (
+    'id', 'info_hash', 'name', 'name_utf8', 'total_size', 'file_count', 'is_single_file',
+    'piece_length', 'piece_count', 'is_private',
+    'first_seen', 'last_seen', 'announce_count', 'source_ips',
+    'health_score', 'peer_count',
+    'has_video', 'has_audio', 'has_image', 'has_document', 'has_software'
+) + CLASSIFY_COLUMNS
+FILE_COLUMNS = (
+    'id', 'torrent_id', 'file_path', 'file_name', 'file_size', 'file_index', 'file_extension'
+)
+FILE_LIST_COLUMNS = (
+    'torrent_id', 'file_count', 'block_size', 'block_count', 'summary', 'data'
+)
+FILE_TERMS_COLUMNS = ('torrent_id', 'terms')
+
 class TorrentService:
     """种子业务逻辑"""
     
@@ -34,35 +55,270 @@ class TorrentService:
     
     @staticmethod
     def analyze_files(files_data):
-        """分析文件类型"""
-        video_exts = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v'}
-        audio_exts = {'.mp3', '.flac', '.wav', '.aac', '.ogg', '.m4a', '.wma'}
-        image_exts = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'}
-        doc_exts = {'.pdf', '.doc', '.docx', '.txt', '.epub', '.mobi'}
-        software_exts = {'.exe', '.dmg', '.apk', '.deb', '.rpm', '.msi'}
-        
-        has_video = has_audio = has_image = has_doc = has_software = False
-        
+        """分析文件类型（files_data 为元数据中的 files 列表）"""
+        files = []
         for file_info in files_data:
-            path = file_info.get('path', [])
+            path = file_info.get(b'path', file_info.get('path', []))
             if isinstance(path, list) and path:
-                filename = path[-1] if isinstance(path[-1], str) else path[-1].decode('utf-8', 'replace')
-            else:
-                filename = str(path)
-            
-            ext = os.path.splitext(filename.lower())[1]
-            if ext in video_exts: has_video = True
-            if ext in audio_exts: has_audio = True
-            if ext in image_exts: has_image = True
-            if ext in doc_exts: has_doc = True
-            if ext in software_exts: has_software = True
-        
-        return has_video, has_audio, has_image, has_doc, has_software
+                files.append((TorrentService.decode_name(path[-1]), 0))
+            elif path:
+                files.append((TorrentService.decode_name(path), 0))
+        return TorrentClassifier.media_flags(TorrentClassifier.extension_sizes(files))
     
+    @staticmethod
+    def prepare_torrent(metadata, info_hash, source_ip, now):
+        """
+        解析元数据并生成待插入的行（不访问数据库）
+
+        参数:
+            metadata: dict - 种子元数据
+            info_hash: str - 40位十六进制哈希
+            source_ip: str - 来源 IP
+            now: datetime - 入库时间
+
+        返回:
+            (torrent_row, file_rows, file_list_row, file_terms_row) 或 None（被过滤）
+            文件多于 FILE_BLOB_MIN_FILES 时 file_rows 为空，文件树存入 file_list_row；
+            单文件种子的 file_terms_row 由种子名生成（文件名即种子名）
+        """
+        # 1. 检查种子创建时间（超过2年的不保存）
+        creation_date_ts = metadata.get(b'creation date', None)
+        if creation_date_ts:
+            try:
+                # creation date 是 Unix 时间戳
+                creation_date = datetime.fromtimestamp(creation_date_ts)
+                cutoff_date = now - timedelta(days=DATA_RETENTION_DAYS)
+                if creation_date < cutoff_date:
+                    logger.debug(f"Torrent created before cutoff ({creation_date.date()}), skipping: {info_hash}")
+                    return None
+            except (ValueError, TypeError, OverflowError, OSError) as e:
+                logger.debug(f"Invalid creation date: {e}, skipping check")
+
+        # 2. 解析元数据
+        name = TorrentService.decode_name(metadata.get(b'name', b'unknown'))
+        is_single_file = b'length' in metadata
+
+        if is_single_file:
+            total_size = metadata.get(b'length', 0)
+            file_count = 1
+            files_data = []
+        else:
+            files = metadata.get(b'files', [])
+            total_size = sum(f.get(b'length', 0) for f in files)
+            file_count = len(files)
+            files_data = files
+
+        piece_length = metadata.get(b'piece length', 0)
+        pieces = metadata.get(b'pieces', b'')
+        piece_count = len(pieces) // 20 if pieces else 0
+        is_private = metadata.get(b'private', 0) == 1
+
+        # 3. 计算健康度
+        health_data = {
+            'first_seen': now,
+            'last_seen': now,
+            'announce_count': 1,
+            'peer_count': 1,
+            'file_count': file_count,
+            'total_size': total_size
+        }
+        health_score = HealthCalculator.calculate(health_data)
+
+        # 4. 健康度过滤
+        if not HealthCalculator.should_store(health_score):
+            logger.debug(f"Low health score ({health_score}), skipping: {info_hash}")
+            return None
+
+        # 5. 文件列表
+        files = []
+        for file_info in files_data:
+            path_list = file_info.get(b'path', [])
+            if isinstance(path_list, list):
+                file_path = '/'.join(TorrentService.decode_name(p) for p in path_list) or 'unknown'
+            else:
+                file_path = TorrentService.decode_name(path_list)
+            files.append((file_path, file_info.get(b'length', 0)))
+
+        # 6. 文件类型分析和分类（单文件种子按名称的扩展名）
+        ext_sizes = TorrentClassifier.extension_sizes(files if files else [(name, total_size)])
+        has_video, has_audio, has_image, has_doc, has_software = TorrentClassifier.media_flags(ext_sizes)
+        classification = TorrentClassifier.row_values(TorrentClassifier.classify(name, ext_sizes))
+
+        # 7. 主表行（顺序与 TORRENT_COLUMNS 一致，id / info_hash 已按主键模式编码）
+        torrent_id = keys.db_id(keys.new_id())
+        torrent_row = (
+            torrent_id, keys.db_hash(info_hash), name, name, total_size, file_count, is_single_file,
+            piece_length, piece_count, is_private,
+            now, now, 1, json.dumps([source_ip] if source_ip else []),
+            health_score, 1,
+            has_video, has_audio, has_image, has_doc, has_software
+        ) + classification
+
+        # 文件名词表（顺序与 FILE_TERMS_COLUMNS 一致，单文件种子用种子名，否则 scope=files 搜不到）
+        file_terms_row = None
+        terms = FileListCodec.terms((path for path, _ in files) if files else [name], FILE_TERMS_MAX_CHARS)
+        if terms:
+            file_terms_row = (torrent_id, terms)
+
+        # 大型种子：整个文件树压缩成一个 blob（顺序与 FILE_LIST_COLUMNS 一致）
+        use_blob = FILE_STORAGE_MODE == 'blob' or (
+            FILE_STORAGE_MODE == 'auto' and len(files) >= FILE_BLOB_MIN_FILES)
+        if files and use_blob:
+            blob, block_count = FileListCodec.encode(files)
+            file_list_row = (
+                torrent_id, len(files), FileListCodec.BLOCK_SIZE, block_count,
+                FileListCodec.summary_json(files), blob
+            )
+            return torrent_row, [], file_list_row, file_terms_row
+
+        # 否则逐行写 torrent_files（顺序与 FILE_COLUMNS 一致）
+        file_rows = []
+        for idx, (file_path, file_size) in enumerate(files):
+            file_name = file_path.rsplit('/', 1)[-1]
+            file_ext = os.path.splitext(file_name.lower())[1]
+            file_rows.append((
+                keys.db_id(keys.new_id()), torrent_id, file_path, file_name,
+                file_size, idx, file_ext
+            ))
+
+        return torrent_row, file_rows, None, file_terms_row
+
+    @staticmethod
+    def _write_prepared(entries):
+        """
+        在一个事务里写入多条已解析的种子
+
+        参数:
+            entries: list of (info_hash, torrent_row, file_rows, file_list_row, file_terms_row)
+
+        返回:
+            (inserted_entries, existing_hashes)
+
+        异常:
+            数据库不可用（MySQLClient.is_unavailable）时直接抛出
+        """
+        hashes = [e[0] for e in entries]
+        try:
+            with MySQLClient.transaction() as cursor:
+                # Redis 去重标记只保留 7 天，过期后的重复哈希在这里拦下
+                placeholders = ','.join(['%s'] * len(hashes))
+                cursor.execute(f"SELECT info_hash FROM torrents WHERE info_hash IN ({placeholders})",
+                               [keys.db_hash(h) for h in hashes])
+                existing = {keys.hash_str(r['info_hash']) for r in cursor.fetchall()}
+                inserted = [e for e in entries if e[0] not in existing]
+                MySQLClient.insert_rows(cursor, 'torrents', TORRENT_COLUMNS, [e[1] for e in inserted])
+                MySQLClient.insert_rows(cursor, 'torrent_files', FILE_COLUMNS,
+                                        [row for e in inserted for row in e[2]])
+                # blob 可能很大，小批写入避免超过 max_allowed_packet
+                MySQLClient.insert_rows(cursor, 'torrent_file_lists', FILE_LIST_COLUMNS,
+                                        [e[3] for e in inserted if e[3] is not None], chunk_size=20)
+                MySQLClient.insert_rows(cursor, 'torrent_file_terms', FILE_TERMS_COLUMNS,
+                                        [e[4] for e in inserted if e[4] is not None], chunk_size=100)
+            return inserted, list(existing)
+        except Exception as e:
+            if MySQLClient.is_unavailable(e):
+                # 数据库不可用：交给调用方（写入进程会转存到本地 spool）
+                raise
+            if len(entries) == 1:
+                logger.error(f"Failed to save torrent {hashes[0]}: {e}")
+                return [], []
+            # 多个写入进程并发插入同一哈希会让整批回滚，退回逐条写入
+            logger.warning(f"Batch insert of {len(entries)} torrents failed ({e}), retrying one by one")
+            inserted, existing = [], []
+            for entry in entries:
+                i, x = TorrentService._write_prepared([entry])
+                inserted += i
+                existing += x
+            return inserted, existing
+
+    @staticmethod
+    def save_torrents(items, sightings=None, recent=None, indexer=None):
+        """
+        批量保存种子：一个 Redis pipeline 去重，一个 MySQL 事务写入
+        torrents、torrent_files 和 torrent_file_terms（多行 INSERT）
+
+        参数:
+            items: list of (metadata, info_hash, source_ip, event_type)
+            sightings: AnnounceAggregator - 已入库的哈希记为一次重复发现（可选）
+            recent: RecentHashes - 写入进程本地的最近哈希，命中的不再查 Redis（可选）
+            indexer: IndexWriter - 新入库的种子加入倒排索引的段缓冲（SEARCH_BACKEND=index，可选）
+
+        返回:
+            int: 成功保存的数量
+
+        异常:
+            数据库不可用时抛出，调用方负责重试或转存
+        """
+        # 1. 批内去重（同一哈希只保留第一条，其余记为重复发现）
+        # 入库时间取整秒: 与 DATETIME 列存下的值一致，倒排索引的新段和 build 的段排序键相同
+        now = datetime.now().replace(microsecond=0)
+        unique = {}
+        for metadata, info_hash, source_ip, event_type in items:
+            if info_hash not in unique and (recent is None or info_hash not in recent):
+                unique[info_hash] = (metadata, source_ip)
+            elif sightings is not None:
+                sightings.add(info_hash, source_ip, now)
+        hashes = list(unique)
+        if not hashes:
+            return 0
+
+        # 2. Redis 去重检查（一次 pipeline）
+        try:
+            exists = RedisClient.exists_hashes(hashes)
+        except Exception as e:
+            logger.error(f"Redis dedup check failed: {e}")
+            exists = [False] * len(hashes)
+        if recent is not None:
+            recent.update(h for h, seen in zip(hashes, exists) if seen)
+
+        # 3. 解析元数据
+        entries = []
+        for info_hash, seen in zip(hashes, exists):
+            if seen:
+                logger.debug(f"Hash already exists: {info_hash}")
+                if sightings is not None:
+                    sightings.add(info_hash, unique[info_hash][1], now)
+                continue
+            metadata, source_ip = unique[info_hash]
+            try:
+                prepared = TorrentService.prepare_torrent(metadata, info_hash, source_ip, now)
+            except Exception as e:
+                logger.error(f"Failed to parse torrent {info_hash}: {e}")
+                continue
+            if prepared is not None:
+                entries.append((info_hash,) + prepared)
+        if not entries:
+            return 0
+
+        # 4. 一个事务写入整批
+        inserted, existing = TorrentService._write_prepared(entries)
+        if recent is not None:
+            recent.update([e[0] for e in inserted] + existing)
+        if sightings is not None:
+            for info_hash in existing:
+                sightings.add(info_hash, unique[info_hash][1], now)
+
+        # 5. Redis 缓存（一次 pipeline）
+        try:
+            RedisClient.set_hashes([e[0] for e in inserted] + existing)
+            RedisClient.add_recent_torrents([keys.id_str(e[1][0]) for e in inserted])
+        except Exception as e:
+            logger.error(f"Failed to update Redis after batch insert: {e}")
+
+        if indexer is not None:
+            created_at = int(now.timestamp())
+            for e in inserted:
+                row = e[1]
+                indexer.add(uuid.UUID(keys.id_str(row[0])).bytes, row[2], created_at, row[4], row[3])
+
+        for e in inserted:
+            logger.info(f"Saved torrent: {e[1][2]} ({e[0]})")
+        return len(inserted)
+
     @staticmethod
     def save_torrent(metadata, info_hash, source_ip, event_type):
         """
-        保存种子到数据库
+        保存单个种子到数据库（save_torrents 的单条形式）
 
         参数:
             metadata: dict - 种子元数据
@@ -74,127 +330,234 @@ class TorrentService:
             bool: 是否成功保存
         """
         try:
-            # 1. Redis 去重检查
-            if RedisClient.exists_hash(info_hash):
-                logger.debug(f"Hash already exists: {info_hash}")
-                return False
-
-            # 2. 检查种子创建时间（超过2年的不保存）
-            creation_date_ts = metadata.get(b'creation date', None)
-            if creation_date_ts:
-                try:
-                    # creation date 是 Unix 时间戳
-                    creation_date = datetime.fromtimestamp(creation_date_ts)
-                    cutoff_date = datetime.now() - timedelta(days=DATA_RETENTION_DAYS)
-                    if creation_date < cutoff_date:
-                        logger.debug(f"Torrent created before cutoff ({creation_date.date()}), skipping: {info_hash}")
-                        return False
-                except (ValueError, TypeError) as e:
-                    logger.debug(f"Invalid creation date: {e}, skipping check")
-
-            # 3. 解析元数据
-            name = TorrentService.decode_name(metadata.get(b'name', b'unknown'))
-            is_single_file = b'length' in metadata
-            
-            if is_single_file:
-                total_size = metadata.get(b'length', 0)
-                file_count = 1
-                files_data = []
-            else:
-                files = metadata.get(b'files', [])
-                total_size = sum(f.get(b'length', 0) for f in files)
-                file_count = len(files)
-                files_data = files
-            
-            piece_length = metadata.get(b'piece length', 0)
-            pieces = metadata.get(b'pieces', b'')
-            piece_count = len(pieces) // 20 if pieces else 0
-            is_private = metadata.get(b'private', 0) == 1
-            
-            # 3. 计算健康度
-            now = datetime.now()
-            health_data = {
-                'first_seen': now,
-                'last_seen': now,
-                'announce_count': 1,
-                'file_count': file_count,
-                'total_size': total_size
-            }
-            health_score = HealthCalculator.calculate(health_data)
-            
-            # 4. 健康度过滤
-            if not HealthCalculator.should_store(health_score):
-                logger.debug(f"Low health score ({health_score}), skipping: {info_hash}")
-                return False
-            
-            # 5. 文件类型分析
-            has_video, has_audio, has_image, has_doc, has_software = TorrentService.analyze_files(files_data)
-            
-            # 6. 生成 UUID
-            torrent_id = str(uuid.uuid4())
-            
-            # 7. 插入主表
-            sql = """
-            INSERT INTO torrents (
-                id, info_hash, name, name_utf8, total_size, file_count, is_single_file,
-                piece_length, piece_count, is_private,
-                first_seen, last_seen, announce_count, source_ips,
-                health_score,
-                has_video, has_audio, has_image, has_document, has_software
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s,
-                %s, %s, %s, %s,
-                %s,
-                %s, %s, %s, %s, %s
-            )
-            """
-            
-            params = (
-                torrent_id, info_hash, name, name, total_size, file_count, is_single_file,
-                piece_length, piece_count, is_private,
-                now, now, 1, json.dumps([source_ip]),
-                health_score,
-                has_video, has_audio, has_image, has_doc, has_software
-            )
-            
-            MySQLClient.execute(sql, params)
-            
-            # 8. 插入文件列表
-            if files_data:
-                file_records = []
-                for idx, file_info in enumerate(files_data):
-                    path_list = file_info.get(b'path', [])
-                    if isinstance(path_list, list):
-                        file_path = '/'.join(TorrentService.decode_name(p) for p in path_list)
-                        file_name = TorrentService.decode_name(path_list[-1]) if path_list else 'unknown'
-                    else:
-                        file_path = TorrentService.decode_name(path_list)
-                        file_name = file_path
-                    
-                    file_size = file_info.get(b'length', 0)
-                    file_ext = os.path.splitext(file_name.lower())[1]
-                    
-                    file_records.append((
-                        str(uuid.uuid4()), torrent_id, file_path, file_name,
-                        file_size, idx, file_ext
-                    ))
-                
-                if file_records:
-                    file_sql = """
-                    INSERT INTO torrent_files (
-                        id, torrent_id, file_path, file_name, file_size, file_index, file_extension
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """
-                    MySQLClient.execute_many(file_sql, file_records)
-            
-            # 9. Redis 缓存
-            RedisClient.set_hash(info_hash)
-            RedisClient.add_recent_torrent(torrent_id)
-            
-            logger.info(f"Saved torrent: {name} ({info_hash})")
-            return True
-            
+            return TorrentService.save_torrents([(metadata, info_hash, source_ip, event_type)]) == 1
         except Exception as e:
             logger.error(f"Failed to save torrent {info_hash}: {e}")
             return False
+
+    @staticmethod
+    def update_dht_demand(scores):
+        """
+        写入 DHT 查询热度（只影响已入库的种子，hot_score 由 HotScoreEngine 计算）
+
+        参数:
+            scores: dict - {info_hash_hex: 衰减后的查询次数估计}
+
+        返回:
+            int: 更新的行数
+        """
+        if not scores:
+            return 0
+        try:
+            params = [(score, keys.db_hash(info_hash)) for info_hash, score in scores.items()]
+            return MySQLClient.execute_many(
+                "UPDATE torrents SET dht_demand = %s WHERE info_hash = %s",
+                params
+            )
+        except Exception as e:
+            logger.error(f"Failed to update DHT demand: {e}")
+            return 0
+
+    @staticmethod
+    def update_swarm_size(estimates):
+        """
+        写入 Swarm 规模估计并重算健康度（只影响已入库的种子）
+
+        参数:
+            estimates: dict - {info_hash_hex: 估计的去重 Peer 数}
+
+        返回:
+            int: 更新的行数
+        """
+        if not estimates:
+            return 0
+        try:
+            params = [
+                (peers, HealthCalculator.score_from_peers(peers), keys.db_hash(info_hash))
+                for info_hash, peers in estimates.items()
+            ]
+            return MySQLClient.execute_many(
+                "UPDATE torrents SET peer_count = %s, health_score = %s WHERE info_hash = %s",
+                params
+            )
+        except Exception as e:
+            logger.error(f"Failed to update swarm size: {e}")
+            return 0
+
+    @staticmethod
+    def update_sightings(sightings, max_ips=20, chunk_size=1000):
+        """
+        批量写入聚合后的重复发现（按 info_hash 的 UPDATE 批次）
+
+        只影响已入库的种子。每 chunk_size 个哈希一批: 先普通读取（不加锁）现有 source_ips
+        合并去重、保留最新 max_ips 个，再 executemany 逐行 UPDATE last_seen / announce_count /
+        source_ips。写入按 info_hash 分区，同一哈希只有一个写入进程，读到写之间不会被改动。
+
+        处理完的块从 sightings 中删除；数据库不可用时抛出异常，sightings 中剩下的是未写入的部分，
+        由调用方并回聚合器（AnnounceAggregator.merge）下次再写。
+
+        参数:
+            sightings: dict - {info_hash_hex: (count, last_seen, ips)}，来自 AnnounceAggregator.drain()
+            max_ips: int - source_ips 上限
+            chunk_size: int - 每批哈希数
+
+        返回:
+            int: 更新的种子数
+        """
+        if not sightings:
+            return 0
+        # 固定顺序，行锁按索引顺序获取
+        hashes = sorted(sightings)
+        updated = 0
+        for i in range(0, len(hashes), chunk_size):
+            chunk = [keys.db_hash(h) for h in hashes[i:i + chunk_size]]
+            try:
+                placeholders = ','.join(['%s'] * len(chunk))
+                rows = MySQLClient.fetch_all(
+                    f"SELECT info_hash, source_ips FROM torrents WHERE info_hash IN ({placeholders})",
+                    chunk
+                )
+                params = []
+                for r in rows:
+                    info_hash = r['info_hash']
+                    count, last_seen, ips = sightings[info_hash]
+                    try:
+                        old_ips = json.loads(r['source_ips']) if r['source_ips'] else []
+                    except (TypeError, ValueError):
+                        old_ips = []
+                    merged = AnnounceAggregator.merge_ips(old_ips, ips, max_ips)
+                    params.append((last_seen, count, json.dumps(merged), keys.db_hash(info_hash)))
+                if params:
+                    MySQLClient.execute_many(
+                        """
+                        UPDATE torrents SET
+                            last_seen = GREATEST(last_seen, %s),
+                            announce_count = announce_count + %s,
+                            source_ips = %s
+                        WHERE info_hash = %s
+                        """,
+                        params
+                    )
+                    updated += len(params)
+            except Exception as e:
+                if MySQLClient.is_unavailable(e):
+                    raise
+                # 数据问题重试也不会成功，丢弃这一块
+                logger.error(f"Dropping {len(chunk)} sightings that failed to update: {e}")
+            for h in hashes[i:i + chunk_size]:
+                del sightings[h]
+        return updated
+
+    @staticmethod
+    def classify_batch(after_id=None, batch_size=1000, only_missing=True):
+        """
+        批量回填分类（按主键 keyset 分页）
+
+        多文件种子按 torrent_files 的扩展名汇总分类，大型种子用
+        torrent_file_lists.summary，单文件种子按名称。
+
+        参数:
+            after_id: 上一批最后一个 id（数据库格式），None 从头开始
+            batch_size: int - 每批种子数
+            only_missing: bool - 只处理 category 为空的种子
+
+        返回:
+            (处理数, 最后一个 id)；处理数为 0 表示已完成
+        """
+        where = ["id > %s"] if after_id is not None else []
+        params = [after_id] if after_id is not None else []
+        if only_missing:
+            where.append("category IS NULL")
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        rows = MySQLClient.fetch_all(
+            f"SELECT id, name, total_size, is_single_file FROM torrents {where_sql} ORDER BY id LIMIT %s",
+            tuple(params + [batch_size])
+        )
+        if not rows:
+            return 0, after_id
+
+        ids = [keys.db_id(r['id']) for r in rows]
+        placeholders = ','.join(['%s'] * len(ids))
+        ext_sizes = {}
+        for f in MySQLClient.fetch_all(
+            f"""
+            SELECT torrent_id, file_extension, SUM(file_size) AS size
+            FROM torrent_files WHERE torrent_id IN ({placeholders})
+            GROUP BY torrent_id, file_extension
+            """,
+            tuple(ids)
+        ):
+            ext_sizes.setdefault(f['torrent_id'], {})[f['file_extension'] or ''] = int(f['size'] or 0)
+        summaries = {
+            f['torrent_id']: f['summary'] for f in MySQLClient.fetch_all(
+                f"SELECT torrent_id, summary FROM torrent_file_lists WHERE torrent_id IN ({placeholders})",
+                tuple(ids)
+            )
+        }
+
+        params = []
+        for r in rows:
+            if r['id'] in summaries:
+                result = TorrentClassifier.classify_summary(r['name'], summaries[r['id']])
+            else:
+                sizes = ext_sizes.get(r['id'])
+                if not sizes:
+                    sizes = TorrentClassifier.extension_sizes([(r['name'] or '', r['total_size'] or 0)])
+                result = TorrentClassifier.classify(r['name'], sizes)
+            params.append(TorrentClassifier.row_values(result) + (keys.db_id(r['id']),))
+        set_sql = ', '.join(f"{col} = %s" for col in CLASSIFY_COLUMNS)
+        MySQLClient.execute_many(f"UPDATE torrents SET {set_sql} WHERE id = %s", params)
+        return len(rows), keys.db_id(rows[-1]['id'])
+
+    @staticmethod
+    def file_terms_batch(after_id=None, batch_size=1000):
+        """
+        批量回填文件名词表 torrent_file_terms（按主键 keyset 分页）
+
+        文件来自 torrent_files，大型种子解码 torrent_file_lists 的 blob，单文件种子用种子名；
+        已有的行会被覆盖。
+
+        参数:
+            after_id: 上一批最后一个 id（数据库格式），None 从头开始
+            batch_size: int - 每批种子数
+
+        返回:
+            (处理数, 最后一个 id)；处理数为 0 表示已完成
+        """
+        where = "WHERE id > %s" if after_id is not None else ""
+        params = [after_id] if after_id is not None else []
+        rows = MySQLClient.fetch_all(
+            f"SELECT id, name, is_single_file FROM torrents {where} ORDER BY id LIMIT %s",
+            tuple(params + [batch_size])
+        )
+        if not rows:
+            return 0, after_id
+
+        paths = {r['id']: [r['name']] for r in rows if r['is_single_file']}
+        ids = [keys.db_id(r['id']) for r in rows if not r['is_single_file']]
+        placeholders = ','.join(['%s'] * len(ids))
+        if ids:
+            for f in MySQLClient.fetch_all(
+                f"""
+                SELECT torrent_id, file_path FROM torrent_files
+                WHERE torrent_id IN ({placeholders}) ORDER BY torrent_id, file_index
+                """,
+                tuple(ids)
+            ):
+                paths.setdefault(f['torrent_id'], []).append(f['file_path'])
+            for f in MySQLClient.fetch_all(
+                f"SELECT torrent_id, data FROM torrent_file_lists WHERE torrent_id IN ({placeholders})",
+                tuple(ids)
+            ):
+                paths[f['torrent_id']] = [path for path, _ in FileListCodec.decode(f['data'])]
+
+        values = []
+        for torrent_id, files in paths.items():
+            terms = FileListCodec.terms(files, FILE_TERMS_MAX_CHARS)
+            if terms:
+                values.append((keys.db_id(torrent_id), terms))
+        if values:
+            with MySQLClient.transaction() as cursor:
+                MySQLClient.insert_rows(cursor, 'torrent_file_terms', FILE_TERMS_COLUMNS, values, chunk_size=100,
+                                        suffix=" ON DUPLICATE KEY UPDATE terms = VALUES(terms)")
+        return len(rows), keys.db_id(rows[-1]['id'])
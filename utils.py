@@ -4,6 +4,20 @@ import random
 import struct
 import socket
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Compact node info: 20-byte node id + IPv4 + port (BEP 5)
+NODE_STRUCT = struct.Struct("!20sIH")
+NODE_STRUCT_STR = struct.Struct("!20s4sH")
+# Compact peer info: IPv4 + port
+PEER_STRUCT_STR = struct.Struct("!4sH")
+
+if np is not None:
+    NODE_DTYPE = np.dtype([("nid", "S20"), ("ip", ">u4"), ("port", ">u2")])
+
 def get_rand_id():
     return os.urandom(20)
 
@@ -20,16 +34,35 @@ def random_id():
     return h.digest()
 
 def decode_nodes(nodes):
-    n = []
-    length = len(nodes)
-    if (length % 26) != 0:
-        return n
-    for i in range(0, length, 26):
-        nid = nodes[i:i+20]
-        ip = socket.inet_ntoa(nodes[i+20:i+24])
-        port = struct.unpack("!H", nodes[i+24:i+26])[0]
-        n.append((nid, ip, port))
-    return n
+    """Decode compact node info into [(nid, ip_str, port)]"""
+    if len(nodes) % 26:
+        return []
+    ntoa = socket.inet_ntoa
+    return [(nid, ntoa(ip), port) for nid, ip, port in NODE_STRUCT_STR.iter_unpack(nodes)]
+
+def decode_nodes_int(nodes):
+    """Decode compact node info into [(nid, ip_int, port)], IPs stay integers"""
+    if len(nodes) % 26:
+        return []
+    return list(NODE_STRUCT.iter_unpack(nodes))
+
+def decode_nodes_array(nodes):
+    """
+    Decode a large buffer of compact node info into a NumPy structured array
+    (fields nid/ip/port). Only worth it for bulk data such as replays or
+    captures, a single DHT response is faster with decode_nodes_int.
+    """
+    if np is None:
+        raise RuntimeError("numpy is not installed")
+    if len(nodes) % 26:
+        return np.empty(0, dtype=NODE_DTYPE)
+    return np.frombuffer(nodes, dtype=NODE_DTYPE)
+
+def decode_peers(values):
+    """Decode a list of 6-byte compact peer entries into [(ip_str, port)]"""
+    ntoa = socket.inet_ntoa
+    return [(ntoa(ip), port)
+            for ip, port in PEER_STRUCT_STR.iter_unpack(b"".join(v for v in values if len(v) == 6))]
 
 def encode_nodes(nodes):
     strings = []
@@ -10,35 +10,92 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.torrent_service import TorrentService
+from services.announce_aggregator import AnnounceAggregator
+from config.settings import ANNOUNCE_FLUSH_SEC, SOURCE_IPS_MAX, DB_WRITER_LRU_SIZE
+from config.settings import (
+    SPOOL_DIR, SPOOL_SEGMENT_MB, SPOOL_MAX_GB, SPOOL_FSYNC, SPOOL_REPLAY_BATCH,
+    DB_SLOW_SEC, DB_RETRY_SEC, DB_RETRY_MAX_SEC
+)
+from config.settings import SEARCH_BACKEND, INDEX_DIR, INDEX_SEGMENT_DOCS, INDEX_FLUSH_SEC
 from database.mysql_client import MySQLClient
 from database.redis_client import RedisClient
+from workers.spool import Spool
+from workers.write_router import RecentHashes
+from services.text_index import IndexWriter
 
 logger = logging.getLogger(__name__)
 
 class DBWriter:
     """数据库批量写入器"""
     
+    # metrics 数组中每个写入进程占用的槽位
+    METRIC_SLOTS = 4   # pending_items, pending_bytes, 最近一批写入耗时（秒）, 是否处于 spool 模式
+    
     @staticmethod
-    def worker(write_queue, batch_size=100, batch_timeout=10):
+    def worker(write_queue, batch_size=100, batch_timeout=10, index=0, metrics=None):
         """
         批量写入工作进程
         
+        数据库不可用或单批写入超过 DB_SLOW_SEC 时，批次改为追加到本地 spool，
+        冷却期（指数退避）过后恢复直写，并在空闲时分批回放 spool。
+        
+        只有种子批次进 spool。announce / demand / swarm 是可以丢失的统计值，有意不进 spool：
+        demand / swarm 每个窗口都是完整的新估计，下个窗口会覆盖；重复发现留在内存聚合中，
+        数据库恢复后再写，聚合表满时丢弃。spool 期间这几类批次直接跳过，不再逐个等数据库超时。
+        
+        写入按 info_hash 分区（见 WriteRouter），本进程只会收到自己分区的哈希，
+        最近写入的哈希记在本地 LRU 中，重复出现时不再查 Redis。
+        
+        SEARCH_BACKEND=index 时新入库的种子同时写入倒排索引（每 INDEX_FLUSH_SEC 秒一个段）。
+        
         参数:
-            write_queue: multiprocessing.Queue - 写入队列
+            write_queue: multiprocessing.Queue - 本分区的写入队列（WriteRouter.queues[index]）
             batch_size: int - 批量大小
             batch_timeout: float - 批量超时（秒）
+            index: int - 写入进程序号 / 分区号（决定 spool 目录）
+            metrics: multiprocessing.Array('d') - 背压指标，见 METRIC_SLOTS（可选）
         """
-        # 初始化数据库连接
+        # 初始化数据库连接（失败时继续运行，先写 spool）
         try:
             MySQLClient.initialize()
             RedisClient.initialize()
             logger.info("DB Writer initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize DB Writer: {e}")
-            return
+            logger.error(f"Failed to initialize DB Writer, spooling until the database is back: {e}")
+        
+        spool = Spool(
+            os.path.join(SPOOL_DIR, f"writer-{index}"),
+            segment_size=SPOOL_SEGMENT_MB * 1024 * 1024,
+            max_bytes=SPOOL_MAX_GB * 1024 ** 3,
+            fsync=SPOOL_FSYNC
+        )
         
         batch = []
         last_write = time.time()
+        sightings = AnnounceAggregator(max_ips=SOURCE_IPS_MAX)
+        recent = RecentHashes(DB_WRITER_LRU_SIZE)
+        indexer = IndexWriter(INDEX_DIR, INDEX_SEGMENT_DOCS, INDEX_FLUSH_SEC) if SEARCH_BACKEND == 'index' else None
+        last_sightings_flush = last_write
+        spool_until = 0.0          # 在此之前批次直接写 spool
+        backoff = DB_RETRY_SEC
+        latency = 0.0
+        last_report = last_write
+        
+        def hold_off(reason):
+            """进入 spool 模式一段时间（指数退避）"""
+            nonlocal spool_until, backoff
+            spool_until = time.time() + backoff
+            logger.warning(f"{reason}, spooling for {backoff:.0f}s")
+            backoff = min(backoff * 2, DB_RETRY_MAX_SEC)
+        
+        def replay_handler(items):
+            try:
+                TorrentService.save_torrents(items, sightings, recent, indexer)
+            except Exception as e:
+                if MySQLClient.is_unavailable(e):
+                    raise
+                # 非连接类错误重试也不会成功，丢弃这一批以免卡住回放
+                logger.error(f"Dropping {len(items)} spooled items that failed to replay: {e}")
         
         while True:
             try:
@@ -48,7 +105,12 @@ class DBWriter:
                 except Exception:
                     task = None
                 
-                if task:
+                if task and task[3] == b"announce":
+                    # 主进程聚合好的一个窗口 {info_hash_hex: (count, last_seen, ips)}，
+                    # 并入本地聚合后立即刷新（窗口已在主进程等满）
+                    sightings.merge(task[0])
+                    last_sightings_flush = 0.0
+                elif task:
                     batch.append(task)
                 
                 # 判断是否需要批量写入
@@ -58,22 +120,111 @@ class DBWriter:
                 )
                 
                 if should_write:
-                    success_count = 0
+                    torrents = []
+                    spooling = time.time() < spool_until
                     for item in batch:
                         try:
                             metadata, info_hash, source_ip, event_type = item
-                            if TorrentService.save_torrent(metadata, info_hash, source_ip, event_type):
-                                success_count += 1
+                            if spooling and event_type in (b"demand", b"swarm"):
+                                # 统计值不进 spool，下个窗口会重新估计
+                                logger.warning(f"Database unavailable, dropped {len(metadata)} {event_type.decode()} estimates")
+                            elif event_type == b"demand":
+                                # DHT 查询热度: metadata 为 {info_hash_hex: score}
+                                TorrentService.update_dht_demand(metadata)
+                            elif event_type == b"swarm":
+                                # Swarm 规模: metadata 为 {info_hash_hex: 估计 Peer 数}
+                                TorrentService.update_swarm_size(metadata)
+                            else:
+                                torrents.append(item)
+                        except Exception as e:
+                            logger.error(f"Failed to process batch item: {e}")
+                    
+                    # 整批种子一次去重、一个事务写入；数据库慢或不可用时写 spool
+                    success_count = 0
+                    if torrents and time.time() < spool_until:
+                        spool.append(torrents)
+                    elif torrents:
+                        start = time.time()
+                        try:
+                            success_count = TorrentService.save_torrents(torrents, sightings, recent, indexer)
+                            latency = time.time() - start
+                            if latency > DB_SLOW_SEC:
+                                hold_off(f"Batch write took {latency:.1f}s")
+                            else:
+                                backoff = DB_RETRY_SEC
                         except Exception as e:
-                            logger.error(f"Failed to save torrent: {e}")
+                            latency = time.time() - start
+                            if MySQLClient.is_unavailable(e):
+                                spool.append(torrents)
+                                hold_off(f"Database unavailable ({e})")
+                            else:
+                                logger.error(f"Failed to save torrent batch: {e}")
                     
                     if success_count > 0:
-                        logger.info(f"Batch write completed: {success_count}/{len(batch)} torrents saved")
+                        logger.info(f"Batch write completed: {success_count}/{len(torrents)} torrents saved")
                     
                     batch = []
                     last_write = time.time()
+                
+                # 数据库正常时回放 spool（队列空闲或刚写完一批时回放一批）
+                if spool and time.time() >= spool_until and (task is None or should_write):
+                    start = time.time()
+                    try:
+                        replayed = spool.replay(replay_handler, SPOOL_REPLAY_BATCH)
+                        if replayed:
+                            latency = time.time() - start
+                            logger.info(f"Replayed {replayed} spooled items ({spool.pending_bytes} bytes left)")
+                    except Exception as e:
+                        if MySQLClient.is_unavailable(e):
+                            hold_off(f"Database unavailable during replay ({e})")
+                        else:
+                            logger.error(f"Spool replay error: {e}")
+                
+                # 定期（或聚合表满、收到主进程的窗口时）批量 UPDATE 重复发现
+                if sightings and time.time() < spool_until:
+                    # 数据库恢复前留在内存中，聚合表满时丢弃
+                    if sightings.full:
+                        logger.warning(f"Database unavailable, dropped {len(sightings.drain())} aggregated sightings")
+                elif sightings and (sightings.full or time.time() - last_sightings_flush >= ANNOUNCE_FLUSH_SEC):
+                    events = sightings.events
+                    window = sightings.drain()
+                    try:
+                        updated = TorrentService.update_sightings(window, SOURCE_IPS_MAX)
+                        logger.info(f"Sightings flushed: {events} events -> {updated} torrents")
+                    except Exception as e:
+                        # 未写入的部分并回聚合器，数据库恢复后再写
+                        sightings.merge(window)
+                        if MySQLClient.is_unavailable(e):
+                            hold_off(f"Database unavailable while flushing sightings ({e})")
+                        else:
+                            logger.error(f"Failed to flush sightings: {e}")
+                    last_sightings_flush = time.time()
+                elif not sightings:
+                    last_sightings_flush = time.time()
+                
+                # 倒排索引段缓冲定期落盘
+                if indexer is not None:
+                    try:
+                        indexer.maybe_flush()
+                    except OSError as e:
+                        logger.error(f"Failed to write index segment: {e}")
+                
+                # 背压指标
+                if metrics is not None:
+                    base = index * DBWriter.METRIC_SLOTS
+                    metrics[base] = spool.pending_items
+                    metrics[base + 1] = spool.pending_bytes
+                    metrics[base + 2] = latency
+                    metrics[base + 3] = 1.0 if time.time() < spool_until else 0.0
+                if time.time() - last_report >= 60:
+                    if spool:
+                        logger.info(f"Spool stats: {spool.stats()}")
+                    logger.info(f"Recent hash LRU: {len(recent)} hashes, {recent.hits} hits / {recent.misses} misses")
+                    last_report = time.time()
                     
             except KeyboardInterrupt:
+                if indexer is not None:
+                    indexer.flush()
                 break
             except Exception as e:
                 logger.error(f"DB Writer error: {e}")
@@ -0,0 +1,47 @@
+"""
+热度评分进程
+每 HOT_SCORE_INTERVAL_SEC 秒按主键分块重算一部分 hot_score 并更新热门榜，
+一轮处理不完时下次从 Redis 中保存的进度继续
+
+    python -m workers.hot_score            # 常驻运行
+    python -m workers.hot_score --once     # 处理完一整轮后退出
+"""
+import time
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hot_score import HotScoreEngine
+from database.mysql_client import MySQLClient
+from database.redis_client import RedisClient
+from config.settings import HOT_SCORE_INTERVAL_SEC, HOT_SCORE_MAX_CHUNKS
+
+logger = logging.getLogger(__name__)
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    MySQLClient.initialize()
+    RedisClient.initialize()
+
+    if '--once' in sys.argv[1:]:
+        start = time.time()
+        processed, _ = HotScoreEngine.run()
+        logger.info(f"Hot score pass finished: {processed} rows in {time.time() - start:.1f}s")
+        return
+
+    while True:
+        start = time.time()
+        try:
+            processed, finished = HotScoreEngine.run(HOT_SCORE_MAX_CHUNKS)
+            logger.info(
+                f"Hot score: {processed} rows in {time.time() - start:.1f}s"
+                + (" (pass finished)" if finished else " (continuing next run)")
+            )
+        except Exception as e:
+            logger.error(f"Hot score run failed: {e}")
+        time.sleep(max(HOT_SCORE_INTERVAL_SEC - (time.time() - start), 1))
+
+if __name__ == '__main__':
+    main()
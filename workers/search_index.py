@@ -0,0 +1,87 @@
+"""
+倒排索引维护进程（SEARCH_BACKEND=index）
+定期合并写入进程产生的小段，合并时丢弃超过 MAX_TORRENT_AGE_DAYS 的文档
+
+    python -m workers.search_index              # 常驻运行，每 INDEX_MERGE_SEC 秒检查一次
+    python -m workers.search_index --once       # 合并一次后退出
+    python -m workers.search_index build        # 从 MySQL 全量建索引（首次启用或索引目录丢失时）
+
+只能运行一个实例。全量建索引期间写入进程可以继续写新段，重复的种子在合并和查询时去重。
+"""
+import time
+import uuid
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.text_index import IndexWriter, merge_pending
+from database.mysql_client import MySQLClient
+from database import keys
+from config.settings import (
+    INDEX_DIR, INDEX_SEGMENT_DOCS, INDEX_MERGE_FACTOR, INDEX_MERGE_SEC, MAX_TORRENT_AGE_DAYS
+)
+
+logger = logging.getLogger(__name__)
+
+def build(chunk_size=5000):
+    """按主键 keyset 扫描 torrents，写成 INDEX_SEGMENT_DOCS 大小的段"""
+    writer = IndexWriter(INDEX_DIR, INDEX_SEGMENT_DOCS)
+    after_id = None
+    total = 0
+    start = time.time()
+    while True:
+        where = "WHERE id > %s AND is_blocked = FALSE" if after_id is not None else "WHERE is_blocked = FALSE"
+        params = (after_id, chunk_size) if after_id is not None else (chunk_size,)
+        rows = MySQLClient.fetch_all(
+            f"""
+            SELECT id, name, name_utf8, total_size, created_at
+            FROM torrents {where}
+            ORDER BY id LIMIT %s
+            """,
+            params
+        )
+        if not rows:
+            break
+        for row in rows:
+            writer.add(uuid.UUID(row['id']).bytes, row['name'], row['created_at'].timestamp(),
+                       row['total_size'], row['name_utf8'])
+        total += len(rows)
+        after_id = keys.db_id(rows[-1]['id'])
+        logger.info(f"Indexed {total} torrents ({total / (time.time() - start):.0f}/s)")
+    writer.flush()
+    return total
+
+def merge():
+    drop_before = time.time() - MAX_TORRENT_AGE_DAYS * 86400
+    return merge_pending(INDEX_DIR, INDEX_MERGE_FACTOR, drop_before)
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    args = sys.argv[1:]
+
+    if 'build' in args:
+        MySQLClient.initialize()
+        start = time.time()
+        total = build()
+        merges = merge()
+        logger.info(f"Index build finished: {total} torrents, {merges} merges in {time.time() - start:.0f}s")
+        return
+
+    if '--once' in args:
+        logger.info(f"Index merge finished: {merge()} merges")
+        return
+
+    while True:
+        start = time.time()
+        try:
+            merges = merge()
+            if merges:
+                logger.info(f"Index merge: {merges} merges in {time.time() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Index merge failed: {e}")
+        time.sleep(max(INDEX_MERGE_SEC - (time.time() - start), 1))
+
+if __name__ == '__main__':
+    main()
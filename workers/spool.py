@@ -0,0 +1,210 @@
+"""
+本地追加写 spool
+数据库变慢或不可用时，写入进程把批次追加到本地分段文件，恢复后再批量回放
+
+段文件格式:
+    头部: b'DHTSPL1\n'
+    记录: length(u32) | crc32(u32) | payload（bencode 的 [metadata, info_hash, source_ip, event_type]）
+只追加不修改；回放时校验 CRC，遇到损坏或写了一半的记录即停止读取该段。
+只保存种子批次；announce / demand / swarm 统计批次有意不进 spool（见 DBWriter.worker）。
+"""
+import os
+import struct
+import zlib
+import logging
+
+from bencode import bencode, bdecode, BencodeError
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'DHTSPL1\n'
+RECORD = struct.Struct('>II')
+MAX_RECORD_SIZE = 64 * 1024 * 1024
+
+def read_records(f, path, limit):
+    """
+    从段文件当前位置读取最多 limit 条记录
+
+    返回:
+        (items, 是否读到段尾, 损坏记录数)
+    """
+    items = []
+    corrupt = 0
+    while len(items) < limit:
+        head = f.read(RECORD.size)
+        if not head:
+            return items, True, corrupt
+        if len(head) < RECORD.size:
+            logger.error(f"Truncated spool record header in {path}")
+            return items, True, corrupt + 1
+        length, crc = RECORD.unpack(head)
+        payload = f.read(length) if length <= MAX_RECORD_SIZE else b''
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            # 通常是崩溃时写了一半的尾部记录
+            logger.error(f"Corrupt spool record in {path}, skipping rest of segment")
+            return items, True, corrupt + 1
+        try:
+            metadata, info_hash, source_ip, event_type = bdecode(payload)
+        except (BencodeError, ValueError):
+            corrupt += 1
+            continue
+        items.append((metadata, info_hash.decode(), source_ip.decode() or None, event_type))
+    return items, False, corrupt
+
+def iter_segment(path, batch_size=1000):
+    """按批读取整个段文件（批量导入用），返回 items 列表的迭代器"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            logger.error(f"Spool segment has bad header: {path}")
+            return
+        while True:
+            items, done, _ = read_records(f, path, batch_size)
+            if items:
+                yield items
+            if done:
+                return
+
+class Spool:
+    """
+    分段、带校验的追加写队列
+
+    参数:
+        directory: str - 段文件目录（每个写入进程一个）
+        segment_size: int - 单个段文件上限（字节），超过后切换新段
+        max_bytes: int - 目录总大小上限，超过后拒绝追加
+        fsync: bool - 每次追加后 fsync
+    """
+
+    def __init__(self, directory, segment_size=64 * 1024 * 1024, max_bytes=10 * 1024 ** 3, fsync=True):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._file_size = 0
+        self._replay_path = None
+        self._replay_offset = 0
+        segments = self.segments()
+        self._seq = int(segments[-1][-16:-4]) + 1 if segments else 1
+
+        # 统计
+        self.pending_items = 0   # 本进程写入、尚未回放的条数（重启前遗留的段只计入 pending_bytes）
+        self.pending_bytes = sum(os.path.getsize(p) for p in segments)
+        self.spooled_items = 0
+        self.replayed_items = 0
+        self.rejected_items = 0
+        self.corrupt_records = 0
+
+    def segments(self):
+        """已有段文件，按序号排列"""
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith('spool-') and n.endswith('.seg'))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def __bool__(self):
+        return self.pending_bytes > 0
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"spool-{self._seq:012d}.seg")
+        self._seq += 1
+        self._file = open(path, 'ab')
+        self._file.write(MAGIC)
+        self._file_size = len(MAGIC)
+        self.pending_bytes += len(MAGIC)
+
+    def seal(self):
+        """关闭当前段，使其可以被回放"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_size = 0
+
+    def append(self, items):
+        """
+        追加一批 (metadata, info_hash, source_ip, event_type)
+
+        返回:
+            int: 写入的条数（超过 max_bytes 时为 0）
+        """
+        buf = bytearray()
+        for metadata, info_hash, source_ip, event_type in items:
+            payload = bencode([metadata, info_hash, source_ip or "", event_type])
+            buf += RECORD.pack(len(payload), zlib.crc32(payload))
+            buf += payload
+        if self.pending_bytes + len(buf) > self.max_bytes:
+            self.rejected_items += len(items)
+            logger.error(f"Spool full ({self.pending_bytes} bytes), dropping {len(items)} items")
+            return 0
+        if self._file is None or self._file_size >= self.segment_size:
+            self.seal()
+            self._open_segment()
+        self._file.write(buf)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file_size += len(buf)
+        self.pending_bytes += len(buf)
+        self.pending_items += len(items)
+        self.spooled_items += len(items)
+        return len(items)
+
+    def _read_records(self, f, path, limit):
+        """从文件当前位置读取最多 limit 条记录，返回 (items, 是否读到段尾)"""
+        items, done, corrupt = read_records(f, path, limit)
+        self.corrupt_records += corrupt
+        return items, done
+
+    def replay(self, handler, batch_size=500):
+        """
+        回放最早的已关闭段中的下一批（最多 batch_size 条），交给 handler(items)
+
+        每次只处理一批，写入进程可以在回放的同时继续处理实时数据。
+        段读完后删除。handler 抛出异常时进度不前进，下次重试同一批；
+        进程重启后从段头重放（写入按哈希去重，重复回放是幂等的）。
+
+        返回:
+            int: 回放的条数（没有可回放的数据时为 0）
+        """
+        segments = self.segments()
+        if self._file is not None:
+            if len(segments) <= 1:
+                # 只剩当前写入段：关闭后回放
+                self.seal()
+            else:
+                segments = segments[:-1]
+        if not segments:
+            return 0
+        path = segments[0]
+        if path != self._replay_path:
+            self._replay_path = path
+            self._replay_offset = len(MAGIC)
+        with open(path, 'rb') as f:
+            if self._replay_offset == len(MAGIC) and f.read(len(MAGIC)) != MAGIC:
+                self.corrupt_records += 1
+                logger.error(f"Spool segment has bad header: {path}")
+                items, done = [], True
+            else:
+                f.seek(self._replay_offset)
+                items, done = self._read_records(f, path, batch_size)
+                offset = f.tell()
+        if items:
+            handler(items)
+            self._replay_offset = offset
+            self.pending_items = max(self.pending_items - len(items), 0)
+            self.replayed_items += len(items)
+        if done:
+            self.pending_bytes = max(self.pending_bytes - os.path.getsize(path), 0)
+            os.remove(path)
+            self._replay_path = None
+        return len(items)
+
+    def stats(self):
+        return {
+            "pending_items": self.pending_items,
+            "pending_bytes": self.pending_bytes,
+            "segments": len(self.segments()),
+            "spooled_items": self.spooled_items,
+            "replayed_items": self.replayed_items,
+            "rejected_items": self.rejected_items,
+            "corrupt_records": self.corrupt_records,
+        }
@@ -0,0 +1,91 @@
+"""
+数据库写入路由
+按 info_hash 前缀把写入任务分到固定的写入进程，同一哈希始终由同一进程处理，
+进程之间不会争抢同一行（UNIQUE 冲突、行锁等待），进程内可以用本地 LRU 去重
+"""
+import multiprocessing
+import queue
+from collections import OrderedDict
+
+class WriteRouter:
+    """
+    分区写入队列
+
+    每个写入进程一个 multiprocessing.Queue，接口与单个队列相同（put / put_nowait / qsize）。
+    announce / demand / swarm 这类 {info_hash_hex: 值} 的批量事件按哈希拆成每个分区一份。
+
+    参数:
+        partitions: int - 分区数（写入进程数）
+        maxsize: int - 所有分区合计的队列上限
+    """
+
+    BULK_EVENTS = (b"announce", b"demand", b"swarm")
+
+    def __init__(self, partitions, maxsize=5000):
+        self.partitions = max(int(partitions), 1)
+        per_queue = max(maxsize // self.partitions, 100)
+        self.queues = [multiprocessing.Queue(maxsize=per_queue) for _ in range(self.partitions)]
+
+    def partition(self, info_hash):
+        """哈希（40位十六进制）所在分区"""
+        return int(info_hash[:8], 16) % self.partitions
+
+    def _route(self, task):
+        """返回 [(分区, 任务)]"""
+        metadata, info_hash, source_ip, event_type = task
+        if event_type in self.BULK_EVENTS:
+            parts = {}
+            for h, value in metadata.items():
+                parts.setdefault(self.partition(h), {})[h] = value
+            return [(p, (values, None, None, event_type)) for p, values in parts.items()]
+        return [(self.partition(info_hash), task)]
+
+    def put(self, task, block=True, timeout=None):
+        for p, part in self._route(task):
+            self.queues[p].put(part, block, timeout)
+
+    def put_nowait(self, task):
+        """任一分区已满时抛出 queue.Full（批量事件中已放入的分区不回滚）"""
+        full = False
+        for p, part in self._route(task):
+            try:
+                self.queues[p].put_nowait(part)
+            except queue.Full:
+                full = True
+        if full:
+            raise queue.Full
+
+    def qsize(self):
+        return sum(q.qsize() for q in self.queues)
+
+class RecentHashes:
+    """
+    写入进程本地的最近哈希 LRU
+
+    记录本进程最近写入或确认已存在的哈希，命中时直接当作重复发现，
+    不再查 Redis。分区保证同一哈希只会出现在一个进程里，本地结果是权威的。
+    """
+
+    def __init__(self, capacity=200000):
+        self.capacity = capacity
+        self._hashes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, info_hash):
+        if info_hash in self._hashes:
+            self._hashes.move_to_end(info_hash)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def update(self, hashes):
+        for h in hashes:
+            self._hashes[h] = None
+            self._hashes.move_to_end(h)
+        while len(self._hashes) > self.capacity:
+            self._hashes.popitem(last=False)